@@ -6,31 +6,205 @@ This agent integrates:
 - Automatic conversation history management via Agno's db layer
 """
 
+import asyncio
+import hashlib
+import re
+import time
 import uuid
-from typing import AsyncIterator, Dict, Optional
+import weakref
+from typing import AsyncIterator, Dict, List, Optional
 
 from agno.agent import Agent
-from agno.db.postgres import PostgresDb
+from agno.db.base import SessionType
+from agno.models.message import Message
 from agno.models.ollama import Ollama
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session import AgentSession
 
+from app.agents.history import (
+    MESSAGE_OVERHEAD_TOKENS,
+    HistoryWindow,
+    estimate_tokens,
+)
+from app.agents.ollama_client import create_async_client
+from app.agents.pool import AgentPool
+from app.agents.response_cache import ResponseCache, cache_key
+from app.agents.router import HostRouter, OllamaHost
+from app.agents.warmup import warm_up
 from app.config import settings
+from app.metrics import (
+    INFLIGHT_GENERATIONS,
+    QUEUE_WAIT,
+    QUEUED_GENERATIONS,
+    TIME_TO_FIRST_TOKEN,
+    TOKENS_PER_SECOND,
+)
+from app.scheduling import GenerationScheduler, Ticket
+from app.singleflight import SingleFlight
+from app.storage import AsyncDb
+from app.tracing import span
+
+DESCRIPTION = "You are a helpful AI assistant powered by Agno and Ollama."
+
+# Word-sized pieces (with trailing whitespace) used to replay cached replies
+_REPLAY_PIECE = re.compile(r"\s*\S+\s*|\s+")
+
+
+def _output_tokens(response: object) -> Optional[int]:
+    """Return the output token count Agno recorded for a run, if any."""
+    tokens = getattr(getattr(response, "metrics", None), "output_tokens", None)
+    return tokens if isinstance(tokens, int) else None
+
+
+class GenerationTimeout(Exception):
+    """The model did not finish a turn within ``model_timeout_s``."""
+
+    def __init__(self, timeout_s: float):
+        super().__init__(f"Model did not finish within {timeout_s:g}s")
+        self.timeout_s = timeout_s
 
 
 class ChatbotAgent:
     """Agno-powered chatbot with streaming and PostgreSQL memory support."""
 
-    def __init__(self, db: PostgresDb):
+    def __init__(self, db: AsyncDb):
         """Initialize chatbot agent.
 
         Args:
-            db: PostgresDb instance for conversation storage
+            db: AsyncDb wrapping the conversation storage; Agno awaits every
+                session read/write so the event loop is never blocked
         """
         self.db = db
 
-        # Initialize Agno model
-        self.model = Ollama(
+        # One pooled client and model per Ollama host; generations are
+        # routed to the least busy host
+        hosts = list(settings.ollama_hosts) or [settings.ollama_host]
+        self.router = HostRouter(
+            [self._create_host(url) for url in hosts],
+            max_failures=settings.ollama_host_max_failures,
+            ejection_s=settings.ollama_host_ejection_s,
+        )
+
+        # The first host's client and model, used where any host will do
+        self.http_client = self.router.hosts[0].client
+        self.model = self.router.hosts[0].model
+
+        # Idle agents reused across turns of the same conversation
+        self.agent_pool = AgentPool(self._create_agent, settings.agent_pool_size)
+
+        # Caps concurrent generations sent to Ollama; the rest wait fairly
+        self.scheduler = GenerationScheduler(
+            max_concurrency=settings.max_concurrent_generations,
+            max_queue=settings.generation_queue_size,
+            queue_timeout_s=settings.generation_queue_timeout_s,
+        )
+        INFLIGHT_GENERATIONS.set_function(lambda: self.scheduler.active)
+        QUEUED_GENERATIONS.set_function(lambda: self.scheduler.queued)
+
+        # Sizes each turn's history to the prompt token budget (0 disables)
+        self.history = (
+            HistoryWindow(
+                budget_tokens=settings.history_token_budget,
+                max_runs=settings.max_history,
+                recap_max_tokens=settings.history_recap_max_tokens,
+            )
+            if settings.history_token_budget
+            else None
+        )
+
+        # Duplicate submissions attach to the generation already in flight
+        self.inflight = SingleFlight() if settings.inflight_dedupe_enabled else None
+
+        # Replies to history-free first turns (opt-in)
+        self.response_cache = (
+            ResponseCache(
+                max_bytes=settings.response_cache_max_bytes,
+                ttl_s=settings.response_cache_ttl_s,
+            )
+            if settings.response_cache_enabled
+            else None
+        )
+
+        # Result of the startup warm-up, see warm_up()
+        self.warmup: Dict = {"status": "not_started"}
+
+        # Generations stopped because the client left or the deadline passed
+        self.cancelled = 0
+        self.timed_out = 0
+
+    def _create_host(self, url: str) -> OllamaHost:
+        """Create the pooled client and Agno model for one Ollama host."""
+        # Pooled keep-alive HTTP client, closed in cleanup()
+        client = create_async_client(url)
+        model = Ollama(
             id=settings.ollama_model,
-            host=settings.ollama_host,
+            host=url,
+            async_client=client,
+            # Sent with every request so generations renew the residency
+            keep_alive=settings.ollama_keep_alive or None,
+        )
+        return OllamaHost(url, client, model)
+
+    async def warm_up(self) -> Dict:
+        """Load the configured models into every Ollama host before serving.
+
+        Returns:
+            Warm-up report, also kept for stats()
+        """
+        models = [settings.ollama_model] + [
+            model
+            for model in settings.warmup_models
+            if model != settings.ollama_model
+        ]
+        self.warmup = {"status": "running"}
+        reports = await asyncio.gather(
+            *(self._warm_up_host(host, models) for host in self.router.hosts)
+        )
+
+        statuses = {report["status"] for report in reports}
+        self.warmup = {
+            "status": statuses.pop() if len(statuses) == 1 else "degraded",
+            "hosts": {
+                host.url: report
+                for host, report in zip(self.router.hosts, reports)
+            },
+        }
+        return self.warmup
+
+    async def _warm_up_host(
+        self, host: OllamaHost, models: List[str]
+    ) -> Dict:
+        """Warm up one host through a client sized for cold loads."""
+        # A cold load can outlast model_timeout_s, which bounds reads on
+        # the shared client, so warm-up reads get the warm-up budget instead
+        client = create_async_client(
+            host.url, read_timeout_s=settings.warmup_timeout_s
+        )
+        try:
+            return await warm_up(
+                client,
+                models,
+                keep_alive=settings.ollama_keep_alive or None,
+                prompt=settings.warmup_prompt or None,
+                timeout_s=settings.warmup_timeout_s,
+            )
+        finally:
+            await client.close()
+
+    def _create_agent(self, conversation_id: str) -> Agent:
+        """Create an agent bound to a conversation.
+
+        Agno automatically loads history when session_id is provided.
+        """
+        return Agent(
+            model=self.model,
+            db=self.db,
+            session_id=conversation_id,
+            add_history_to_context=True,
+            num_history_runs=settings.max_history,
+            markdown=False,
+            description=DESCRIPTION,
         )
 
     async def chat(
@@ -49,35 +223,296 @@ class ChatbotAgent:
         Returns:
             Response dict with conversation_id, reply, and usage info
             Or async iterator of response chunks if streaming
+
+        Raises:
+            SchedulerRejected: If no generation slot is available; raised
+                before any chunk is streamed
+            GenerationTimeout: If the model runs past model_timeout_s (for
+                streams, raised from the iterator)
         """
+        # A fresh conversation cannot have a duplicate in flight
+        inflight = self.inflight if conversation_id is not None else None
+
         # Generate conversation ID if not provided
         if conversation_id is None:
             conversation_id = str(uuid.uuid4())
+            if self.response_cache is not None:
+                # No history, so the reply only depends on the prompt
+                return await self._chat_cached(conversation_id, message, stream)
+
+        if inflight is not None:
+            # Coalesce before admission so a duplicate never takes a slot
+            key = (
+                conversation_id,
+                stream,
+                hashlib.sha256(message.encode("utf-8")).hexdigest(),
+            )
+            if stream:
+                return await inflight.stream(
+                    key, lambda: self._start_stream(conversation_id, message)
+                )
+            return await inflight.call(
+                key, lambda: self._complete(conversation_id, message)
+            )
 
         if stream:
-            return self._chat_stream(conversation_id, message)
+            return await self._start_stream(conversation_id, message)
         else:
-            return await self._chat_complete(conversation_id, message)
+            return await self._complete(conversation_id, message)
 
-    async def _chat_complete(self, conversation_id: str, message: str) -> Dict:
-        """Handle non-streaming chat completion."""
-        # Create agent with PostgreSQL storage
-        # Agno automatically loads history when session_id is provided
-        agent = Agent(
-            model=self.model,
-            db=self.db,
+    async def _chat_cached(
+        self, conversation_id: str, message: str, stream: bool
+    ) -> Dict | AsyncIterator[Dict]:
+        """Serve a first turn from the response cache, filling it on a miss."""
+        key = cache_key(
+            settings.ollama_model, DESCRIPTION, message, self.model.options
+        )
+        reply = self.response_cache.get(key)
+
+        if reply is None:
+            if stream:
+                chunks = await self._start_stream(conversation_id, message)
+                return self._cache_reply(chunks, key)
+            response = await self._complete(conversation_id, message)
+            self.response_cache.put(key, response["reply"])
+            return response
+
+        if stream:
+            return self._replay_stream(conversation_id, message, reply)
+        await self._save_cached_turn(conversation_id, message, reply)
+        return {
+            "conversation_id": conversation_id,
+            "reply": reply,
+            "usage": {
+                "model": settings.ollama_model,
+                "cached": True,
+            },
+        }
+
+    async def _cache_reply(
+        self, chunks: AsyncIterator[Dict], key: str
+    ) -> AsyncIterator[Dict]:
+        """Pass a chunk stream through, caching the reply once it completes."""
+        try:
+            async for chunk in chunks:
+                if chunk.get("done") and "response" in chunk:
+                    self.response_cache.put(key, chunk["response"])
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _replay_stream(
+        self, conversation_id: str, message: str, reply: str
+    ) -> AsyncIterator[Dict]:
+        """Re-emit a cached reply as deltas, then save the turn."""
+        for piece in _REPLAY_PIECE.findall(reply):
+            yield {"delta": piece}
+
+        await self._save_cached_turn(conversation_id, message, reply)
+
+        yield {
+            "done": True,
+            "conversation_id": conversation_id,
+            "response": reply,
+            "usage": {
+                "model": settings.ollama_model,
+                "cached": True,
+            },
+        }
+
+    async def _save_cached_turn(
+        self, conversation_id: str, message: str, reply: str
+    ) -> None:
+        """Persist a cache-served turn as a regular completed run."""
+        now = int(time.time())
+        run = RunOutput(
+            run_id=str(uuid.uuid4()),
             session_id=conversation_id,
-            add_history_to_context=True,
-            num_history_runs=settings.max_history,
-            markdown=False,
-            description="You are a helpful AI assistant powered by Agno and Ollama.",
+            content=reply,
+            model=settings.ollama_model,
+            model_provider=self.model.provider,
+            messages=[
+                Message(role="user", content=message),
+                Message(role="assistant", content=reply),
+            ],
+            status=RunStatus.completed,
+            created_at=now,
+        )
+        session = AgentSession(
+            session_id=conversation_id,
+            agent_data={"model": self.model.to_dict()},
+            session_data={},
+            runs=[run],
+            created_at=now,
+            updated_at=now,
         )
+        await self.db.upsert_session(session)
+        await self.db.record_turn(conversation_id, message)
 
-        # Run agent - Agno handles history loading and saving automatically
-        response = await agent.arun(input=message)
+    async def _complete(self, conversation_id: str, message: str) -> Dict:
+        """Run a non-streaming turn inside a generation slot and the deadline."""
+        async with self.scheduler.slot(conversation_id) as ticket:
+            QUEUE_WAIT.observe(ticket.wait_s)
+            try:
+                return await asyncio.wait_for(
+                    self._chat_complete(conversation_id, message),
+                    settings.model_timeout_s,
+                )
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise GenerationTimeout(settings.model_timeout_s) from None
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
 
-        # Extract reply
-        reply = response.content if hasattr(response, "content") else str(response)
+    async def _start_stream(
+        self, conversation_id: str, message: str
+    ) -> AsyncIterator[Dict]:
+        """Admit a streaming turn and return its chunk stream."""
+        started = time.perf_counter()
+        # Admit before returning so a rejection can still become a 429/503
+        ticket = await self.scheduler.acquire(conversation_id)
+        QUEUE_WAIT.observe(ticket.wait_s)
+        return self._supervise(
+            self._chat_stream(conversation_id, message), ticket, started
+        )
+
+    def _supervise(
+        self,
+        chunks: AsyncIterator[Dict],
+        ticket: Ticket,
+        started: Optional[float] = None,
+    ) -> AsyncIterator[Dict]:
+        """Hold a generation slot until a chunk stream ends or hits the deadline.
+
+        ``started`` (a ``time.perf_counter()`` value) is when the turn asked
+        for its slot, the start of its time to first token.
+        """
+
+        async def stream() -> AsyncIterator[Dict]:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.model_timeout_s
+            pending: Optional[asyncio.Future] = None
+            tokens = 0
+            first_at = last_at = 0.0
+            try:
+                while True:
+                    # asyncio.wait, unlike wait_for, never swallows a cancel
+                    # that races with the chunk arriving
+                    pending = asyncio.ensure_future(chunks.__anext__())
+                    done, _ = await asyncio.wait(
+                        {pending}, timeout=max(0.0, deadline - loop.time())
+                    )
+                    if not done:
+                        self.timed_out += 1
+                        raise GenerationTimeout(settings.model_timeout_s)
+
+                    task, pending = pending, None
+                    try:
+                        chunk = task.result()
+                    except StopAsyncIteration:
+                        if tokens > 1 and last_at > first_at:
+                            # Generation speed after the first token
+                            TOKENS_PER_SECOND.observe(
+                                (tokens - 1) / (last_at - first_at)
+                            )
+                        return
+                    if "delta" in chunk:
+                        # Ollama streams one token per chunk
+                        last_at = time.perf_counter()
+                        if not tokens:
+                            first_at = last_at
+                            TIME_TO_FIRST_TOKEN.observe(
+                                first_at - (started or first_at)
+                            )
+                        tokens += 1
+                    yield chunk
+            except (GeneratorExit, asyncio.CancelledError):
+                # The client went away (or every duplicate of it did)
+                self.cancelled += 1
+                raise
+            finally:
+                if pending is not None and not pending.done():
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+                ticket.release()
+                await chunks.aclose()
+
+        wrapped = stream()
+        # A stream that is never iterated never reaches its finally block
+        weakref.finalize(wrapped, ticket.release)
+        return wrapped
+
+    async def _load_history(
+        self, agent: Agent, conversation_id: str, message: str
+    ) -> None:
+        """Give the agent its session and size its history to the budget."""
+        if settings.session_tail_enabled:
+            # Only the runs the prompt can replay are read and written back
+            session = await self.db.get_session_tail(
+                conversation_id, settings.max_history
+            )
+        elif self.history is not None:
+            # The budget needs the whole session, which Agno would read anyway
+            session = await self.db.get_session(conversation_id, SessionType.AGENT)
+        else:
+            return
+
+        # Agno uses the session it holds instead of reading its own
+        agent._cached_session = session
+
+        if self.history is None:
+            return
+
+        reserved = (
+            estimate_tokens(DESCRIPTION)
+            + estimate_tokens(message)
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        num_runs, recap = self.history.fit(conversation_id, session, reserved)
+
+        # Agno replays every run for num_history_runs=0, so switch history off
+        agent.add_history_to_context = num_runs > 0
+        if num_runs:
+            agent.num_history_runs = num_runs
+        agent.additional_context = recap
+
+    async def _chat_complete(self, conversation_id: str, message: str) -> Dict:
+        """Handle non-streaming chat completion."""
+        with span("chat.turn", self._turn_attributes(conversation_id, stream=False)):
+            # Run agent - Agno handles history loading and saving automatically
+            try:
+                with self.agent_pool.lease(conversation_id) as agent:
+                    with span("chat.history"):
+                        await self._load_history(agent, conversation_id, message)
+                    with self.router.lease(conversation_id) as host:
+                        agent.model = host.model
+                        with span(
+                            "model.generate", self._model_attributes(host)
+                        ) as model_span:
+                            # Agno keeps stream=True on an agent once it has
+                            # streamed, so a pooled agent must be told not to
+                            started = time.perf_counter()
+                            response = await agent.arun(input=message, stream=False)
+                            elapsed = time.perf_counter() - started
+                            tokens = _output_tokens(response)
+                            if tokens is not None:
+                                model_span.set_attribute(
+                                    "gen_ai.usage.output_tokens", tokens
+                                )
+            except BaseException:
+                # A failed run may leave the cached session half-updated
+                self.db.invalidate_session(conversation_id)
+                raise
+
+            # Extract reply
+            reply = response.content if hasattr(response, "content") else str(response)
+
+            if tokens and elapsed > 0:
+                TOKENS_PER_SECOND.observe(tokens / elapsed)
+
+            # Keep the conversation summary index in step with the new run
+            await self.db.record_turn(conversation_id, message)
 
         return {
             "conversation_id": conversation_id,
@@ -91,25 +526,56 @@ class ChatbotAgent:
         self, conversation_id: str, message: str
     ) -> AsyncIterator[Dict]:
         """Handle streaming chat completion."""
-        # Create agent with PostgreSQL storage
-        agent = Agent(
-            model=self.model,
-            db=self.db,
-            session_id=conversation_id,
-            add_history_to_context=True,
-            num_history_runs=settings.max_history,
-            markdown=False,
-            description="You are a helpful AI assistant powered by Agno and Ollama.",
-        )
-
         # Stream response - Agno automatically saves to DB after completion
         full_reply = ""
-        async for chunk in agent.arun(input=message, stream=True):
-            delta = chunk.content if hasattr(chunk, "content") else str(chunk)
-            full_reply += delta
+        # Detached: the spans stay open across yields, see app.tracing
+        with span(
+            "chat.turn",
+            self._turn_attributes(conversation_id, stream=True),
+            detached=True,
+        ) as turn_span:
+            try:
+                with self.agent_pool.lease(conversation_id) as agent:
+                    with span("chat.history", parent=turn_span):
+                        await self._load_history(agent, conversation_id, message)
+                    with self.router.lease(conversation_id) as host:
+                        agent.model = host.model
+                        with span(
+                            "model.generate",
+                            self._model_attributes(host),
+                            parent=turn_span,
+                            detached=True,
+                        ) as model_span:
+                            started = time.perf_counter()
+                            chunks = 0
+                            async for chunk in agent.arun(input=message, stream=True):
+                                delta = (
+                                    chunk.content
+                                    if hasattr(chunk, "content")
+                                    else str(chunk)
+                                )
+                                if not chunks:
+                                    # Prefill ends with the first token
+                                    model_span.set_attribute(
+                                        "chat.ttft_ms",
+                                        (time.perf_counter() - started) * 1000,
+                                    )
+                                chunks += 1
+                                full_reply += delta
+
+                                # Yield delta chunk
+                                yield {"delta": delta}
+                            model_span.set_attribute(
+                                "gen_ai.usage.output_tokens", chunks
+                            )
+            except BaseException:
+                # A failed or abandoned run may leave the cached session
+                # half-updated
+                self.db.invalidate_session(conversation_id)
+                raise
 
-            # Yield delta chunk
-            yield {"delta": delta}
+            with span("chat.record_turn", parent=turn_span):
+                await self.db.record_turn(conversation_id, message)
 
         # Yield final chunk with metadata
         yield {
@@ -121,6 +587,44 @@ class ChatbotAgent:
             },
         }
 
+    @staticmethod
+    def _turn_attributes(conversation_id: str, stream: bool) -> Dict:
+        return {"chat.conversation_id": conversation_id, "chat.stream": stream}
+
+    @staticmethod
+    def _model_attributes(host: OllamaHost) -> Dict:
+        return {
+            "gen_ai.system": "ollama",
+            "gen_ai.request.model": settings.ollama_model,
+            "server.address": host.url,
+        }
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return runtime statistics for monitoring."""
+        return {
+            "warmup": self.warmup,
+            "agent_pool": self.agent_pool.stats(),
+            "ollama": self.router.stats(),
+            "generations": {
+                "cancelled": self.cancelled,
+                "timed_out": self.timed_out,
+            },
+            "scheduler": self.scheduler.stats(),
+            "history": (
+                self.history.stats() if self.history else {"enabled": False}
+            ),
+            "inflight": (
+                self.inflight.stats() if self.inflight else {"enabled": False}
+            ),
+            "response_cache": (
+                self.response_cache.stats()
+                if self.response_cache
+                else {"enabled": False}
+            ),
+            **self.db.stats(),
+        }
+
     async def cleanup(self):
         """Cleanup resources."""
-        pass  # No resources to cleanup - PostgresDb handles connections
+        # The db is owned by the app lifespan
+        await self.router.close()
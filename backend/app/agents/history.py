@@ -0,0 +1,236 @@
+"""Token-budgeted conversation history.
+
+Agno replays a fixed number of previous runs (``num_history_runs``), so a
+conversation with long messages sent an ever larger prompt and paid for it
+in prefill time on every turn. ``HistoryWindow`` picks, per turn, the most
+recent runs whose estimated size fits a token budget together with the
+system description and the new message.
+
+Runs that fall out of the window can optionally be condensed into a short
+recap that is added to the system message instead. The recap is built from
+the stored messages without calling the model, cached per conversation and
+only rebuilt when the window moves.
+
+Token counts are estimated from text length (about four characters per
+token for ASCII text, three UTF-8 bytes per token otherwise); no tokenizer
+is loaded.
+
+``HistoryWindow.fit`` runs while a turn loads its session, on the event
+loop and never on the db threads, so its recap memo and counters are kept
+without a lock.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.run.base import RunStatus
+
+# Role markers and separators Ollama's chat template adds per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Runs Agno leaves out of the history it replays
+SKIPPED_STATUSES = (RunStatus.paused, RunStatus.cancelled, RunStatus.error)
+
+RECAP_HEADER = "Summary of earlier turns in this conversation:"
+
+# Longest excerpt of a single message quoted in the recap
+RECAP_EXCERPT_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a text takes, without a tokenizer."""
+    if not text:
+        return 0
+    if text.isascii():
+        return -(-len(text) // 4)
+    return -(-len(text.encode("utf-8")) // 3)
+
+
+def history_runs(session: Any) -> List[Any]:
+    """Return the runs Agno would replay as history, oldest first."""
+    if session is None or not session.runs:
+        return []
+    return [
+        run
+        for run in session.runs
+        if getattr(run, "parent_run_id", None) is None
+        and hasattr(run, "status")
+        and run.status not in SKIPPED_STATUSES
+    ]
+
+
+def _text(content: Any) -> str:
+    if content is None:
+        return ""
+    return content if isinstance(content, str) else str(content)
+
+
+def _replayed_messages(run: Any) -> List[Any]:
+    """Return the messages of a run that Agno replays as history."""
+    return [
+        message
+        for message in run.messages or []
+        if not getattr(message, "from_history", False) and message.role != "system"
+    ]
+
+
+def run_tokens(run: Any) -> int:
+    """Estimate the tokens a run adds to the prompt when replayed."""
+    return sum(
+        estimate_tokens(_text(message.content)) + MESSAGE_OVERHEAD_TOKENS
+        for message in _replayed_messages(run)
+    )
+
+
+def _excerpt(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) <= RECAP_EXCERPT_CHARS:
+        return text
+    return text[: RECAP_EXCERPT_CHARS - 3].rstrip() + "..."
+
+
+def _recap_line(run: Any) -> Optional[str]:
+    """Condense one run into a single line, or None if it has no exchange."""
+    parts = []
+    for message in _replayed_messages(run):
+        text = _text(message.content)
+        if message.role == "user" and text:
+            parts.append(f"User: {_excerpt(text)}")
+        elif message.role == "assistant" and text:
+            parts.append(f"Assistant: {_excerpt(text)}")
+    return f"- {' / '.join(parts)}" if parts else None
+
+
+def summarize_runs(runs: List[Any], max_tokens: int) -> str:
+    """Condense runs into a recap of at most max_tokens.
+
+    Args:
+        runs: Runs to condense, oldest first
+        max_tokens: Token budget for the recap
+
+    Returns:
+        The recap, keeping the newest runs that fit (empty if none fit)
+    """
+    used = estimate_tokens(RECAP_HEADER)
+    lines: List[str] = []
+    for run in reversed(runs):
+        line = _recap_line(run)
+        if line is None:
+            continue
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > max_tokens:
+            break
+        used += tokens
+        lines.append(line)
+
+    if not lines:
+        return ""
+    return "\n".join([RECAP_HEADER] + lines[::-1])
+
+
+class HistoryWindow:
+    """Chooses how much history each turn replays under a token budget."""
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        max_runs: int,
+        recap_max_tokens: int = 0,
+        max_recaps: int = 1024,
+    ):
+        """Initialize the window.
+
+        Args:
+            budget_tokens: Prompt tokens available for the system description,
+                the history and the new message together
+            max_runs: Most runs replayed regardless of size
+            recap_max_tokens: Size of the recap replacing runs that do not
+                fit (0 disables the recap)
+            max_recaps: Conversations whose recap is kept
+        """
+        self.budget_tokens = budget_tokens
+        self.max_runs = max_runs
+        self.recap_max_tokens = recap_max_tokens
+        self.max_recaps = max_recaps
+        self._recaps: "OrderedDict[str, Tuple[Tuple[str, int], str]]" = OrderedDict()
+        self.turns = 0
+        self.trimmed = 0
+        self.history_tokens = 0
+        self.recaps_built = 0
+        self.recaps_reused = 0
+
+    def fit(
+        self, conversation_id: str, session: Any, reserved_tokens: int
+    ) -> Tuple[int, Optional[str]]:
+        """Choose the history for a conversation's next turn.
+
+        Args:
+            conversation_id: Conversation the turn belongs to
+            session: The conversation's stored session (None if new)
+            reserved_tokens: Tokens already taken by the system description
+                and the new message
+
+        Returns:
+            Number of most recent runs to replay, and the recap of older
+            runs to add to the system message (None if there is none)
+        """
+        runs = history_runs(session)
+        available = self.budget_tokens - reserved_tokens
+        kept, tokens = self._newest_fitting(runs, available)
+
+        recap = None
+        if kept < len(runs) and self.recap_max_tokens:
+            # Make room for the recap, then condense whatever no longer fits
+            kept, tokens = self._newest_fitting(runs, available - self.recap_max_tokens)
+            recap = self._recap(conversation_id, runs[: len(runs) - kept]) or None
+
+        self.turns += 1
+        self.history_tokens += tokens
+        if kept < len(runs):
+            self.trimmed += 1
+        return kept, recap
+
+    def stats(self) -> Dict[str, float]:
+        """Return budget and trimming counters."""
+        return {
+            "budget_tokens": self.budget_tokens,
+            "max_runs": self.max_runs,
+            "turns": self.turns,
+            "trimmed": self.trimmed,
+            "avg_history_tokens": (
+                self.history_tokens / self.turns if self.turns else 0.0
+            ),
+            "recaps_cached": len(self._recaps),
+            "recaps_built": self.recaps_built,
+            "recaps_reused": self.recaps_reused,
+        }
+
+    def _newest_fitting(self, runs: List[Any], available: int) -> Tuple[int, int]:
+        """Count the most recent runs that fit in available tokens."""
+        kept = 0
+        used = 0
+        for run in reversed(runs[-self.max_runs :] if self.max_runs else []):
+            tokens = run_tokens(run)
+            if used + tokens > available:
+                break
+            kept += 1
+            used += tokens
+        return kept, used
+
+    def _recap(self, conversation_id: str, runs: List[Any]) -> str:
+        """Return the recap of runs, reusing it while the window stays put."""
+        # The newest condensed run identifies the window position
+        key = (getattr(runs[-1], "run_id", None) or "", len(runs))
+        cached = self._recaps.get(conversation_id)
+        if cached is not None and cached[0] == key:
+            self._recaps.move_to_end(conversation_id)
+            self.recaps_reused += 1
+            return cached[1]
+
+        recap = summarize_runs(runs, self.recap_max_tokens)
+        self._recaps[conversation_id] = (key, recap)
+        self._recaps.move_to_end(conversation_id)
+        while len(self._recaps) > self.max_recaps:
+            self._recaps.popitem(last=False)
+        self.recaps_built += 1
+        return recap
@@ -0,0 +1,44 @@
+"""Shared HTTP client for talking to Ollama.
+
+Left to itself, Agno's ``Ollama`` model builds an ``ollama.AsyncClient``
+with httpx defaults: no timeout and a connection pool nobody sized. The
+client built here is shared by every agent, keeps connections alive
+between generations so each turn skips TCP setup, and has its pool sized
+to the number of generations we run at once.
+"""
+
+from typing import Optional
+
+import httpx
+from ollama import AsyncClient
+
+from app.config import settings
+
+
+def create_async_client(
+    host: str, read_timeout_s: Optional[float] = None, **kwargs
+) -> AsyncClient:
+    """Create a pooled, keep-alive Ollama client.
+
+    Args:
+        host: Ollama server URL
+        read_timeout_s: Read timeout (default: ``model_timeout_s``)
+        **kwargs: Extra ``httpx.AsyncClient`` arguments (e.g. a transport)
+
+    Returns:
+        Client that the owner must close with ``await client.close()``
+    """
+    return AsyncClient(
+        host=host,
+        # Read timeout bounds the wait for each response chunk
+        timeout=httpx.Timeout(
+            read_timeout_s or settings.model_timeout_s,
+            connect=settings.ollama_connect_timeout_s,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.ollama_pool_size,
+            max_keepalive_connections=settings.ollama_pool_size,
+            keepalive_expiry=settings.ollama_keepalive_expiry_s,
+        ),
+        **kwargs,
+    )
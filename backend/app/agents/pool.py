@@ -0,0 +1,78 @@
+"""Bounded LRU pool of reusable Agno agents.
+
+Every chat turn used to construct a fresh ``Agent`` with identical model,
+db, description and history settings. The pool keeps idle agents keyed by
+conversation so the next turn of the same conversation reuses one instead.
+
+Agents are leased exclusively: a lease removes the agent from the pool and
+returning it puts it back as most recently used. Concurrent turns for the
+same conversation therefore never share an agent; the extra one is simply
+built on demand and dropped when returned. Agents whose run fails or is
+cancelled are discarded rather than returned.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+from agno.agent import Agent
+
+
+class AgentPool:
+    """LRU pool of idle agents keyed by conversation ID."""
+
+    def __init__(self, factory: Callable[[str], Agent], max_size: int):
+        """Initialize the pool.
+
+        Args:
+            factory: Builds a new agent for a conversation ID
+            max_size: Maximum number of idle agents kept (0 disables pooling)
+        """
+        self._factory = factory
+        self.max_size = max_size
+        self._idle: "OrderedDict[str, Agent]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, conversation_id: str) -> Agent:
+        """Take the idle agent for a conversation, or build one."""
+        agent = self._idle.pop(conversation_id, None)
+        if agent is not None:
+            self.hits += 1
+            return agent
+
+        self.misses += 1
+        return self._factory(conversation_id)
+
+    def release(self, conversation_id: str, agent: Agent) -> None:
+        """Return an agent to the pool, evicting the least recently used."""
+        if self.max_size <= 0 or conversation_id in self._idle:
+            return
+
+        self._idle[conversation_id] = agent
+        while len(self._idle) > self.max_size:
+            self._idle.popitem(last=False)
+            self.evictions += 1
+
+    @contextmanager
+    def lease(self, conversation_id: str) -> Iterator[Agent]:
+        """Lease an agent for one run, returning it only if the run completes."""
+        agent = self.acquire(conversation_id)
+        yield agent
+        self.release(conversation_id, agent)
+
+    def stats(self) -> Dict[str, float]:
+        """Return pool size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._idle),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
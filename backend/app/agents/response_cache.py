@@ -0,0 +1,117 @@
+"""Exact-match cache of replies to history-free first turns.
+
+Many new conversations open with the same canned question, and each one
+used to cost a full generation. For turns without history the reply only
+depends on the model, the system description, the prompt and the
+generation options, so ``ResponseCache`` keeps recent replies keyed on
+exactly those, bounded by total size in bytes and by age.
+
+Replies are looked up and stored by ``ChatbotAgent`` coroutines and read
+by the async ``/stats`` endpoint, all on the event loop, so the cache keeps
+no lock.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def normalize_prompt(message: str) -> str:
+    """Collapse whitespace so trivially different prompts share an entry."""
+    return " ".join(message.split())
+
+
+def cache_key(model: str, description: str, message: str, options: Any) -> str:
+    """Build the cache key for a history-free turn.
+
+    Args:
+        model: Model ID
+        description: System description given to the agent
+        message: User prompt (normalized here)
+        options: Generation options passed to the model
+
+    Returns:
+        Hex digest identifying the turn
+    """
+    material = json.dumps(
+        [model, description, normalize_prompt(message), options],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Byte- and TTL-bounded LRU cache of replies keyed by ``cache_key``."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl_s: float = 3600.0):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total UTF-8 size of cached replies
+            ttl_s: Seconds after which an entry is no longer served
+        """
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached reply, or None on a miss or expired entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, reply, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return reply
+
+    def put(self, key: str, reply: str) -> None:
+        """Store a reply as most recently used, evicting the oldest."""
+        size = len(reply.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_s, reply, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache size and hit-rate counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
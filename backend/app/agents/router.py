@@ -0,0 +1,157 @@
+"""Routing of generations across several Ollama hosts.
+
+One model server caps throughput, so ``HostRouter`` spreads generations
+over a list of hosts. Each generation goes to the healthy host with the
+fewest outstanding requests. A conversation stays on the host that served
+its previous turn while that host is healthy and not much busier than the
+least loaded one, so the host can reuse the conversation's KV cache.
+
+Hosts that fail ``max_failures`` times in a row are ejected for
+``ejection_s`` seconds. Once that passes they get traffic again, and one
+more failure ejects them again until a request succeeds. If every host is
+ejected, the one due back first is used rather than failing outright.
+
+Hosts are leased and released around each generation by the agent's
+coroutines, so the outstanding and failure counters never change under
+another thread and are kept without a lock.
+"""
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import httpx
+from agno.models.ollama import Ollama
+from ollama import AsyncClient, ResponseError
+
+
+def is_host_failure(error: BaseException) -> bool:
+    """Return True for errors that point at the host rather than the request."""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+
+class OllamaHost:
+    """One Ollama server with its client, model and health counters."""
+
+    def __init__(self, url: str, client: AsyncClient, model: Ollama):
+        self.url = url
+        self.client = client
+        self.model = model
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        """Return True unless the host is currently ejected."""
+        return self.ejected_until <= now
+
+    def stats(self, now: float) -> Dict:
+        return {
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.failures,
+            "healthy": self.available(now),
+        }
+
+
+class HostRouter:
+    """Least-outstanding-requests router with stickiness and ejection."""
+
+    def __init__(
+        self,
+        hosts: List[OllamaHost],
+        max_failures: int = 3,
+        ejection_s: float = 30.0,
+        sticky_slack: int = 2,
+        max_sticky: int = 10000,
+    ):
+        """Initialize the router.
+
+        Args:
+            hosts: Hosts to route between (at least one)
+            max_failures: Consecutive failures before a host is ejected
+            ejection_s: Seconds an ejected host receives no traffic
+            sticky_slack: How many more outstanding requests than the least
+                loaded host a conversation's previous host may have
+            max_sticky: Conversations whose host is remembered
+        """
+        if not hosts:
+            raise ValueError("HostRouter needs at least one host")
+        self.hosts = hosts
+        self.max_failures = max_failures
+        self.ejection_s = ejection_s
+        self.sticky_slack = sticky_slack
+        self.max_sticky = max_sticky
+        self._sticky: "OrderedDict[str, OllamaHost]" = OrderedDict()
+        self._next = 0
+        self.ejections = 0
+
+    def pick(self, conversation_id: str) -> OllamaHost:
+        """Choose the host for a conversation's next generation."""
+        if len(self.hosts) == 1:
+            return self.hosts[0]
+
+        now = time.monotonic()
+        candidates = [host for host in self.hosts if host.available(now)]
+        if not candidates:
+            candidates = [min(self.hosts, key=lambda host: host.ejected_until)]
+
+        # Rotate the starting point so ties do not all land on one host
+        self._next = (self._next + 1) % len(candidates)
+        rotated = candidates[self._next :] + candidates[: self._next]
+        least = min(rotated, key=lambda host: host.outstanding)
+
+        host = self._sticky.get(conversation_id)
+        if host not in candidates or (
+            host.outstanding > least.outstanding + self.sticky_slack
+        ):
+            host = least
+
+        self._sticky[conversation_id] = host
+        self._sticky.move_to_end(conversation_id)
+        while len(self._sticky) > self.max_sticky:
+            self._sticky.popitem(last=False)
+        return host
+
+    @contextmanager
+    def lease(self, conversation_id: str) -> Iterator[OllamaHost]:
+        """Pick a host and track the generation as outstanding on it."""
+        host = self.pick(conversation_id)
+        host.outstanding += 1
+        host.requests += 1
+        try:
+            yield host
+        except Exception as e:
+            if is_host_failure(e):
+                self._record_failure(host)
+            raise
+        else:
+            host.failures = 0
+        finally:
+            host.outstanding -= 1
+
+    def stats(self) -> Dict:
+        """Return per-host load and health."""
+        now = time.monotonic()
+        return {
+            "ejections": self.ejections,
+            "hosts": {host.url: host.stats(now) for host in self.hosts},
+        }
+
+    async def close(self) -> None:
+        """Close every host's HTTP client."""
+        for host in self.hosts:
+            await host.client.close()
+
+    def _record_failure(self, host: OllamaHost) -> None:
+        host.errors += 1
+        host.failures += 1
+        if host.failures >= self.max_failures:
+            host.ejected_until = time.monotonic() + self.ejection_s
+            self.ejections += 1
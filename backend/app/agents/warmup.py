@@ -0,0 +1,85 @@
+"""Model warm-up at startup.
+
+Ollama loads a model into memory on its first request and unloads it after
+an idle period, so the first turn after a deploy or a quiet spell paid the
+full load time. ``warm_up`` loads the configured models before the app
+starts taking traffic, pins them with a ``keep_alive`` residency, and can
+run a one-token priming prompt so the first real request starts hot.
+
+Warm-up failures are reported, not raised: the app still starts and the
+first request simply pays the load time as before.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Union
+
+from ollama import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_model(
+    client: AsyncClient,
+    model: str,
+    keep_alive: Optional[Union[float, str]],
+    prompt: Optional[str],
+) -> None:
+    """Load one model and optionally prime it with a tiny prompt."""
+    # A generate request without a prompt only loads the model
+    await client.generate(model=model, keep_alive=keep_alive)
+    if prompt:
+        await client.generate(
+            model=model,
+            prompt=prompt,
+            keep_alive=keep_alive,
+            options={"num_predict": 1},
+        )
+
+
+async def warm_up(
+    client: AsyncClient,
+    models: List[str],
+    keep_alive: Optional[Union[float, str]] = None,
+    prompt: Optional[str] = None,
+    timeout_s: float = 120.0,
+) -> Dict:
+    """Load models into Ollama's memory, one after another.
+
+    Args:
+        client: Ollama client to warm up through
+        models: Models to load, primary model first
+        keep_alive: How long Ollama keeps the models resident
+        prompt: Optional priming prompt (one token is generated)
+        timeout_s: Time budget for the whole warm-up
+
+    Returns:
+        Report with overall status ("ready", "degraded" or "timeout"),
+        per-model results and duration
+    """
+    start = time.monotonic()
+    results: Dict[str, str] = {model: "pending" for model in models}
+
+    async def run() -> None:
+        for model in models:
+            try:
+                await _warm_model(client, model, keep_alive, prompt)
+                results[model] = "loaded"
+            except Exception as e:
+                results[model] = f"error: {e}"
+                logger.warning("Warm-up of model %s failed: %s", model, e)
+
+    try:
+        await asyncio.wait_for(run(), timeout_s)
+        failed = any(result != "loaded" for result in results.values())
+        status = "degraded" if failed else "ready"
+    except asyncio.TimeoutError:
+        status = "timeout"
+        logger.warning("Model warm-up timed out after %.0fs", timeout_s)
+
+    return {
+        "status": status,
+        "models": results,
+        "duration_s": round(time.monotonic() - start, 3),
+    }
@@ -0,0 +1,107 @@
+"""Bounded-concurrency execution of batch chat items.
+
+Bulk jobs used to send thousands of prompts one ``POST /chat`` at a time.
+``run_batch`` runs a whole batch inside one request: a fixed number of
+workers take items in submission order and every result is yielded as soon
+as it is ready, so a slow item never holds back the ones behind it.
+
+Items that share a key (the conversation ID) run one after another in
+their original order, because each turn's prompt includes the previous
+turns. Items without a key run independently.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (index of the item, result, error); exactly one of result/error is set
+BatchResult = Tuple[int, Optional[R], Optional[BaseException]]
+
+
+def _group(
+    items: Sequence[T], key: Callable[[T], Optional[Hashable]]
+) -> List[List[Tuple[int, T]]]:
+    """Split items into units that must run sequentially, in first-seen order."""
+    units: "OrderedDict[Hashable, List[Tuple[int, T]]]" = OrderedDict()
+    for index, item in enumerate(items):
+        unit_key = key(item)
+        if unit_key is None:
+            # Keyless items each get a unit of their own
+            unit_key = object()
+        units.setdefault(unit_key, []).append((index, item))
+    return list(units.values())
+
+
+async def run_batch(
+    items: Sequence[T],
+    func: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    key: Callable[[T], Optional[Hashable]] = lambda item: None,
+) -> AsyncIterator[BatchResult]:
+    """Run func over items with bounded concurrency, yielding as they finish.
+
+    Args:
+        items: Items to process
+        func: Processes one item
+        concurrency: Items processed at once
+        key: Returns the key of items that must run sequentially (None for
+            items that may run alongside any other)
+
+    Yields:
+        ``(index, result, error)`` per item in completion order; an item
+        whose func raised an Exception has it as error
+
+    Raises:
+        BaseException: A non-``Exception`` error other than cancellation
+            (e.g. ``SystemExit``), after its item has been yielded; the
+            worker that hit it is gone, so the batch cannot complete
+
+    Closing the iterator early cancels the items still running.
+    """
+    results: "asyncio.Queue[BatchResult]" = asyncio.Queue()
+    units = iter(_group(items, key))
+
+    async def worker() -> None:
+        # Workers share one iterator, so each unit is taken exactly once
+        for unit in units:
+            for index, item in unit:
+                try:
+                    result = await func(item)
+                except Exception as e:
+                    results.put_nowait((index, None, e))
+                except asyncio.CancelledError:
+                    raise
+                except BaseException as e:
+                    # Post it before dying, or the consumer waits forever
+                    results.put_nowait((index, None, e))
+                    raise
+                else:
+                    results.put_nowait((index, result, None))
+
+    workers = [
+        asyncio.ensure_future(worker())
+        for _ in range(min(max(concurrency, 1), len(items)))
+    ]
+    try:
+        for _ in range(len(items)):
+            index, result, error = await results.get()
+            yield index, result, error
+            if error is not None and not isinstance(error, Exception):
+                raise error
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
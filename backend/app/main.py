@@ -1,49 +1,107 @@
 """FastAPI application for Agno + Ollama chatbot.
 
 This module provides:
-- GET /healthz - Health check endpoint
+- GET /healthz - Liveness check (static, never touches dependencies)
+- GET /readyz - Readiness from the last background check of db and model
+- GET /stats - Runtime statistics (warm-up, agent pool, session cache, ...)
+- GET /metrics - Prometheus metrics (latency, TTFT, tokens/s, queue, db)
 - POST /chat - Non-streaming chat endpoint
 - POST /chat/stream - Server-sent events (SSE) streaming chat endpoint
-- GET /conversations - List all conversations
+- POST /chat/batch - Many chat turns in one request, results as NDJSON
+- GET /conversations - List conversations (keyset paginated)
 - GET /conversations/{conversation_id} - Get conversation by ID
 - DELETE /conversations/{conversation_id} - Delete conversation
 - PATCH /conversations/{conversation_id}/title - Update conversation title
 """
 
-import json
+import logging
 from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import AsyncIterator, List, Optional
 
 from agno.db.base import SessionType
-from agno.db.postgres import PostgresDb
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.chatbot_agent import ChatbotAgent, GenerationTimeout
+from app.batch import run_batch
 from app.config import settings
-
+from app.metrics import ACTIVE_STREAMS, CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from app.profiling import ProfilingMiddleware
+from app.readiness import ReadinessProbe
+from app.scheduling import SchedulerRejected
+from app.sse import encode_event, encode_line
+from app.storage import AsyncDb, SessionCache, open_storage
+from app.storage.backfill import backfill_if_incomplete
+from app.storage.conversations import decode_cursor, encode_cursor
+from app.streaming import coalesce_deltas, stop_on_disconnect
+from app.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+
+logger = logging.getLogger(__name__)
 
 # Global agent instances
 chatbot_agent: Optional[ChatbotAgent] = None
+readiness_probe: Optional[ReadinessProbe] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan (startup/shutdown)."""
-    global chatbot_agent
+    global chatbot_agent, readiness_probe
+
+    # Spans are only recorded with TRACING_ENABLED (and opentelemetry-sdk)
+    configure_tracing()
+
+    # Startup: Initialize the configured database and agents
+    # Blocking db calls run on a bounded thread pool, off the event loop
+    sync_db, summaries = open_storage(settings.storage_backend)
+    db = AsyncDb(
+        sync_db,
+        max_workers=settings.db_executor_workers,
+        summaries=summaries,
+        session_cache=(
+            SessionCache(
+                max_entries=settings.session_cache_size,
+                ttl_s=settings.session_cache_ttl_s,
+            )
+            if settings.session_cache_enabled
+            else None
+        ),
+    )
 
-    # Startup: Initialize PostgreSQL database and agents
-    db = PostgresDb(db_url=settings.database_url)
+    # Index conversations missing from the summary index, e.g. ones that
+    # predate it; the index is derived data, so a failure is not fatal
+    if summaries is not None and settings.summary_backfill_on_startup:
+        try:
+            await db.run(
+                "backfill_summaries", backfill_if_incomplete, sync_db, summaries
+            )
+        except Exception:
+            logger.exception("Summary index backfill failed")
 
     chatbot_agent = ChatbotAgent(db=db)
 
+    # Load the models before the first request instead of during it
+    if settings.warmup_enabled:
+        await chatbot_agent.warm_up()
+
+    # Checked in the background; /readyz serves the cached result
+    readiness_probe = ReadinessProbe(
+        db, chatbot_agent.router.hosts, settings.ollama_model
+    )
+    readiness_probe.start()
+
     yield
 
     # Shutdown: Cleanup resources
+    await readiness_probe.stop()
+    readiness_probe = None
     if chatbot_agent:
         await chatbot_agent.cleanup()
+    db.close()
+    shutdown_tracing()
 
 
 # FastAPI app
@@ -61,8 +119,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the browser read the pagination cursor of GET /conversations
+    expose_headers=["X-Next-Cursor"],
 )
 
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# Outermost, so request latency covers the other middleware too
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 
 # Request/Response models
 class ChatRequest(BaseModel):
@@ -83,6 +153,22 @@ class ChatResponse(BaseModel):
     usage: dict = Field(..., description="Usage statistics")
 
 
+class BatchChatRequest(BaseModel):
+    """Batch chat request body."""
+
+    items: List[ChatRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.batch_max_items,
+        description="Chat turns to run; turns sharing a conversation_id run in order",
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Items run at once (capped by the server's batch_concurrency)",
+    )
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
 
@@ -122,10 +208,62 @@ class UpdateTitleRequest(BaseModel):
     title: str = Field(..., description="New conversation title")
 
 
+def _isoformat(timestamp: Optional[int]) -> Optional[str]:
+    """Convert an epoch timestamp to an ISO format string."""
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def _rejected(error: SchedulerRejected) -> HTTPException:
+    """Turn a scheduler rejection into a retryable HTTP error."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+def _batch_error(index: int, error: BaseException) -> dict:
+    """Describe a failed batch item the way /chat would have answered it."""
+    if isinstance(error, SchedulerRejected):
+        return {
+            "index": index,
+            "status": error.status_code,
+            "error": str(error),
+            "retry_after": error.retry_after,
+        }
+    if isinstance(error, GenerationTimeout):
+        return {"index": index, "status": 504, "error": str(error)}
+    return {"index": index, "status": 500, "error": f"Chat error: {str(error)}"}
+
+
+def _fallback_title(content: Optional[str]) -> str:
+    """Derive a conversation title from its first user message."""
+    if not content:
+        return "New Chat"
+    return content[:50] + ("..." if len(content) > 50 else "")
+
+
+async def _list_all_conversations() -> List[dict]:
+    """Read every conversation summary row, walking the keyset pages."""
+    page_size = settings.conversations_max_page_size
+    rows: List[dict] = []
+    position = None
+    while True:
+        page = await chatbot_agent.db.list_conversations(
+            limit=page_size, cursor=position
+        )
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        position = (page[-1]["updated_at"], page[-1]["session_id"])
+
+
 # Endpoints
 @app.get("/healthz", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
-    """Health check endpoint.
+    """Health check endpoint (liveness; see /readyz for dependencies).
 
     Returns:
         Service status and configuration info
@@ -134,10 +272,63 @@ async def health_check() -> HealthResponse:
         status="ok",
         environment=settings.env.value,
         model=settings.ollama_model,
-        database="postgresql",
+        database=settings.storage_backend.value,
     )
 
 
+@app.get("/readyz")
+async def readiness_check(response: Response) -> dict:
+    """Readiness check endpoint.
+
+    Serves the last background check without touching the database or
+    Ollama, so it can be polled as often as needed.
+
+    Returns:
+        Readiness report with the measured db and model latencies; the
+        status is 503 when not ready
+    """
+    if readiness_probe is None:
+        response.status_code = 503
+        return {"ready": False, "reason": "starting"}
+
+    report = readiness_probe.report()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+
+@app.get("/stats")
+async def runtime_stats() -> dict:
+    """Runtime statistics for monitoring.
+
+    Returns:
+        Counters and sizes of in-process pools and caches
+
+    Raises:
+        HTTPException: If agent is not initialized
+    """
+    if chatbot_agent is None:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    return chatbot_agent.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Prometheus metrics for the chat pipeline.
+
+    Returns:
+        Metrics in the Prometheus text exposition format
+
+    Raises:
+        HTTPException: If metrics are disabled
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """Non-streaming chat endpoint.
@@ -149,7 +340,9 @@ async def chat(request: ChatRequest) -> ChatResponse:
         Complete chat response with conversation_id and reply
 
     Raises:
-        HTTPException: If agent is not initialized or error occurs
+        HTTPException: If agent is not initialized, the model is overloaded
+            (429/503 with Retry-After), the model times out (504), or error
+            occurs
     """
     if chatbot_agent is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
@@ -161,44 +354,79 @@ async def chat(request: ChatRequest) -> ChatResponse:
             stream=False,
         )
         return ChatResponse(**response)
+    except SchedulerRejected as e:
+        raise _rejected(e)
+    except GenerationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest) -> StreamingResponse:
+async def chat_stream(request: ChatRequest, http_request: Request) -> StreamingResponse:
     """Server-sent events (SSE) streaming chat endpoint.
 
+    The generation is cancelled when the client disconnects, and ends with
+    an error event if the model runs past model_timeout_s.
+
     Args:
         request: Chat request with message and optional conversation_id
+        http_request: Underlying HTTP request, watched for disconnects
 
     Returns:
         StreamingResponse with SSE events
 
     Raises:
-        HTTPException: If agent is not initialized or error occurs
+        HTTPException: If agent is not initialized or the model is overloaded
+            (429/503 with Retry-After); other errors are sent as SSE events
     """
     if chatbot_agent is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
-    async def event_generator() -> AsyncIterator[str]:
+    # Admission happens before the response starts so it can still be rejected
+    response_stream: Optional[AsyncIterator[dict]] = None
+    chat_error: Optional[Exception] = None
+    try:
+        response_stream = await chatbot_agent.chat(
+            message=request.message,
+            conversation_id=request.conversation_id,
+            stream=True,
+        )
+    except SchedulerRejected as e:
+        raise _rejected(e)
+    except Exception as e:
+        chat_error = e
+
+    async def event_generator() -> AsyncIterator[bytes]:
         """Generate SSE events from agent stream."""
+        ACTIVE_STREAMS.inc()
         try:
-            response_stream = await chatbot_agent.chat(
-                message=request.message,
-                conversation_id=request.conversation_id,
-                stream=True,
+            if chat_error is not None:
+                raise chat_error
+
+            # Stop generating once nobody is listening
+            chunks = stop_on_disconnect(
+                response_stream,
+                http_request.is_disconnected,
+                interval_s=settings.disconnect_check_interval_s,
             )
 
-            async for chunk in response_stream:
+            # Fewer, larger frames; the first token is still sent at once
+            chunks = coalesce_deltas(
+                chunks,
+                interval_ms=settings.stream_coalesce_ms,
+                max_bytes=settings.stream_coalesce_bytes,
+            )
+
+            async for chunk in chunks:
                 # Format as SSE event
-                data = json.dumps(chunk)
-                yield f"data: {data}\n\n"
+                yield encode_event(chunk)
 
         except Exception as e:
             # Send error as SSE event
-            error_data = json.dumps({"error": str(e), "done": True})
-            yield f"data: {error_data}\n\n"
+            yield encode_event({"error": str(e), "done": True})
+        finally:
+            ACTIVE_STREAMS.dec()
 
     return StreamingResponse(
         event_generator(),
@@ -211,98 +439,137 @@ async def chat_stream(request: ChatRequest) -> StreamingResponse:
     )
 
 
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest) -> StreamingResponse:
+    """Batch chat endpoint for bulk offline workloads.
+
+    Items run through the same admission control as /chat, a bounded number
+    at a time, and each result is streamed as one NDJSON line as soon as it
+    is ready. Lines therefore arrive in completion order; each carries the
+    ``index`` of its item. Successful lines hold the /chat response fields,
+    failed ones ``status`` and ``error`` (plus ``retry_after`` for 429/503).
+
+    Args:
+        request: Items to run and optional concurrency
+
+    Returns:
+        StreamingResponse with one JSON object per line
+
+    Raises:
+        HTTPException: If agent is not initialized
+    """
+    if chatbot_agent is None:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    agent = chatbot_agent
+    concurrency = min(
+        request.concurrency or settings.batch_concurrency,
+        settings.batch_concurrency,
+    )
+
+    async def run_item(item: ChatRequest) -> dict:
+        response = await agent.chat(
+            message=item.message,
+            conversation_id=item.conversation_id,
+            stream=False,
+        )
+        return ChatResponse(**response).model_dump()
+
+    async def line_generator() -> AsyncIterator[bytes]:
+        """Generate one NDJSON line per finished item."""
+        # Closing the generator (client gone) cancels the items still running
+        results = run_batch(
+            request.items,
+            run_item,
+            concurrency,
+            key=lambda item: item.conversation_id,
+        )
+        try:
+            async for index, response, error in results:
+                if error is None:
+                    yield encode_line({"index": index, **response})
+                else:
+                    yield encode_line(_batch_error(index, error))
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(
+        line_generator(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable nginx buffering
+        },
+    )
+
+
 @app.get("/conversations", response_model=List[ConversationSummary])
-async def list_conversations() -> List[ConversationSummary]:
-    """List all conversations.
+async def list_conversations(
+    response: Response,
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.conversations_max_page_size,
+        description="Maximum number of conversations to return (every "
+        "conversation when neither limit nor cursor is given)",
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Value of X-Next-Cursor from the previous page"
+    ),
+) -> List[ConversationSummary]:
+    """List conversations, newest first, one keyset page at a time.
+
+    Without ``limit`` or ``cursor`` every conversation is returned, for
+    clients that do not page.
+
+    Args:
+        response: Response used to set the X-Next-Cursor header
+        limit: Maximum number of conversations to return (defaults to
+            conversations_page_size when paging with a cursor)
+        cursor: Opaque cursor returned by the previous page
 
     Returns:
-        List of conversation summaries with metadata
+        List of conversation summaries with metadata. When more pages exist,
+        the X-Next-Cursor response header holds the cursor for the next one.
 
     Raises:
-        HTTPException: If agent is not initialized or error occurs
+        HTTPException: If agent is not initialized, cursor is invalid, or error occurs
     """
     if chatbot_agent is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
     try:
-        # Get all agent sessions from database
-        sessions = chatbot_agent.db.get_sessions(
-            session_type=SessionType.AGENT
-        )
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Convert to conversation summaries
-        summaries = []
-        for session in sessions:
-            # Get chat history from session
-            chat_history = session.get_chat_history()
-
-            # Count only user and assistant messages (exclude system)
-            message_count = 0
-            if chat_history:
-                for msg in chat_history:
-                    role = None
-                    if hasattr(msg, "role"):
-                        role = msg.role
-                    elif isinstance(msg, dict):
-                        role = msg.get("role")
-
-                    if role in ["user", "assistant"]:
-                        message_count += 1
-
-            # Get title from session_data if available, or use first user message
-            title = "New Chat"
-            if session.session_data and isinstance(session.session_data, dict):
-                title = session.session_data.get("name", title)
-
-            # If no custom title, use first user message
-            if title == "New Chat" and chat_history and len(chat_history) > 0:
-                for msg in chat_history:
-                    msg_role = None
-                    msg_content = None
-                    if hasattr(msg, "role"):
-                        msg_role = msg.role
-                        msg_content = getattr(msg, "content", "")
-                    elif isinstance(msg, dict):
-                        msg_role = msg.get("role")
-                        msg_content = msg.get("content", "")
-
-                    if msg_role == "user" and msg_content:
-                        title = msg_content[:50] + (
-                            "..." if len(msg_content) > 50 else ""
-                        )
-                        break
-
-            # Convert timestamps (epoch integers) to ISO format strings
-            created_at_str = None
-            if session.created_at:
-                from datetime import datetime
-
-                created_at_str = datetime.fromtimestamp(
-                    session.created_at
-                ).isoformat()
-
-            updated_at_str = None
-            if session.updated_at:
-                from datetime import datetime
-
-                updated_at_str = datetime.fromtimestamp(
-                    session.updated_at
-                ).isoformat()
-
-            summaries.append(
-                ConversationSummary(
-                    conversation_id=session.session_id,
-                    title=title,
-                    message_count=message_count,
-                    created_at=created_at_str,
-                    updated_at=updated_at_str,
-                )
+    try:
+        # Summary columns only, ordered and paginated by the database
+        if limit is None and position is None:
+            rows = await _list_all_conversations()
+        else:
+            limit = limit or settings.conversations_page_size
+            rows = await chatbot_agent.db.list_conversations(
+                limit=limit, cursor=position
             )
 
-        # Sort by updated_at in descending order (newest first)
-        summaries.sort(
-            key=lambda x: x.updated_at if x.updated_at else "", reverse=True
-        )
+        summaries = [
+            ConversationSummary(
+                conversation_id=row["session_id"],
+                title=row.get("name")
+                or _fallback_title(row.get("first_user_message")),
+                message_count=row.get("message_count") or 0,
+                created_at=_isoformat(row.get("created_at")),
+                updated_at=_isoformat(row.get("updated_at")),
+            )
+            for row in rows
+        ]
+
+        if limit is not None and len(rows) == limit:
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                last["updated_at"], last["session_id"]
+            )
 
         return summaries
     except Exception as e:
@@ -329,7 +596,7 @@ async def get_conversation(conversation_id: str) -> ConversationDetail:
 
     try:
         # Read session from database
-        session = chatbot_agent.db.get_session(
+        session = await chatbot_agent.db.get_session(
             session_id=conversation_id, session_type=SessionType.AGENT
         )
 
@@ -369,30 +636,14 @@ async def get_conversation(conversation_id: str) -> ConversationDetail:
                 isinstance(first_message, dict)
                 and first_message.get("role") == "user"
             ):
-                content = first_message.get("content", "")
-                title = content[:50] + ("..." if len(content) > 50 else "")
-
-        # Convert timestamps (epoch integers) to ISO format strings
-        from datetime import datetime
-
-        created_at_str = None
-        if session.created_at:
-            created_at_str = datetime.fromtimestamp(
-                session.created_at
-            ).isoformat()
-
-        updated_at_str = None
-        if session.updated_at:
-            updated_at_str = datetime.fromtimestamp(
-                session.updated_at
-            ).isoformat()
+                title = _fallback_title(first_message.get("content", ""))
 
         return ConversationDetail(
             conversation_id=session.session_id,
             title=title,
             messages=messages,
-            created_at=created_at_str,
-            updated_at=updated_at_str,
+            created_at=_isoformat(session.created_at),
+            updated_at=_isoformat(session.updated_at),
         )
     except HTTPException:
         raise
@@ -420,7 +671,7 @@ async def delete_conversation(conversation_id: str) -> dict:
 
     try:
         # Delete session from database
-        chatbot_agent.db.delete_session(conversation_id)
+        await chatbot_agent.db.delete_session(conversation_id)
 
         return {"status": "success", "conversation_id": conversation_id}
     except Exception as e:
@@ -450,7 +701,7 @@ async def update_conversation_title(
 
     try:
         # Get the session
-        session = chatbot_agent.db.get_session(
+        session = await chatbot_agent.db.get_session(
             session_id=conversation_id, session_type=SessionType.AGENT
         )
 
@@ -466,7 +717,8 @@ async def update_conversation_title(
         session.session_data["name"] = request.title
 
         # Upsert the session back to the database
-        chatbot_agent.db.upsert_session(session)
+        await chatbot_agent.db.upsert_session(session)
+        await chatbot_agent.db.set_conversation_title(session, request.title)
 
         return {
             "status": "success",
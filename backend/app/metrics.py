@@ -0,0 +1,257 @@
+"""Prometheus metrics for the chat pipeline.
+
+A small, dependency-free implementation of the two metric types the
+backend needs (histograms and gauges) and of the Prometheus text
+exposition format served at ``GET /metrics``.
+
+Histograms and gauges update under a lock of their own: the connection
+pool records checkout times from the db executor threads while everything
+else is recorded on the event loop.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast cached reply to a long generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative histogram, optionally split by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: non-cumulative count per bucket (+Inf last), sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        # Pool checkouts are observed from the db executor threads
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Record one value.
+
+        Args:
+            value: Observed value
+            *labelvalues: One value per label name, in order
+        """
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labelvalues)
+            if counts is None:
+                if len(labelvalues) != len(self.labelnames):
+                    raise ValueError(f"{self.name} expects labels {self.labelnames}")
+                counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+                self._sums[labelvalues] = 0.0
+            counts[bucket] += 1
+            self._sums[labelvalues] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [
+                (labelvalues, list(counts), self._sums[labelvalues])
+                for labelvalues, counts in sorted(self._counts.items())
+            ]
+        lines = []
+        for labelvalues, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                labels = _labels(self.labelnames, labelvalues, le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value that goes up and down, or is read from a function when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """Read the value from function at scrape time (None to stop)."""
+        self._function = function
+
+    def render(self) -> List[str]:
+        value = self._function() if self._function is not None else self.value
+        return [f"{self.name} {_number(value)}"]
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Add a metric and return it."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        """Return every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram(
+        "chatbot_http_request_duration_seconds",
+        "HTTP request latency until the last response byte, by route",
+        ["method", "route", "status"],
+    )
+)
+TIME_TO_FIRST_TOKEN = REGISTRY.register(
+    Histogram(
+        "chatbot_time_to_first_token_seconds",
+        "Time from admission request to the first streamed token",
+    )
+)
+TOKENS_PER_SECOND = REGISTRY.register(
+    Histogram(
+        "chatbot_generation_tokens_per_second",
+        "Output tokens per second of completed generations",
+        buckets=TOKEN_RATE_BUCKETS,
+    )
+)
+QUEUE_WAIT = REGISTRY.register(
+    Histogram(
+        "chatbot_generation_queue_wait_seconds",
+        "Time admitted generations waited for a model slot",
+    )
+)
+DB_LATENCY = REGISTRY.register(
+    Histogram(
+        "chatbot_db_call_duration_seconds",
+        "Database call latency including the wait for a db thread, by operation",
+        ["operation"],
+        buckets=DB_BUCKETS,
+    )
+)
+DB_POOL_ACQUIRE = REGISTRY.register(
+    Histogram(
+        "chatbot_db_pool_acquire_seconds",
+        "Time to check a connection out of the database pool",
+        buckets=DB_BUCKETS,
+    )
+)
+ACTIVE_STREAMS = REGISTRY.register(
+    Gauge("chatbot_active_streams", "SSE chat streams currently open")
+)
+INFLIGHT_GENERATIONS = REGISTRY.register(
+    Gauge("chatbot_inflight_generations", "Generations holding a model slot")
+)
+QUEUED_GENERATIONS = REGISTRY.register(
+    Gauge("chatbot_queued_generations", "Generations waiting for a model slot")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by method, route and status.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware``, so streamed
+    responses pass through untouched; streams are timed until their last
+    chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp, histogram: Histogram = REQUEST_LATENCY):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        observed = False
+
+        def observe() -> None:
+            nonlocal observed
+            observed = True
+            # The route template, not the raw path, keeps label sets bounded
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                str(status),
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe()
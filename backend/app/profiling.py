@@ -0,0 +1,183 @@
+"""On-demand profiling of individual requests.
+
+With ``PROFILING_ENABLED=true`` a request is profiled when it carries an
+``X-Profile-Token`` header matching ``profiling_token``, or at random with
+``profiling_sample_rate``. The profiler runs until the last response byte
+is sent, so a ``/chat/stream`` profile covers the whole generation, and the
+result is written to ``profiling_dir`` under a name holding the route, the
+conversation ID and the request's timings. The response carries an
+``X-Profile-Id`` header that also appears in the file name.
+
+pyinstrument is used when it is installed (sampling, async-aware, HTML
+output); otherwise the stdlib's deterministic cProfile (``.prof`` files for
+``pstats`` or snakeviz). Either profiles the whole process, so only one
+request is profiled at a time and its profile also shows work done for
+requests running alongside it.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - only taken when pyinstrument is missing
+    pyinstrument = None
+
+TOKEN_HEADER = b"x-profile-token"
+ID_HEADER = b"x-profile-id"
+
+# Request bytes inspected for the conversation ID
+_BODY_PEEK_BYTES = 4096
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _safe(value: str, limit: int = 64) -> str:
+    """Make a value usable inside a file name."""
+    return _UNSAFE.sub("_", value).strip("_")[:limit] or "none"
+
+
+def _conversation_id(scope: Scope, body: bytes) -> str:
+    """Find the request's conversation ID in its path or JSON body."""
+    conversation_id = scope.get("path_params", {}).get("conversation_id")
+    if conversation_id is None and body.lstrip().startswith(b"{"):
+        try:
+            conversation_id = json.loads(body).get("conversation_id")
+        except ValueError:
+            pass
+    return str(conversation_id) if conversation_id else "new"
+
+
+class _Profiler:
+    """Start/stop wrapper over pyinstrument or cProfile."""
+
+    def __init__(self):
+        if pyinstrument is not None:
+            self._profiler: Any = pyinstrument.Profiler(async_mode="disabled")
+            self.extension = "html"
+        else:
+            self._profiler = cProfile.Profile()
+            self.extension = "prof"
+
+    def start(self) -> None:
+        if pyinstrument is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if pyinstrument is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, path: str) -> None:
+        """Write the profile (blocking)."""
+        if pyinstrument is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(path)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it or are sampled."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._active = False
+        self.profiled = 0
+        self.skipped = 0
+
+    def _wanted(self, scope: Scope) -> bool:
+        """Return True if the request asks to be profiled or is sampled."""
+        token = settings.profiling_token
+        if token:
+            for name, value in scope["headers"]:
+                if name == TOKEN_HEADER:
+                    # Constant-time comparison of the shared secret
+                    return hmac.compare_digest(value, token.encode())
+        rate = settings.profiling_sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        if self._active:
+            # The profilers are process-wide; one request at a time
+            self.skipped += 1
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._active = False
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id = uuid.uuid4().hex[:12]
+        body = bytearray()
+        first_byte_at: Optional[float] = None
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < _BODY_PEEK_BYTES:
+                body.extend(message.get("body", b"")[: _BODY_PEEK_BYTES - len(body)])
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal first_byte_at
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((ID_HEADER, profile_id.encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and first_byte_at is None:
+                first_byte_at = time.perf_counter()
+            await send(message)
+
+        profiler = _Profiler()
+        started_at = time.time()
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            profiler.stop()
+            end = time.perf_counter()
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            ttfb_ms = ((first_byte_at or end) - start) * 1000
+            name = "-".join(
+                [
+                    time.strftime("%Y%m%dT%H%M%S", time.gmtime(started_at)),
+                    scope["method"],
+                    _safe(route),
+                    _safe(_conversation_id(scope, bytes(body))),
+                    f"ttfb{ttfb_ms:.0f}ms",
+                    f"total{(end - start) * 1000:.0f}ms",
+                    profile_id,
+                ]
+            )
+            path = os.path.join(settings.profiling_dir, f"{name}.{profiler.extension}")
+            # Writing can take a while for big profiles; keep it off the loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write, profiler, path
+            )
+            self.profiled += 1
+
+    @staticmethod
+    def _write(profiler: _Profiler, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        profiler.write(path)
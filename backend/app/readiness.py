@@ -0,0 +1,172 @@
+"""Cached readiness probe.
+
+``/healthz`` only says the process is up. ``/readyz`` says whether it can
+serve a chat turn: the database answers and the model is loaded on at least
+one Ollama host. Checking that on every probe request would put orchestrator
+polling on the database and Ollama, so ``ReadinessProbe`` checks in the
+background every ``readiness_interval_s`` and ``/readyz`` serves the last
+report, including the measured latencies.
+
+The model check uses Ollama's ``ps`` (and ``list`` when the model is not
+loaded), never a generation, and only reports what it finds. A model that
+was unloaded after ``ollama_keep_alive`` of idleness is reported as
+``unloaded`` and left alone, so polling does not keep it resident. Only with
+``readiness_reload_models`` does the probe load it again (``loading``).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.agents.router import OllamaHost
+from app.config import settings
+from app.storage import AsyncDb
+
+logger = logging.getLogger(__name__)
+
+# Reports older than this many intervals mean the probe loop is stuck
+STALE_INTERVALS = 3
+
+
+def _model_names(response: Any) -> List[str]:
+    return [model.model for model in response.models]
+
+
+def _same_model(name: str, model: str) -> bool:
+    """Compare model names, treating a missing tag as ``:latest``."""
+
+    def tagged(value: str) -> str:
+        return value if ":" in value else f"{value}:latest"
+
+    return tagged(name) == tagged(model)
+
+
+class ReadinessProbe:
+    """Periodically checks the database and the model, caching the result."""
+
+    def __init__(self, db: AsyncDb, hosts: List[OllamaHost], model: str):
+        """Initialize the probe.
+
+        Args:
+            db: Storage to check with a round trip
+            hosts: Ollama hosts expected to serve ``model``
+            model: Model that must be available
+        """
+        self.db = db
+        self.hosts = hosts
+        self.model = model
+        self.checks = 0
+        self._report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reloads: Dict[str, asyncio.Task] = {}
+
+    async def _timed(self, awaitable: Any) -> Tuple[Any, float]:
+        """Await with the probe timeout, returning (result, milliseconds)."""
+        start = time.perf_counter()
+        result = await asyncio.wait_for(awaitable, settings.readiness_timeout_s)
+        return result, round((time.perf_counter() - start) * 1000, 2)
+
+    async def check_database(self) -> Dict[str, Any]:
+        """Check that the database answers a trivial query."""
+        try:
+            _, latency_ms = await self._timed(self.db.ping())
+        except Exception as e:
+            return {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        return {"status": "ok", "latency_ms": latency_ms}
+
+    async def check_host(self, host: OllamaHost) -> Dict[str, Any]:
+        """Check whether a host has the model loaded."""
+        try:
+            running, latency_ms = await self._timed(host.client.ps())
+            if any(_same_model(name, self.model) for name in _model_names(running)):
+                return {"status": "loaded", "latency_ms": latency_ms}
+            installed, _ = await self._timed(host.client.list())
+        except Exception as e:
+            return {"status": "unreachable", "error": f"{type(e).__name__}: {e}"}
+
+        if not any(_same_model(name, self.model) for name in _model_names(installed)):
+            return {"status": "missing", "latency_ms": latency_ms}
+        if not settings.readiness_reload_models:
+            return {"status": "unloaded", "latency_ms": latency_ms}
+        self._reload(host)
+        return {"status": "loading", "latency_ms": latency_ms}
+
+    def _reload(self, host: OllamaHost) -> None:
+        """Load the model on a host in the background, once at a time."""
+        task = self._reloads.get(host.url)
+        if task is not None and not task.done():
+            return
+
+        async def load() -> None:
+            try:
+                # A generate request without a prompt only loads the model
+                await host.client.generate(
+                    model=self.model, keep_alive=settings.ollama_keep_alive or None
+                )
+            except Exception as e:
+                logger.warning("Reloading %s on %s failed: %s", self.model, host.url, e)
+
+        self._reloads[host.url] = asyncio.ensure_future(load())
+
+    async def check(self) -> Dict[str, Any]:
+        """Run every check now and cache the report."""
+        database, *hosts = await asyncio.gather(
+            self.check_database(), *(self.check_host(host) for host in self.hosts)
+        )
+        ready_statuses = (
+            ("loaded",)
+            if settings.readiness_require_model_loaded
+            else ("loaded", "unloaded", "loading")
+        )
+        model_ready = any(host["status"] in ready_statuses for host in hosts)
+
+        self.checks += 1
+        self._report = {
+            "ready": database["status"] == "ok" and model_ready,
+            "checked_at": time.time(),
+            "database": database,
+            "model": {
+                "name": self.model,
+                "hosts": {host.url: report for host, report in zip(self.hosts, hosts)},
+            },
+        }
+        return self._report
+
+    def report(self) -> Dict[str, Any]:
+        """Return the cached report without checking anything.
+
+        A missing or stale report (the probe loop is stuck) is not ready.
+        """
+        if self._report is None:
+            return {"ready": False, "reason": "not checked yet"}
+
+        age_s = time.time() - self._report["checked_at"]
+        report = {**self._report, "age_s": round(age_s, 3)}
+        if age_s > settings.readiness_interval_s * STALE_INTERVALS:
+            report.update(ready=False, reason="stale")
+        return report
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Readiness check failed")
+            await asyncio.sleep(settings.readiness_interval_s)
+
+    def start(self) -> None:
+        """Start checking in the background, beginning immediately."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background checks and pending reloads."""
+        tasks = [self._task, *self._reloads.values()]
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in tasks if t is not None), return_exceptions=True
+        )
+        self._task = None
+        self._reloads.clear()
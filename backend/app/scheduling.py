@@ -0,0 +1,214 @@
+"""Admission control and fair scheduling of model generations.
+
+Ollama serves a handful of generations in parallel at most; every request
+beyond that queues inside the model server where all users slow down
+together. ``GenerationScheduler`` caps how many generations run at once and
+holds the rest in a bounded wait queue, so overload turns into fast,
+retryable rejections instead of collapsing latency for everyone.
+
+Waiters are grouped by conversation and served round-robin: a conversation
+with many queued turns gets one slot before every other waiting
+conversation has had one.
+
+Queued turns wait on asyncio futures, so the scheduler is bound to one
+event loop and its queues and slot count are updated without a lock.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+
+class SchedulerRejected(Exception):
+    """A generation was not admitted; the client should retry later."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(SchedulerRejected):
+    """The wait queue is full."""
+
+    status_code = 429
+
+
+class QueueTimeout(SchedulerRejected):
+    """A queued generation did not get a slot in time."""
+
+    status_code = 503
+
+
+class Ticket:
+    """A granted generation slot; release it exactly once when done."""
+
+    def __init__(self, scheduler: "GenerationScheduler", wait_s: float):
+        self._scheduler = scheduler
+        self._started_at = time.monotonic()
+        self._released = False
+        self.wait_s = wait_s
+
+    def release(self) -> None:
+        """Give the slot back to the scheduler (idempotent)."""
+        if self._released:
+            return
+        self._released = True
+        self._scheduler._release(time.monotonic() - self._started_at)
+
+
+class GenerationScheduler:
+    """Concurrency limit with a bounded, per-conversation fair wait queue."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout_s: float):
+        """Initialize the scheduler.
+
+        Args:
+            max_concurrency: Generations allowed to run at once
+            max_queue: Generations allowed to wait for a slot (0 rejects
+                as soon as all slots are busy)
+            queue_timeout_s: Longest a generation may wait for a slot
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.active = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+        # Moving average of how long a generation holds its slot
+        self._avg_service_s: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        """Number of generations waiting for a slot."""
+        return self._queued
+
+    def retry_after(self) -> int:
+        """Estimate in whole seconds when a slot is likely to be free."""
+        if self._avg_service_s is None:
+            return 1
+        rounds = (self._queued + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(self._avg_service_s * rounds))
+
+    async def acquire(self, conversation_id: str) -> Ticket:
+        """Wait for a generation slot.
+
+        Args:
+            conversation_id: Conversation the generation belongs to; waiters
+                are served round-robin across conversations
+
+        Returns:
+            Ticket to release once the generation has finished
+
+        Raises:
+            QueueFull: If the wait queue is full
+            QueueTimeout: If no slot became free within queue_timeout_s
+        """
+        if self.active < self.max_concurrency and not self._queued:
+            self.active += 1
+            return self._admit(0.0)
+
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(
+                "Too many queued requests, please retry later",
+                retry_after=self.retry_after(),
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(conversation_id, deque()).append(future)
+        self._queued += 1
+        start = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_s)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as the wait gave up; pass it on
+                self._release(None)
+            else:
+                future.cancel()
+                self._discard(conversation_id, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise QueueTimeout(
+                    "Timed out waiting for the model, please retry later",
+                    retry_after=self.retry_after(),
+                ) from None
+            raise
+
+        return self._admit(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def slot(self, conversation_id: str) -> AsyncIterator[Ticket]:
+        """Hold a generation slot for the duration of the block."""
+        ticket = await self.acquire(conversation_id)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Return concurrency, queue depth and wait-time counters."""
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "waiting_conversations": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": (
+                self._total_wait_s / self.admitted * 1000 if self.admitted else 0.0
+            ),
+            "max_wait_ms": self._max_wait_s * 1000,
+        }
+
+    def _admit(self, wait_s: float) -> Ticket:
+        self.admitted += 1
+        self._total_wait_s += wait_s
+        self._max_wait_s = max(self._max_wait_s, wait_s)
+        return Ticket(self, wait_s)
+
+    def _release(self, service_s: Optional[float]) -> None:
+        """Free a slot and hand it to the next conversation in line."""
+        if service_s is not None:
+            self._avg_service_s = (
+                service_s
+                if self._avg_service_s is None
+                else 0.8 * self._avg_service_s + 0.2 * service_s
+            )
+
+        while self._waiters:
+            conversation_id, waiters = self._waiters.popitem(last=False)
+            future = waiters.popleft()
+            if waiters:
+                # Back of the line until every other conversation had a turn
+                self._waiters[conversation_id] = waiters
+            self._queued -= 1
+            if not future.done():
+                # The slot moves to the waiter without becoming free
+                future.set_result(None)
+                return
+
+        self.active -= 1
+
+    def _discard(self, conversation_id: str, future: asyncio.Future) -> None:
+        """Remove an abandoned waiter from the queue."""
+        waiters = self._waiters.get(conversation_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        self._queued -= 1
+        if not waiters:
+            del self._waiters[conversation_id]
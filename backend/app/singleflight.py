@@ -0,0 +1,197 @@
+"""Single-flight coalescing of identical in-flight chat turns.
+
+Clients and retrying proxies sometimes send the same message for the same
+conversation twice within milliseconds. Without coalescing each copy starts
+its own generation, takes its own model slot and writes its own run.
+``SingleFlight`` lets the duplicate attach to the generation already in
+flight instead:
+
+- ``call`` shares one awaitable result between every caller of a key.
+- ``stream`` runs the chunk stream in a background producer and fans it
+  out; every subscriber replays the chunks produced so far, then follows
+  live, so a late duplicate still receives the complete response.
+
+A generation is cancelled only once every caller attached to it has gone.
+Keys are forgotten as soon as their generation finishes, so the same
+message sent again later is a new turn.
+
+Followers await the leader's asyncio task, so a ``SingleFlight`` belongs to
+one event loop and its key maps are plain dicts.
+"""
+
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+)
+
+
+class _Call:
+    """A shared non-streaming call."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    """A shared chunk stream with a replay buffer."""
+
+    def __init__(self) -> None:
+        self.started: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.chunks: List[Dict] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, chunk: Optional[Dict] = None) -> None:
+        """Wake every subscriber, optionally after appending a chunk."""
+        if chunk is not None:
+            self.chunks.append(chunk)
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls and streams that share a key."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _Stream] = {}
+        self.coalesced = 0
+
+    async def call(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``func()``, sharing the result with concurrent callers of key.
+
+        Args:
+            key: Identity of the call
+            func: Starts the call; only invoked when no call for key is running
+
+        Returns:
+            The shared result (exceptions are shared as well)
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Nobody is left to receive the result
+                call.task.cancel()
+                self._forget(self._calls, key, call)
+
+    async def stream(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[AsyncIterator[Dict]]],
+    ) -> AsyncIterator[Dict]:
+        """Subscribe to the chunk stream for key, starting it if needed.
+
+        Args:
+            key: Identity of the stream
+            factory: Returns the chunk stream; only invoked when no stream for
+                key is running. Errors it raises (e.g. admission rejections)
+                are raised here, before any chunk is returned.
+
+        Returns:
+            Iterator over every chunk of the stream, from the first one
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Stream()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._produce(key, flight, factory))
+        else:
+            self.coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            await asyncio.shield(flight.started)
+        except BaseException:
+            self._leave(key, flight)
+            raise
+        return self._subscribe(key, flight)
+
+    def stats(self) -> Dict[str, int]:
+        """Return in-flight and coalesced counts."""
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "coalesced": self.coalesced,
+        }
+
+    async def _produce(
+        self,
+        key: Hashable,
+        flight: _Stream,
+        factory: Callable[[], Awaitable[AsyncIterator[Dict]]],
+    ) -> None:
+        """Run the stream once and publish its chunks to every subscriber."""
+        try:
+            try:
+                chunks = await factory()
+            except asyncio.CancelledError:
+                flight.started.cancel()
+                raise
+            except Exception as e:
+                flight.started.set_exception(e)
+                return
+            flight.started.set_result(None)
+
+            try:
+                async for chunk in chunks:
+                    flight.publish(chunk)
+            except Exception as e:
+                flight.error = e
+            finally:
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        finally:
+            flight.finished = True
+            flight.publish()
+            self._forget(self._streams, key, flight)
+
+    async def _subscribe(self, key: Hashable, flight: _Stream) -> AsyncIterator[Dict]:
+        """Replay the buffered chunks, then follow the live stream."""
+        position = 0
+        try:
+            while True:
+                while position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                if flight.finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            self._leave(key, flight)
+
+    def _leave(self, key: Hashable, flight: _Stream) -> None:
+        """Drop a subscriber, cancelling the stream when none are left."""
+        flight.subscribers -= 1
+        if not flight.subscribers and not flight.finished:
+            flight.task.cancel()
+            self._forget(self._streams, key, flight)
+
+    @staticmethod
+    def _forget(flights: Dict[Hashable, Any], key: Hashable, flight: Any) -> None:
+        """Remove key unless it already belongs to a newer flight."""
+        if flights.get(key) is flight:
+            del flights[key]
@@ -0,0 +1,76 @@
+"""Server-sent events (SSE) frame and NDJSON line encoding.
+
+Frames are produced directly as ``bytes`` so Starlette can write them
+without another ``str`` -> ``bytes`` pass. JSON payloads are encoded with
+orjson when it is installed, otherwise with a preconfigured stdlib encoder
+(compact, ASCII-escaped output, which is the fastest stdlib setting).
+"""
+
+import json
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+_DATA = b"data: "
+_EVENT = b"event: "
+_ID = b"id: "
+_LINE_END = b"\n"
+_FRAME_END = b"\n\n"
+
+_stdlib_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _stdlib_dumps(data: Any) -> bytes:
+    """Encode JSON with the standard library."""
+    return _stdlib_encoder.encode(data).encode("ascii")
+
+
+if orjson is not None:
+    dumps = orjson.dumps
+    json_backend = "orjson"
+else:  # pragma: no cover - exercised when orjson is absent
+    dumps = _stdlib_dumps
+    json_backend = "json"
+
+
+def _field(name: bytes, value: str) -> bytes:
+    """Encode a single-line SSE field such as ``event:`` or ``id:``."""
+    if "\n" in value or "\r" in value:
+        raise ValueError(f"SSE {name.decode().strip(': ')} must be a single line")
+    return name + value.encode("utf-8") + _LINE_END
+
+
+def encode_line(data: Any) -> bytes:
+    """Encode one newline-delimited JSON (NDJSON) line."""
+    return dumps(data) + _LINE_END
+
+
+def encode_event(
+    data: Any, event: Optional[str] = None, id: Optional[str] = None
+) -> bytes:
+    """Encode one SSE frame with a JSON ``data:`` payload.
+
+    Args:
+        data: JSON-serializable payload
+        event: Optional event type (``event:`` field)
+        id: Optional event ID (``id:`` field)
+
+    Returns:
+        Complete frame terminated by a blank line
+
+    Raises:
+        ValueError: If ``event`` or ``id`` span multiple lines
+    """
+    payload = _DATA + dumps(data) + _FRAME_END
+    if event is None and id is None:
+        return payload
+
+    header = b""
+    if id is not None:
+        header += _field(_ID, id)
+    if event is not None:
+        header += _field(_EVENT, event)
+    return header + payload
@@ -0,0 +1,14 @@
+"""Storage layer wrapping Agno's database backends."""
+
+from app.storage.async_db import AsyncDb
+from app.storage.backends import open_storage
+from app.storage.cache import SessionCache
+from app.storage.summaries import ConversationSummaryIndex, MemorySummaryIndex
+
+__all__ = [
+    "AsyncDb",
+    "ConversationSummaryIndex",
+    "MemorySummaryIndex",
+    "SessionCache",
+    "open_storage",
+]
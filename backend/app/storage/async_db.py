@@ -0,0 +1,339 @@
+"""Non-blocking access to Agno's synchronous database layer.
+
+Agno's ``PostgresDb`` issues blocking SQLAlchemy calls. Calling it directly
+from an ``async def`` endpoint stalls the event loop, and with it every
+in-flight SSE stream, for the duration of the query. ``AsyncDb`` runs each
+call on a dedicated, bounded thread pool instead and exposes the result as
+an awaitable.
+
+Because ``AsyncDb`` is an ``AsyncBaseDb``, Agno agents given an ``AsyncDb``
+switch to their async session code paths and await every read and write.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
+
+from agno.db.base import AsyncBaseDb, BaseDb, SessionType
+from agno.session import AgentSession, Session
+
+from app.metrics import DB_LATENCY
+from app.storage.cache import SessionCache
+from app.storage.conversations import Cursor, select_conversation_page
+from app.storage.pool import pool_stats
+from app.storage.summaries import ConversationSummaryIndex, summary_from_session
+from app.storage.tail import (
+    read_session_tail,
+    supports_session_tail,
+    tail_offset,
+    write_session_tail,
+)
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncDb(AsyncBaseDb):
+    """Async facade over a synchronous Agno db backed by a bounded thread pool."""
+
+    def __init__(
+        self,
+        db: BaseDb,
+        max_workers: int = 8,
+        summaries: Optional[ConversationSummaryIndex] = None,
+        session_cache: Optional[SessionCache] = None,
+    ):
+        """Initialize the async facade.
+
+        Args:
+            db: Synchronous Agno db instance (e.g. PostgresDb)
+            max_workers: Maximum number of threads running db calls concurrently
+            summaries: Optional conversation summary index kept up to date on
+                write and used for listing
+            session_cache: Optional cache of deserialized agent sessions,
+                updated on write and invalidated on delete
+        """
+        super().__init__(
+            id=db.id,
+            session_table=db.session_table_name,
+            memory_table=db.memory_table_name,
+            metrics_table=db.metrics_table_name,
+            eval_table=db.eval_table_name,
+            knowledge_table=db.knowledge_table_name,
+            culture_table=db.culture_table_name,
+        )
+        self.sync_db = db
+        self.summaries = summaries
+        self.session_cache = session_cache
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+
+    async def run(
+        self, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        """Run a blocking callable on the db thread pool.
+
+        Args:
+            operation: Stable name of the call, used for its latency metric
+                label and span (not derived from ``func``, whose name may be
+                a private helper's)
+            func: Blocking callable, usually a method of ``sync_db``
+            *args: Positional arguments for ``func``
+            **kwargs: Keyword arguments for ``func``
+
+        Returns:
+            The value returned by ``func``
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            with span(f"db.{operation}", {"db.operation.name": operation}):
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(func, *args, **kwargs)
+                )
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - start, operation)
+
+    # --- Sessions ---
+    async def get_session(
+        self,
+        session_id: str,
+        session_type: SessionType,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Optional[Union[Session, Dict[str, Any]]]:
+        cacheable = (
+            self.session_cache is not None
+            and session_type == SessionType.AGENT
+            and user_id is None
+            and deserialize
+        )
+        if cacheable:
+            session = self.session_cache.get(session_id)
+            if session is not None:
+                return session
+
+        session = await self.run(
+            "get_session",
+            self.sync_db.get_session,
+            session_id=session_id,
+            session_type=session_type,
+            user_id=user_id,
+            deserialize=deserialize,
+        )
+        if cacheable and session is not None:
+            self.session_cache.put(session_id, session)
+        return session
+
+    async def get_session_tail(
+        self, session_id: str, last_runs: int
+    ) -> Optional[AgentSession]:
+        """Read an agent session with only its most recent runs.
+
+        The returned session can be passed back to ``upsert_session``, which
+        then only rewrites its runs and leaves the earlier ones in place.
+        Databases that cannot slice runs return the whole session instead.
+
+        Args:
+            session_id: Conversation to read
+            last_runs: Number of most recent runs to load
+
+        Returns:
+            The session, or None if the conversation does not exist
+        """
+        if not supports_session_tail(self.sync_db):
+            return await self.get_session(session_id, SessionType.AGENT)
+        return await self.run(
+            "get_session_tail",
+            read_session_tail,
+            self.sync_db,
+            session_id,
+            last_runs,
+        )
+
+    async def get_sessions(self, *args: Any, **kwargs: Any) -> Any:
+        return await self.run(
+            "get_sessions", self.sync_db.get_sessions, *args, **kwargs
+        )
+
+    async def upsert_session(
+        self, session: Session, deserialize: Optional[bool] = True
+    ) -> Optional[Union[Session, Dict[str, Any]]]:
+        if tail_offset(session):
+            # The cached whole session would miss the runs added here
+            self.invalidate_session(session.session_id)
+            return await self.run(
+                "upsert_session_tail",
+                write_session_tail,
+                self.sync_db,
+                session,
+            )
+
+        try:
+            saved = await self.run(
+                "upsert_session",
+                self.sync_db.upsert_session,
+                session,
+                deserialize=deserialize,
+            )
+        except BaseException:
+            # The caller may have mutated the cached object before failing
+            self.invalidate_session(session.session_id)
+            raise
+
+        if self.session_cache is not None:
+            if deserialize and saved is not None:
+                self.session_cache.put(session.session_id, saved)
+            else:
+                self.session_cache.invalidate(session.session_id)
+        return saved
+
+    async def delete_session(self, session_id: str) -> bool:
+        self.invalidate_session(session_id)
+        return await self.run(
+            "delete_session", self._delete_session, session_id
+        )
+
+    def _delete_session(self, session_id: str) -> bool:
+        deleted = self.sync_db.delete_session(session_id)
+        if self.summaries is not None:
+            self.summaries.delete(session_id)
+        return deleted
+
+    def invalidate_session(self, session_id: str) -> None:
+        """Drop a session from the cache so the next read hits the database."""
+        if self.session_cache is not None:
+            self.session_cache.invalidate(session_id)
+
+    async def delete_sessions(self, session_ids: List[str]) -> None:
+        for session_id in session_ids:
+            self.invalidate_session(session_id)
+        return await self.run(
+            "delete_sessions", self.sync_db.delete_sessions, session_ids
+        )
+
+    # --- Conversations ---
+    async def list_conversations(
+        self, limit: int, cursor: Optional[Cursor] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch one keyset page of conversation summary rows.
+
+        Reads the summary index when configured, otherwise projects the
+        summary columns straight from the session table.
+
+        Args:
+            limit: Maximum number of rows to return
+            cursor: Decoded ``(updated_at, conversation_id)`` to continue after
+
+        Returns:
+            Summary row dicts ordered by ``updated_at`` descending
+        """
+        if self.summaries is not None:
+            return await self.run(
+                "list_conversations", self.summaries.page, limit, cursor
+            )
+        return await self.run(
+            "list_conversations",
+            select_conversation_page,
+            self.sync_db,
+            limit,
+            cursor,
+        )
+
+    async def record_turn(self, conversation_id: str, user_message: str) -> None:
+        """Update the summary index after a completed chat turn.
+
+        The turn is already saved, so a failure here is logged rather than
+        raised. The next startup backfill adds the row if it is missing; a
+        row left stale is only rebuilt by running the backfill by hand.
+
+        Args:
+            conversation_id: Conversation the turn belongs to
+            user_message: Message sent by the user in this turn
+        """
+        if self.summaries is None:
+            return
+        try:
+            await self.run(
+                "record_turn",
+                self.summaries.record_turn,
+                conversation_id,
+                user_message,
+            )
+        except Exception:
+            logger.exception("Failed to index turn of conversation %s", conversation_id)
+
+    async def set_conversation_title(self, session: Session, title: str) -> None:
+        """Update the summary index after a conversation is renamed.
+
+        Args:
+            session: The renamed session, used to build the row if the
+                conversation has not been indexed yet
+            title: New conversation title
+        """
+        if self.summaries is not None:
+            await self.run(
+                "set_conversation_title",
+                self._set_conversation_title,
+                session,
+                title,
+            )
+
+    def _set_conversation_title(self, session: Session, title: str) -> None:
+        if not self.summaries.set_title(session.session_id, title):
+            record = summary_from_session(session)
+            record["title"] = title
+            self.summaries.upsert([record])
+
+    async def ping(self) -> None:
+        """Make a database round trip (a no-op for in-memory storage)."""
+        await self.run("ping", self._ping)
+
+    def _ping(self) -> None:
+        engine = getattr(self.sync_db, "db_engine", None)
+        if engine is not None:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return storage statistics for monitoring."""
+        return {
+            "session_cache": (
+                self.session_cache.stats()
+                if self.session_cache is not None
+                else {"enabled": False}
+            ),
+            "db_pool": pool_stats(self.sync_db),
+        }
+
+    def close(self) -> None:
+        """Wait for pending db calls and stop the thread pool."""
+        self._executor.shutdown(wait=True)
+
+
+def _delegate(name: str) -> Callable[..., Any]:
+    """Build an async method forwarding ``name`` to the wrapped sync db."""
+
+    async def method(self: AsyncDb, *args: Any, **kwargs: Any) -> Any:
+        return await self.run(
+            name, getattr(self.sync_db, name), *args, **kwargs
+        )
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncDb.{name}"
+    return method
+
+
+# AsyncBaseDb declares the full Agno storage surface (memories, knowledge,
+# evals, ...). Everything not overridden above is forwarded as-is so the
+# facade tracks whichever Agno version is installed.
+for _name in AsyncBaseDb.__abstractmethods__ - set(vars(AsyncDb)):
+    setattr(AsyncDb, _name, _delegate(_name))
+AsyncDb.__abstractmethods__ = frozenset()
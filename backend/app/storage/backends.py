@@ -0,0 +1,90 @@
+"""Construction of the configured storage backend.
+
+``open_storage`` returns the synchronous Agno db holding sessions together
+with the conversation summary index used for listing, for one of:
+
+- ``postgres``: Agno's ``PostgresDb`` at ``database_url``
+- ``sqlite``: Agno's ``SqliteDb`` in a single file, in WAL mode so readers
+  never wait for the writer, for single-node deployments
+- ``memory``: Agno's ``InMemoryDb`` and a dict-backed summary index, for
+  tests, benchmarks and throwaway instances
+
+The SQL backends share the pool settings of ``app.storage.pool``. All
+three are used through ``AsyncDb``; features needing PostgreSQL (such
+as reading only a session's tail) fall back to portable code elsewhere.
+With ``summary_index_enabled`` off, PostgreSQL gets no summary index and
+listings are projected from the sessions themselves
+(``app.storage.conversations``); the other backends always keep one.
+"""
+
+from typing import Any, Optional, Tuple, Union
+
+from agno.db.base import BaseDb
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import StorageBackend, settings
+from app.storage.pool import create_pooled_engine
+from app.storage.summaries import ConversationSummaryIndex, MemorySummaryIndex
+
+SummaryIndex = Union[ConversationSummaryIndex, MemorySummaryIndex]
+
+# How long a SQLite writer waits for another to commit before failing
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+def sqlite_engine(path: str) -> Engine:
+    """Create an engine for a SQLite file tuned for concurrent access.
+
+    Every connection switches the file to write-ahead logging, relaxes fsync
+    to commit time checkpoints (``synchronous=NORMAL``, safe in WAL mode)
+    and waits for locks instead of failing immediately.
+
+    Args:
+        path: Database file, created if missing
+    """
+    engine = create_pooled_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    return engine
+
+
+def open_storage(
+    backend: Optional[StorageBackend] = None,
+) -> Tuple[BaseDb, Optional[SummaryIndex]]:
+    """Create the sync db and summary index of a storage backend.
+
+    Args:
+        backend: Backend to open (defaults to ``settings.storage_backend``)
+
+    Returns:
+        Tuple of (Agno db, conversation summary index or None)
+    """
+    backend = backend or settings.storage_backend
+
+    if backend == StorageBackend.MEMORY:
+        from agno.db.in_memory import InMemoryDb
+
+        return InMemoryDb(), MemorySummaryIndex()
+
+    if backend == StorageBackend.SQLITE:
+        from agno.db.sqlite import SqliteDb
+
+        db = SqliteDb(db_engine=sqlite_engine(settings.sqlite_path))
+    else:
+        from agno.db.postgres import PostgresDb
+
+        db = PostgresDb(
+            db_url=settings.database_url,
+            db_engine=create_pooled_engine(settings.database_url),
+        )
+        if not settings.summary_index_enabled:
+            return db, None
+    return db, ConversationSummaryIndex.for_db(db)
@@ -0,0 +1,99 @@
+"""Backfill the conversation summary index from existing sessions.
+
+The app does this at startup when the index holds fewer conversations than
+the session table (``SUMMARY_BACKFILL_ON_STARTUP``), which only catches
+missing rows. Running it by hand rebuilds every row, including ones left
+stale by a failed update, and suits large databases with startup backfill
+disabled:
+
+    python -m app.storage.backfill --batch-size 200
+"""
+
+import argparse
+from typing import Any, List, Optional
+
+from agno.db.base import SessionType
+
+from app.storage.summaries import ConversationSummaryIndex, summary_from_session
+
+
+def backfill(db: Any, index: ConversationSummaryIndex, batch_size: int = 200) -> int:
+    """Rebuild summary rows for every agent session.
+
+    Args:
+        db: Synchronous Agno db holding the sessions
+        index: Summary index to populate
+        batch_size: Number of sessions loaded per query
+
+    Returns:
+        Number of conversations indexed
+    """
+    total = 0
+    page = 1
+    while True:
+        sessions = db.get_sessions(
+            session_type=SessionType.AGENT,
+            limit=batch_size,
+            page=page,
+            sort_by="created_at",
+            sort_order="asc",
+        )
+        if not sessions:
+            break
+
+        index.upsert([summary_from_session(session) for session in sessions])
+        total += len(sessions)
+
+        if len(sessions) < batch_size:
+            break
+        page += 1
+
+    return total
+
+
+def backfill_if_incomplete(
+    db: Any, index: ConversationSummaryIndex, batch_size: int = 200
+) -> int:
+    """Backfill only if some agent sessions have no summary row.
+
+    Only the row counts are compared, so rows that exist but are stale
+    (e.g. after a failed ``record_turn``) are not detected.
+
+    Args:
+        db: Synchronous Agno db holding the sessions
+        index: Summary index to populate
+        batch_size: Number of sessions loaded per query
+
+    Returns:
+        Number of conversations indexed (0 if the index was complete)
+    """
+    _, sessions = db.get_sessions(
+        session_type=SessionType.AGENT, limit=1, page=1, deserialize=False
+    )
+    if index.count() >= sessions:
+        return 0
+    return backfill(db, index, batch_size)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    from app.storage.backends import open_storage
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="Sessions loaded per query (default: 200)",
+    )
+    args = parser.parse_args(argv)
+
+    db, index = open_storage()
+    if index is None:
+        parser.exit(message="The summary index is disabled (SUMMARY_INDEX_ENABLED)\n")
+    count = backfill(db, index, args.batch_size)
+    print(f"Indexed {count} conversations")
+
+
+if __name__ == "__main__":
+    main()
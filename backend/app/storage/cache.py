@@ -0,0 +1,82 @@
+"""In-process cache of deserialized sessions.
+
+The frontend re-fetches the conversation it is showing after every turn,
+and each fetch used to read and deserialize the whole session again. The
+cache keeps recently used ``AgentSession`` objects keyed by conversation ID,
+bounded by entry count and age, and is kept current by ``AsyncDb``: writes
+store the saved session (write-through) and deletes drop it.
+
+``AsyncDb`` reads and fills the cache in its coroutines, before a call is
+handed to the db executor or after it returns, never from the executor
+threads themselves, so the cache keeps no lock.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class SessionCache:
+    """Size- and TTL-bounded LRU cache of sessions keyed by conversation ID."""
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 300.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of sessions kept
+            ttl_s: Seconds after which an entry is no longer served
+        """
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, conversation_id: str) -> Optional[Any]:
+        """Return the cached session, or None on a miss or expired entry."""
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, session = entry
+        if expires_at <= time.monotonic():
+            del self._entries[conversation_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(conversation_id)
+        self.hits += 1
+        return session
+
+    def put(self, conversation_id: str, session: Any) -> None:
+        """Store a session as most recently used, evicting the oldest."""
+        self._entries[conversation_id] = (time.monotonic() + self.ttl_s, session)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Drop a conversation from the cache."""
+        self._entries.pop(conversation_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache size and hit-rate counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
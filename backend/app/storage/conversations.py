@@ -0,0 +1,158 @@
+"""Projection-only, keyset-paginated conversation listing.
+
+The sidebar only needs an id, a title, timestamps and a message count per
+conversation. Loading full ``AgentSession`` objects for that means pulling
+and deserializing every run of every conversation. The query here selects
+just those columns, lets PostgreSQL count messages inside the ``runs`` JSON,
+and pages with a ``(updated_at, session_id)`` keyset so each page costs the
+same no matter how deep the client scrolls.
+
+``AsyncDb`` lists conversations with this query when no summary index is
+configured (``SUMMARY_INDEX_ENABLED=false`` on PostgreSQL); otherwise the
+index in ``app.storage.summaries`` serves the same rows.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.db.base import SessionType
+from sqlalchemy import JSON, Table, and_, case, column, func, or_, select, true
+from sqlalchemy.orm import Session as SqlSession
+from sqlalchemy.sql import Select
+
+Cursor = Tuple[int, str]
+
+# Messages shown to users; system prompts and replayed history are skipped
+VISIBLE_ROLES = ("user", "assistant")
+
+
+def encode_cursor(updated_at: int, conversation_id: str) -> str:
+    """Encode a keyset position as an opaque URL-safe cursor.
+
+    Args:
+        updated_at: Epoch timestamp of the last row on the page
+        conversation_id: Conversation ID of the last row on the page
+
+    Returns:
+        Cursor string to pass back as the ``cursor`` query parameter
+    """
+    raw = json.dumps([updated_at, conversation_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, conversation_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+    if not isinstance(updated_at, int) or not isinstance(conversation_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return updated_at, conversation_id
+
+
+def _array_or_null(value: Any) -> Any:
+    """A JSON value, or NULL if it is not an array (so it expands to nothing)."""
+    return case((func.json_typeof(value) == "array", value))
+
+
+def build_page_query(
+    table: Table, limit: int, cursor: Optional[Cursor] = None
+) -> Select:
+    """Build the summary projection query for one page of conversations.
+
+    Args:
+        table: Agno sessions table
+        limit: Maximum number of rows to return
+        cursor: Decoded keyset position to continue after, if any
+
+    Returns:
+        SELECT yielding session_id, name, first_user_message, message_count,
+        created_at and updated_at, newest first
+    """
+    run = (
+        func.json_array_elements(_array_or_null(table.c.runs))
+        .table_valued(column("value", JSON), with_ordinality="position")
+        .render_derived(name="run")
+    )
+    msg = (
+        func.json_array_elements(_array_or_null(run.c.value["messages"]))
+        .table_valued(column("value", JSON), with_ordinality="position")
+        .render_derived(name="msg")
+    )
+
+    role = msg.c.value["role"].as_string()
+    visible = and_(
+        role.in_(VISIBLE_ROLES),
+        func.coalesce(msg.c.value["from_history"].as_string(), "false") != "true",
+    )
+
+    message_count = (
+        select(func.count())
+        .select_from(run.join(msg, true()))
+        .where(visible)
+        .scalar_subquery()
+    )
+    # Only the first few characters are needed to derive a fallback title
+    first_user_message = (
+        select(func.left(msg.c.value["content"].as_string(), 64))
+        .select_from(run.join(msg, true()))
+        .where(visible, role == "user")
+        .order_by(run.c.position, msg.c.position)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    stmt = select(
+        table.c.session_id,
+        table.c.session_data["name"].as_string().label("name"),
+        first_user_message.label("first_user_message"),
+        message_count.label("message_count"),
+        table.c.created_at,
+        table.c.updated_at,
+    ).where(table.c.session_type == SessionType.AGENT.value)
+
+    if cursor is not None:
+        stmt = stmt.where(
+            or_(
+                table.c.updated_at < cursor[0],
+                and_(
+                    table.c.updated_at == cursor[0],
+                    table.c.session_id < cursor[1],
+                ),
+            )
+        )
+
+    return stmt.order_by(
+        table.c.updated_at.desc(), table.c.session_id.desc()
+    ).limit(limit)
+
+
+def select_conversation_page(
+    db: Any, limit: int, cursor: Optional[Cursor] = None
+) -> List[Dict[str, Any]]:
+    """Fetch one page of conversation summary rows (blocking).
+
+    Args:
+        db: Agno PostgresDb instance
+        limit: Maximum number of rows to return
+        cursor: Decoded keyset position to continue after, if any
+
+    Returns:
+        List of row dicts, newest first
+    """
+    table = db._get_table(table_type="sessions")
+    if table is None:
+        return []
+
+    stmt = build_page_query(table, limit, cursor)
+    with SqlSession(db.db_engine) as sess:
+        return [dict(row._mapping) for row in sess.execute(stmt)]
@@ -0,0 +1,98 @@
+"""Database connection pooling with acquire statistics.
+
+Every db call runs on one of ``db_executor_workers`` threads and holds a
+pooled connection for its duration, so streams, listings and warm-up all
+compete for ``db_pool_size`` (+ ``db_pool_max_overflow``) connections.
+``InstrumentedQueuePool`` is SQLAlchemy's ``QueuePool`` that also records
+how long each checkout took (waiting for a free connection, opening a new
+one and the pre-ping) and how many timed out, so the pool can be sized to
+the worker and stream counts.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+from app.config import settings
+from app.metrics import DB_POOL_ACQUIRE
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` counting checkouts, their duration and timeouts."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.acquire_s_total = 0.0
+        self.acquire_s_max = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.acquired += 1
+            self.acquire_s_total += elapsed
+            self.acquire_s_max = max(self.acquire_s_max, elapsed)
+        DB_POOL_ACQUIRE.observe(elapsed)
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current pool occupancy and acquire statistics."""
+        with self._stats_lock:
+            acquired = self.acquired
+            mean_ms = self.acquire_s_total / acquired * 1000 if acquired else 0.0
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "idle": self.checkedin(),
+                # QueuePool counts up from -size; only the excess is overflow
+                "overflow": max(0, self.overflow()),
+                "acquired": acquired,
+                "timeouts": self.timeouts,
+                "acquire_ms_mean": round(mean_ms, 3),
+                "acquire_ms_max": round(self.acquire_s_max * 1000, 3),
+            }
+
+
+def create_pooled_engine(url: str) -> Engine:
+    """Create an engine using the pool settings.
+
+    Args:
+        url: SQLAlchemy database URL
+    """
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_pool_max_overflow,
+        pool_recycle=settings.db_pool_recycle_s,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_timeout=settings.db_pool_timeout_s,
+    )
+
+
+def pool_stats(db: Any) -> Dict[str, Any]:
+    """Return the connection pool statistics of an Agno db.
+
+    Args:
+        db: Synchronous Agno db, with or without a ``db_engine``
+    """
+    engine = getattr(db, "db_engine", None)
+    pool = getattr(engine, "pool", None)
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"enabled": False}
+    return pool.stats()
@@ -0,0 +1,350 @@
+"""Denormalized per-conversation summary index.
+
+Listing conversations only needs a title, a message count, a snippet of the
+first user message and timestamps. Instead of deriving those from the full
+session history on every request, this module keeps one compact row per
+conversation in ``conversation_summaries``, updated as each turn is saved.
+Listing then becomes an index scan over ``(updated_at, conversation_id)``.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    delete,
+    func,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.engine import Engine
+
+# Stored prefix of the first user message; enough to build a fallback title
+SNIPPET_LENGTH = 64
+
+# Visible messages added by one completed turn (user message + reply)
+MESSAGES_PER_TURN = 2
+
+
+def summary_from_session(session: Any) -> Dict[str, Any]:
+    """Compute a summary record from a full Agno session.
+
+    Args:
+        session: AgentSession with its chat history loaded
+
+    Returns:
+        Summary record dict suitable for ``ConversationSummaryIndex.upsert``
+    """
+    message_count = 0
+    snippet = None
+    for msg in session.get_chat_history() or []:
+        role = getattr(msg, "role", None)
+        if role not in ("user", "assistant"):
+            continue
+        message_count += 1
+        content = getattr(msg, "content", None)
+        if snippet is None and role == "user" and isinstance(content, str):
+            snippet = content[:SNIPPET_LENGTH]
+
+    title = None
+    if session.session_data and isinstance(session.session_data, dict):
+        title = session.session_data.get("name")
+
+    return {
+        "conversation_id": session.session_id,
+        "title": title,
+        "snippet": snippet,
+        "message_count": message_count,
+        "created_at": session.created_at,
+        "updated_at": session.updated_at or session.created_at,
+    }
+
+
+class ConversationSummaryIndex:
+    """Conversation summary rows stored next to Agno's session table."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        schema: Optional[str] = None,
+        table_name: str = "conversation_summaries",
+    ):
+        """Initialize the summary index.
+
+        Args:
+            engine: SQLAlchemy engine of the session database
+            schema: Database schema holding the table (None for the default)
+            table_name: Name of the summary table
+        """
+        self.engine = engine
+        self.table = Table(
+            table_name,
+            MetaData(schema=schema),
+            Column("conversation_id", String, primary_key=True),
+            Column("title", String, nullable=True),
+            Column("snippet", String(SNIPPET_LENGTH), nullable=True),
+            Column("message_count", Integer, nullable=False, default=0),
+            Column("created_at", BigInteger, nullable=False),
+            Column("updated_at", BigInteger, nullable=False),
+            Index(f"ix_{table_name}_updated_at", "updated_at", "conversation_id"),
+        )
+        self._created = False
+        self._create_lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Any) -> "ConversationSummaryIndex":
+        """Create an index stored alongside an Agno SQL db's session table.
+
+        Args:
+            db: Agno db exposing ``db_engine`` (e.g. PostgresDb)
+        """
+        return cls(db.db_engine, schema=getattr(db, "db_schema", None))
+
+    def _ensure_table(self) -> None:
+        """Create the summary table on first use."""
+        if self._created:
+            return
+        with self._create_lock:
+            if not self._created:
+                self.table.metadata.create_all(self.engine, checkfirst=True)
+                self._created = True
+
+    def _insert(self):
+        """Return the dialect-specific INSERT supporting ON CONFLICT."""
+        if self.engine.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        return insert(self.table)
+
+    def record_turn(
+        self,
+        conversation_id: str,
+        user_message: str,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """Account for one completed turn without reading the history.
+
+        Args:
+            conversation_id: Conversation the turn belongs to
+            user_message: Message sent by the user in this turn
+            timestamp: Epoch time of the turn (defaults to now)
+        """
+        self._ensure_table()
+        now = timestamp or int(time.time())
+        table = self.table
+        stmt = self._insert().values(
+            conversation_id=conversation_id,
+            snippet=user_message[:SNIPPET_LENGTH] or None,
+            message_count=MESSAGES_PER_TURN,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.conversation_id],
+            set_={
+                "message_count": table.c.message_count
+                + stmt.excluded.message_count,
+                "snippet": func.coalesce(table.c.snippet, stmt.excluded.snippet),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def set_title(self, conversation_id: str, title: str) -> bool:
+        """Set the custom title of a conversation.
+
+        Returns:
+            False if the conversation has no summary row yet
+        """
+        self._ensure_table()
+        stmt = (
+            update(self.table)
+            .where(self.table.c.conversation_id == conversation_id)
+            .values(title=title, updated_at=int(time.time()))
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount > 0
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        """Insert or replace complete summary records.
+
+        Args:
+            records: Records as produced by ``summary_from_session``
+        """
+        if not records:
+            return
+        self._ensure_table()
+        stmt = self._insert()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.conversation_id],
+            set_={
+                name: stmt.excluded[name]
+                for name in (
+                    "title",
+                    "snippet",
+                    "message_count",
+                    "created_at",
+                    "updated_at",
+                )
+            },
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt, records)
+
+    def delete(self, conversation_id: str) -> None:
+        """Remove the summary row of a deleted conversation."""
+        self._ensure_table()
+        stmt = delete(self.table).where(
+            self.table.c.conversation_id == conversation_id
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def count(self) -> int:
+        """Return the number of indexed conversations."""
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(func.count()).select_from(self.table)
+            ).scalar_one()
+
+    def page(
+        self, limit: int, cursor: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch one keyset page of summaries, newest first.
+
+        Args:
+            limit: Maximum number of rows to return
+            cursor: ``(updated_at, conversation_id)`` to continue after
+
+        Returns:
+            Row dicts shaped like ``conversations.select_conversation_page``
+        """
+        self._ensure_table()
+        table = self.table
+        stmt = select(
+            table.c.conversation_id.label("session_id"),
+            table.c.title.label("name"),
+            table.c.snippet.label("first_user_message"),
+            table.c.message_count,
+            table.c.created_at,
+            table.c.updated_at,
+        )
+        if cursor is not None:
+            stmt = stmt.where(
+                or_(
+                    table.c.updated_at < cursor[0],
+                    and_(
+                        table.c.updated_at == cursor[0],
+                        table.c.conversation_id < cursor[1],
+                    ),
+                )
+            )
+        stmt = stmt.order_by(
+            table.c.updated_at.desc(), table.c.conversation_id.desc()
+        ).limit(limit)
+
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+class MemorySummaryIndex:
+    """``ConversationSummaryIndex`` kept in a dict, for the in-memory backend.
+
+    Pages are sorted on every call, which is fine for the few thousand
+    conversations an in-memory deployment holds.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record_turn(
+        self,
+        conversation_id: str,
+        user_message: str,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """Account for one completed turn (see ``ConversationSummaryIndex``)."""
+        now = timestamp or int(time.time())
+        with self._lock:
+            row = self._rows.get(conversation_id)
+            if row is None:
+                self._rows[conversation_id] = {
+                    "conversation_id": conversation_id,
+                    "title": None,
+                    "snippet": user_message[:SNIPPET_LENGTH] or None,
+                    "message_count": MESSAGES_PER_TURN,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                return
+            row["message_count"] += MESSAGES_PER_TURN
+            row["snippet"] = row["snippet"] or user_message[:SNIPPET_LENGTH] or None
+            row["updated_at"] = now
+
+    def set_title(self, conversation_id: str, title: str) -> bool:
+        """Set the custom title of a conversation.
+
+        Returns:
+            False if the conversation has no summary row yet
+        """
+        with self._lock:
+            row = self._rows.get(conversation_id)
+            if row is None:
+                return False
+            row["title"] = title
+            row["updated_at"] = int(time.time())
+            return True
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        """Insert or replace complete summary records."""
+        with self._lock:
+            for record in records:
+                self._rows[record["conversation_id"]] = dict(record)
+
+    def delete(self, conversation_id: str) -> None:
+        """Remove the summary row of a deleted conversation."""
+        with self._lock:
+            self._rows.pop(conversation_id, None)
+
+    def count(self) -> int:
+        """Return the number of indexed conversations."""
+        return len(self._rows)
+
+    def page(
+        self, limit: int, cursor: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch one keyset page of summaries, newest first."""
+        with self._lock:
+            keys = [
+                (row["updated_at"], row["conversation_id"])
+                for row in self._rows.values()
+            ]
+            rows = dict(self._rows)
+        if cursor is not None:
+            keys = [key for key in keys if key < tuple(cursor)]
+        keys.sort(reverse=True)
+
+        return [
+            {
+                "session_id": conversation_id,
+                "name": rows[conversation_id]["title"],
+                "first_user_message": rows[conversation_id]["snippet"],
+                "message_count": rows[conversation_id]["message_count"],
+                "created_at": rows[conversation_id]["created_at"],
+                "updated_at": updated_at,
+            }
+            for updated_at, conversation_id in keys[:limit]
+        ]
@@ -0,0 +1,181 @@
+"""Reading and writing only the most recent runs of a session.
+
+A session keeps every run of a conversation in one ``runs`` JSON array.
+Agno read, deserialized and rewrote that whole array on every chat turn
+even though the prompt only replays the last ``max_history`` runs, so the
+database traffic and deserialization of each turn grew with the
+conversation.
+
+``read_session_tail`` lets PostgreSQL slice the array and returns a session
+holding only its last runs, tagged with how many earlier runs were left
+out. ``write_session_tail`` saves such a session by keeping those earlier
+runs in place inside the database and replacing only the tail, so a tail
+session never truncates the stored conversation.
+
+Only PostgreSQL is supported; ``AsyncDb`` falls back to full reads for
+other databases.
+"""
+
+import time
+from typing import Any, Optional
+
+from agno.db.base import SessionType
+from agno.session import AgentSession
+from sqlalchemy import JSON, Table, case, cast, column, func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+from sqlalchemy.orm import Session as SqlSession
+from sqlalchemy.sql import Select, Update
+
+# Attribute recording how many stored runs precede a tail session's runs
+TAIL_OFFSET_ATTR = "_tail_offset"
+
+
+def tail_offset(session: Any) -> int:
+    """Return how many stored runs a session leaves out (0 if it is whole)."""
+    # Only set on the instance, never inherited or synthesized
+    return getattr(session, "__dict__", {}).get(TAIL_OFFSET_ATTR, 0)
+
+
+def supports_session_tail(db: Any) -> bool:
+    """Return True if the sync db can slice runs inside the database."""
+    engine = getattr(db, "db_engine", None)
+    return engine is not None and engine.dialect.name == "postgresql"
+
+
+def _runs_array(table: Table) -> Any:
+    """The stored runs, or NULL unless they are a JSON array.
+
+    The column is nullable JSON, and the array functions raise on a JSON
+    ``null`` or any other non-array value.
+    """
+    return case((func.json_typeof(table.c.runs) == "array", table.c.runs))
+
+
+def _stored_runs(table: Table, name: str) -> Any:
+    """Table-valued ``json_array_elements`` over the stored runs, numbered."""
+    return (
+        func.json_array_elements(_runs_array(table))
+        .table_valued(column("value", JSON), with_ordinality="position")
+        .render_derived(name=name)
+    )
+
+
+def build_tail_query(table: Table, session_id: str, last_runs: int) -> Select:
+    """Build the query for a session with only its last runs.
+
+    Args:
+        table: Agno sessions table
+        session_id: Conversation to read
+        last_runs: Number of most recent runs to return
+
+    Returns:
+        SELECT yielding every session column, with ``runs`` holding only the
+        last runs (NULL if there are none), plus the stored ``run_count``
+    """
+    run = _stored_runs(table, "run")
+    run_count = func.coalesce(func.json_array_length(_runs_array(table)), 0)
+    tail = (
+        select(func.json_agg(aggregate_order_by(run.c.value, run.c.position)))
+        .where(run.c.position > run_count - last_runs)
+        .scalar_subquery()
+    )
+
+    columns = [col for col in table.c if col.name != "runs"]
+    return select(*columns, tail.label("runs"), run_count.label("run_count")).where(
+        table.c.session_id == session_id,
+        table.c.session_type == SessionType.AGENT.value,
+    )
+
+
+def build_tail_update(table: Table, session_dict: dict, offset: int) -> Update:
+    """Build the update saving a tail session without touching earlier runs.
+
+    Args:
+        table: Agno sessions table
+        session_dict: ``AgentSession.to_dict()`` of the tail session
+        offset: Number of stored runs preceding the tail
+
+    Returns:
+        UPDATE replacing the stored runs after ``offset`` with the session's
+        runs, and the other session columns with the session's values
+    """
+    run = _stored_runs(table, "run")
+    kept = (
+        select(func.jsonb_agg(aggregate_order_by(run.c.value, run.c.position)))
+        .where(run.c.position <= offset)
+        .scalar_subquery()
+    )
+    tail = cast(literal(session_dict.get("runs") or [], JSON), JSONB)
+    runs = cast(
+        func.coalesce(kept, cast(literal([], JSON), JSONB)).op("||")(tail), JSON
+    )
+
+    return (
+        update(table)
+        .where(
+            table.c.session_id == session_dict.get("session_id"),
+            table.c.session_type == SessionType.AGENT.value,
+        )
+        .values(
+            agent_id=session_dict.get("agent_id"),
+            user_id=session_dict.get("user_id"),
+            agent_data=session_dict.get("agent_data"),
+            session_data=session_dict.get("session_data"),
+            summary=session_dict.get("summary"),
+            metadata=session_dict.get("metadata"),
+            runs=runs,
+            updated_at=int(time.time()),
+        )
+    )
+
+
+def read_session_tail(
+    db: Any, session_id: str, last_runs: int
+) -> Optional[AgentSession]:
+    """Read a session with only its most recent runs (blocking).
+
+    Args:
+        db: Agno PostgresDb instance
+        session_id: Conversation to read
+        last_runs: Number of most recent runs to load
+
+    Returns:
+        The session, tagged with the number of runs left out, or None if
+        the conversation does not exist
+    """
+    table = db._get_table(table_type="sessions")
+    if table is None:
+        return None
+
+    stmt = build_tail_query(table, session_id, last_runs)
+    with SqlSession(db.db_engine) as sess:
+        row = sess.execute(stmt).fetchone()
+    if row is None:
+        return None
+
+    data = dict(row._mapping)
+    run_count = data.pop("run_count")
+    session = AgentSession.from_dict(data)
+    if session is not None:
+        setattr(session, TAIL_OFFSET_ATTR, run_count - len(data["runs"] or []))
+    return session
+
+
+def write_session_tail(db: Any, session: AgentSession) -> Optional[AgentSession]:
+    """Save a session read with ``read_session_tail`` (blocking).
+
+    Args:
+        db: Agno PostgresDb instance
+        session: The tail session, including runs added since it was read
+
+    Returns:
+        The saved session, or None if the conversation no longer exists
+    """
+    table = db._get_table(table_type="sessions")
+    if table is None:
+        return None
+
+    stmt = build_tail_update(table, session.to_dict(), tail_offset(session))
+    with SqlSession(db.db_engine) as sess, sess.begin():
+        updated = sess.execute(stmt).rowcount
+    return session if updated else None
@@ -0,0 +1,166 @@
+"""Helpers for shaping streamed chat chunks before they hit the wire.
+
+Fast local models produce a delta every few milliseconds, and sending each
+one as its own SSE frame costs a JSON encode and a socket write per token.
+``coalesce_deltas`` merges consecutive deltas into one frame per time window
+or byte budget, whichever fills first. The first delta is always sent
+immediately so time-to-first-token is unaffected.
+
+``stop_on_disconnect`` ends a stream once the client has gone away, so a
+closed browser tab stops the generation instead of letting the model run
+to the end of a reply nobody reads.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+def _is_delta(chunk: Dict) -> bool:
+    """Return True for plain ``{"delta": ...}`` chunks that may be merged."""
+    return len(chunk) == 1 and "delta" in chunk
+
+
+async def coalesce_deltas(
+    chunks: AsyncIterator[Dict], interval_ms: float, max_bytes: int = 0
+) -> AsyncIterator[Dict]:
+    """Merge consecutive delta chunks into fewer, larger chunks.
+
+    Args:
+        chunks: Chunk stream as produced by ``ChatbotAgent.chat(stream=True)``
+        interval_ms: Longest time a delta may be held back (<= 0 disables)
+        max_bytes: Flush as soon as this many UTF-8 bytes are buffered
+            (0 for no byte limit)
+
+    Yields:
+        Chunks in the original order; non-delta chunks (``done``, ``error``)
+        flush any buffered text first and are passed through unchanged
+    """
+    if interval_ms <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    interval = interval_ms / 1000
+    iterator = chunks.__aiter__()
+    buffer: List[str] = []
+    buffered_bytes = 0
+    deadline: Optional[float] = None
+    first_sent = False
+    pending: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if deadline is None and pending is None:
+                # Nothing buffered: wait for the next chunk without a timer
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+            else:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                timeout = (
+                    None if deadline is None else max(0.0, deadline - loop.time())
+                )
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    # Window elapsed with the model still generating
+                    yield {"delta": "".join(buffer)}
+                    buffer, buffered_bytes, deadline = [], 0, None
+                    continue
+
+                task, pending = pending, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+
+            if not _is_delta(chunk):
+                if buffer:
+                    yield {"delta": "".join(buffer)}
+                    buffer, buffered_bytes, deadline = [], 0, None
+                yield chunk
+                continue
+
+            if not first_sent:
+                first_sent = True
+                yield chunk
+                continue
+
+            buffer.append(chunk["delta"])
+            buffered_bytes += len(chunk["delta"].encode())
+            if deadline is None:
+                deadline = loop.time() + interval
+            if max_bytes and buffered_bytes >= max_bytes:
+                yield {"delta": "".join(buffer)}
+                buffer, buffered_bytes, deadline = [], 0, None
+
+        if buffer:
+            yield {"delta": "".join(buffer)}
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def stop_on_disconnect(
+    chunks: AsyncIterator[Dict],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    interval_s: float,
+) -> AsyncIterator[Dict]:
+    """Pass chunks through until the client disconnects.
+
+    The client is checked at most every ``interval_s``, including while the
+    model is still working on the next chunk. On disconnect the stream ends
+    and the upstream is closed, which cancels the generation.
+
+    Args:
+        chunks: Chunk stream as produced by ``ChatbotAgent.chat(stream=True)``
+        is_disconnected: Returns True once the client has gone away
+        interval_s: Seconds between checks (<= 0 disables)
+
+    Yields:
+        Chunks in the original order
+    """
+    if interval_s <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    next_check = loop.time() + interval_s
+    pending: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait(
+                {pending}, timeout=max(0.0, next_check - loop.time())
+            )
+
+            if loop.time() >= next_check:
+                if await is_disconnected():
+                    return
+                next_check = loop.time() + interval_s
+            if not done:
+                continue
+
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,192 @@
+"""Optional OpenTelemetry tracing of chat turns.
+
+With ``TRACING_ENABLED=true`` (and ``opentelemetry-sdk`` installed) every
+request gets a span, with children for the chat turn, history loading, the
+model call (first token time and token count) and each database call.
+Spans are written to the console or appended to a JSON-lines file for
+offline analysis. Otherwise ``span`` returns a shared no-op object, so the
+instrumented code pays one function call.
+
+Spans that stay open across ``yield`` in an async generator must be
+``detached``: the stream supervisor pulls every chunk in its own task, and
+a span made current in one task cannot be detached in another.
+"""
+
+import asyncio
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import TraceExporter, settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "agno-ollama-chatbot"
+
+
+class _NoopSpan:
+    """Stands in for both a span and its context manager when disabled."""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[dict] = None) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_tracer: Any = None
+_provider: Any = None
+
+
+def is_enabled() -> bool:
+    """Return True if spans are being recorded."""
+    return _tracer is not None
+
+
+def configure_tracing() -> bool:
+    """Start recording spans if tracing is enabled in the settings.
+
+    Returns:
+        True if tracing is active; a missing ``opentelemetry-sdk`` is
+        logged and leaves tracing off
+    """
+    global _tracer, _provider
+    if not settings.tracing_enabled or _tracer is not None:
+        return _tracer is not None
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+    except ImportError:
+        logger.warning("Tracing is enabled but opentelemetry-sdk is not installed")
+        return False
+
+    if settings.tracing_exporter == TraceExporter.FILE:
+        out = open(settings.tracing_file, "a", encoding="utf-8")
+    else:
+        out = sys.stdout
+    exporter = ConsoleSpanExporter(
+        out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+    )
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    _tracer = _provider.get_tracer(__name__)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop recording."""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = _provider = None
+
+
+def _context(parent: Any) -> Any:
+    if parent is None or parent is NOOP_SPAN:
+        return None
+    from opentelemetry import trace
+
+    return trace.set_span_in_context(parent)
+
+
+def span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Any = None,
+    detached: bool = False,
+):
+    """Trace a block of code.
+
+    Args:
+        name: Span name
+        attributes: Span attributes
+        parent: Parent span (defaults to the current span)
+        detached: Do not make the span current; required when the block
+            yields inside an async generator
+
+    Returns:
+        Context manager yielding the span; exceptions leaving the block are
+        recorded on it
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    if detached:
+        return _detached_span(name, attributes, _context(parent))
+    return _tracer.start_as_current_span(
+        name, context=_context(parent), attributes=attributes
+    )
+
+
+@contextmanager
+def _detached_span(
+    name: str, attributes: Optional[Dict[str, Any]], context: Any
+) -> Iterator[Any]:
+    from opentelemetry.trace import Status, StatusCode
+
+    current = _tracer.start_span(name, context=context, attributes=attributes)
+    try:
+        yield current
+    except (GeneratorExit, asyncio.CancelledError):
+        current.set_attribute("cancelled", True)
+        raise
+    except BaseException as e:
+        current.record_exception(e)
+        current.set_status(Status(StatusCode.ERROR, f"{type(e).__name__}: {e}"))
+        raise
+    finally:
+        current.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request.
+
+    The span is named after the matched route template and ends once the
+    response, including a streamed body, has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # Renamed after the route template once routing has matched
+        with span(method, {"http.request.method": method}) as current:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    current.set_attribute(
+                        "http.response.status_code", message["status"]
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    current.set_attribute("http.route", route)
+                    current.update_name(f"{method} {route}")
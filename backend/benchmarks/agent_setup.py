@@ -0,0 +1,87 @@
+"""Per-request agent setup overhead: fresh construction vs. the agent pool.
+
+Measures only what a chat turn pays before the model call starts, so no
+Ollama server or database is needed. Agno's ``arun`` calls
+``initialize_agent()`` on every run, pooled agents included, so both paths
+pay for it on every turn; the pool only saves the ``Agent`` construction:
+
+    python -m benchmarks.agent_setup --turns 20000 --conversations 100
+"""
+
+import argparse
+import random
+import time
+from typing import Callable
+
+from agno.agent import Agent
+from agno.db.in_memory import InMemoryDb
+from agno.models.ollama import Ollama
+
+from app.agents.pool import AgentPool
+
+
+def build_factory() -> Callable[[str], Agent]:
+    """Return a factory building agents exactly like ChatbotAgent does."""
+    model = Ollama(id="llama3.2:3b", host="http://localhost:11434")
+    db = InMemoryDb()
+
+    def factory(conversation_id: str) -> Agent:
+        agent = Agent(
+            model=model,
+            db=db,
+            session_id=conversation_id,
+            add_history_to_context=True,
+            num_history_runs=20,
+            markdown=False,
+            description="You are a helpful AI assistant powered by Agno and Ollama.",
+        )
+        return agent
+
+    return factory
+
+
+def bench_fresh(factory: Callable[[str], Agent], keys: list) -> float:
+    """Return mean microseconds per turn when building an agent every time."""
+    start = time.perf_counter()
+    for key in keys:
+        # The per-run initialization arun performs on every agent
+        factory(key).initialize_agent()
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def bench_pool(factory: Callable[[str], Agent], keys: list, size: int) -> tuple:
+    """Return mean microseconds per turn and pool stats when leasing."""
+    pool = AgentPool(factory, max_size=size)
+    start = time.perf_counter()
+    for key in keys:
+        with pool.lease(key) as agent:
+            agent.initialize_agent()
+    elapsed = (time.perf_counter() - start) / len(keys) * 1e6
+    return elapsed, pool.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keys = [f"conv-{rng.randrange(args.conversations)}" for _ in range(args.turns)]
+    factory = build_factory()
+
+    fresh_us = bench_fresh(factory, keys)
+    pooled_us, stats = bench_pool(factory, keys, args.pool_size)
+
+    print(f"turns={args.turns} conversations={args.conversations}")
+    print(f"fresh agent per turn : {fresh_us:8.2f} us/turn")
+    print(
+        f"agent pool           : {pooled_us:8.2f} us/turn "
+        f"(hit rate {stats['hit_rate']:.1%}, {stats['misses']} builds)"
+    )
+    print(f"speedup              : {fresh_us / pooled_us:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""End-to-end load test of the FastAPI app against a fake Ollama.
+
+Drives concurrent ``/chat``, ``/chat/stream`` and ``/conversations``
+traffic through the real ``app`` (routing, scheduling, history, storage,
+SSE encoding) in-process. The model is ``benchmarks.stub_ollama`` served
+in-process with configurable time to first token, tokens/s and jitter;
+sessions live in the in-memory storage backend (``--storage sqlite`` uses a
+temporary SQLite file instead), so no Ollama server or database is needed.
+``--ollama-url`` sends generations over the network to a standalone stub
+or a real Ollama instead. Other settings come from the environment /
+``.env`` as usual.
+
+Results (p50/p95/p99 latency and TTFT, tokens/s, RPS) are printed as JSON
+and can be written to a file to compare commits:
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 64 \\
+        --ttft-ms 150 --tokens-per-s 80 --reply-tokens 40 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+import httpx
+import app.main
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.ollama_client import create_async_client
+from app.config import StorageBackend, settings
+from app.storage import AsyncDb, open_storage
+from benchmarks.stub_ollama import StubOllama
+
+KINDS = ("chat", "stream", "list")
+
+
+async def call_app(
+    asgi_app: Callable, method: str, path: str, body: Optional[dict] = None
+) -> Tuple[int, List[Tuple[float, bytes]]]:
+    """Send one HTTP request straight to an ASGI app.
+
+    Unlike ``httpx.ASGITransport``, which buffers the whole response, this
+    timestamps every body chunk as the app sends it, so streaming TTFT is
+    measured as a client would see it.
+
+    Returns:
+        Status code and ``(perf_counter timestamp, bytes)`` per body chunk
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"loadtest"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("loadtest", 80),
+    }
+    request_sent = False
+    finished = asyncio.Event()
+    status = 0
+    chunks: List[Tuple[float, bytes]] = []
+
+    async def receive() -> dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # The client stays connected until the response is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                chunks.append((time.perf_counter(), message["body"]))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await asgi_app(scope, receive, send)
+    finally:
+        finished.set()
+    return status, chunks
+
+
+def count_tokens(reply: str) -> int:
+    """Count stub model tokens (one whitespace-separated word each)."""
+    return len(reply.split())
+
+
+async def chat_request(asgi_app: Callable, conversation_id: str, n: int) -> dict:
+    start = time.perf_counter()
+    status, chunks = await call_app(
+        asgi_app,
+        "POST",
+        "/chat",
+        {"message": f"Question {n}", "conversation_id": conversation_id},
+    )
+    end = time.perf_counter()
+    tokens = 0
+    if status == 200:
+        tokens = count_tokens(json.loads(b"".join(c for _, c in chunks))["reply"])
+    return {"status": status, "latency": end - start, "ttft": None, "tokens": tokens}
+
+
+async def stream_request(asgi_app: Callable, conversation_id: str, n: int) -> dict:
+    start = time.perf_counter()
+    status, chunks = await call_app(
+        asgi_app,
+        "POST",
+        "/chat/stream",
+        {"message": f"Question {n}", "conversation_id": conversation_id},
+    )
+    end = time.perf_counter()
+
+    ttft = None
+    tokens = 0
+    failed = status != 200
+    events = b"".join(c for _, c in chunks).split(b"\n\n")
+    for event in events:
+        if not event.startswith(b"data: "):
+            continue
+        data = json.loads(event[len(b"data: ") :])
+        if "error" in data:
+            failed = True
+        elif data.get("done"):
+            tokens = count_tokens(data.get("response", ""))
+    # Time to the first frame carrying a delta
+    for timestamp, chunk in chunks:
+        if b'"delta"' in chunk:
+            ttft = timestamp - start
+            break
+    return {
+        "status": 500 if failed and status == 200 else status,
+        "latency": end - start,
+        "ttft": ttft,
+        "tokens": tokens,
+    }
+
+
+async def list_request(asgi_app: Callable, conversation_id: str, n: int) -> dict:
+    start = time.perf_counter()
+    status, _ = await call_app(asgi_app, "GET", "/conversations?limit=20")
+    end = time.perf_counter()
+    return {"status": status, "latency": end - start, "ttft": None, "tokens": 0}
+
+
+REQUESTS: Dict[str, Callable[[Callable, str, int], Awaitable[dict]]] = {
+    "chat": chat_request,
+    "stream": stream_request,
+    "list": list_request,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse a traffic mix such as ``chat:4,stream:4,list:2``."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition(":")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+        mix[kind] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Return the p-th percentile with linear interpolation (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution_ms(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "max": round(max(values) * 1000, 2),
+    }
+
+
+def summarize(samples: List[dict], wall_s: float) -> dict:
+    """Aggregate per-request samples into the report."""
+    report = {}
+    for kind in KINDS:
+        runs = [s for s in samples if s["kind"] == kind]
+        if not runs:
+            continue
+        ok = [s for s in runs if s["status"] == 200]
+        statuses: Dict[str, int] = {}
+        for s in runs:
+            statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+
+        entry = {
+            "requests": len(runs),
+            "errors": len(runs) - len(ok),
+            "statuses": statuses,
+            "rps": round(len(ok) / wall_s, 2),
+            "latency_ms": distribution_ms([s["latency"] for s in ok]),
+        }
+        ttfts = [s["ttft"] for s in ok if s["ttft"] is not None]
+        if ttfts:
+            entry["ttft_ms"] = distribution_ms(ttfts)
+        if kind != "list":
+            # Per-request generation speed, after the first token when known
+            speeds = [
+                s["tokens"] / (s["latency"] - (s["ttft"] or 0))
+                for s in ok
+                if s["tokens"] and s["latency"] > (s["ttft"] or 0)
+            ]
+            entry["tokens"] = sum(s["tokens"] for s in ok)
+            entry["tokens_per_s"] = round(entry["tokens"] / wall_s, 2)
+            entry["tokens_per_s_per_request_p50"] = (
+                round(percentile(speeds, 50), 2) if speeds else None
+            )
+        report[kind] = entry
+
+    ok = [s for s in samples if s["status"] == 200]
+    report["overall"] = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": round(wall_s, 3),
+        "rps": round(len(ok) / wall_s, 2),
+        "tokens_per_s": round(sum(s["tokens"] for s in ok) / wall_s, 2),
+        "latency_ms": distribution_ms([s["latency"] for s in ok]),
+    }
+    return report
+
+
+def git_commit() -> Optional[str]:
+    """Return the checked-out commit, if this is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_agent(
+    db: AsyncDb, stub: Optional[StubOllama], hosts: int, urls: List[str]
+) -> ChatbotAgent:
+    """Create the app's ChatbotAgent talking to the given Ollama servers.
+
+    With a stub, every one of ``hosts`` hosts is served by it in-process;
+    otherwise requests go over the network to ``urls``.
+    """
+    if stub is None:
+        with patch.object(settings, "ollama_hosts", urls):
+            return ChatbotAgent(db=db)
+
+    transport = httpx.MockTransport(stub.handle)
+    urls = [f"http://stub-ollama-{i}:11434" for i in range(hosts)]
+    with patch.object(settings, "ollama_hosts", urls), patch(
+        "app.agents.chatbot_agent.create_async_client",
+        side_effect=lambda url: create_async_client(url, transport=transport),
+    ):
+        return ChatbotAgent(db=db)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    stub = (
+        None
+        if args.ollama_url
+        else StubOllama(
+            ttft_ms=args.ttft_ms,
+            tokens_per_s=args.tokens_per_s,
+            reply_tokens=args.reply_tokens,
+            jitter=args.jitter,
+            seed=args.seed,
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.object(settings, "sqlite_path", os.path.join(tmp, "chatbot.db")):
+            sync_db, summaries = open_storage(args.storage)
+        db = AsyncDb(
+            sync_db, max_workers=settings.db_executor_workers, summaries=summaries
+        )
+        agent = build_agent(db, stub, args.hosts, args.ollama_url)
+        # The lifespan would open the configured storage; install the agent directly
+        app.main.chatbot_agent = agent
+
+        rng = random.Random(args.seed)
+        kinds = list(args.mix)
+        weights = [args.mix[kind] for kind in kinds]
+        plan = [
+            (
+                rng.choices(kinds, weights)[0],
+                f"conv-{rng.randrange(args.conversations)}",
+            )
+            for _ in range(args.requests)
+        ]
+        jobs = iter(enumerate(plan))
+        samples: List[dict] = []
+
+        async def client() -> None:
+            # Clients share one iterator, so each planned request runs once
+            for n, (kind, conversation_id) in jobs:
+                sample = await REQUESTS[kind](app.main.app, conversation_id, n)
+                sample["kind"] = kind
+                samples.append(sample)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(client() for _ in range(args.concurrency)))
+            wall_s = time.perf_counter() - start
+        finally:
+            app.main.chatbot_agent = None
+            await agent.cleanup()
+            db.close()
+            engine = getattr(sync_db, "db_engine", None)
+            if engine is not None:
+                engine.dispose()
+
+    return {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "conversations": args.conversations,
+            "mix": args.mix,
+            "storage": args.storage.value,
+            "ollama_urls": args.ollama_url,
+            "hosts": args.hosts,
+            "ttft_ms": args.ttft_ms,
+            "tokens_per_s": args.tokens_per_s,
+            "reply_tokens": args.reply_tokens,
+            "jitter": args.jitter,
+            "seed": args.seed,
+        },
+        "results": summarize(samples, wall_s),
+        "stub": stub.stats() if stub is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="chat:4,stream:4,list:2",
+        help="Relative weights of request kinds (chat, stream, list)",
+    )
+    parser.add_argument(
+        "--storage",
+        type=StorageBackend,
+        choices=("memory", "sqlite"),
+        default=StorageBackend.MEMORY,
+        help="Storage backend (sqlite uses a temporary file)",
+    )
+    parser.add_argument(
+        "--ollama-url",
+        action="append",
+        help="Send generations to this Ollama (or benchmarks.stub_ollama) "
+        "server instead of the in-process stub; repeat for several hosts",
+    )
+    parser.add_argument("--hosts", type=int, default=1, help="In-process stub hosts")
+    parser.add_argument("--ttft-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-s", type=float, default=100.0)
+    parser.add_argument("--reply-tokens", type=int, default=30)
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.2,
+        help="Random +/- fraction applied to every model delay",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""SSE frame encoding: previous str path vs. app.sse bytes encoder.
+
+The previous path was ``json.dumps`` + f-string, followed by Starlette
+encoding the ``str`` to ``bytes``. Deltas are sized like real model output
+(single tokens up to coalesced multi-token chunks):
+
+    python -m benchmarks.sse_encoding --iterations 200000
+"""
+
+import argparse
+import json
+import timeit
+
+from app import sse
+
+DELTA_SIZES = [4, 16, 64, 256, 1024]
+# Mostly ASCII with some multi-byte characters, like typical chat output
+ALPHABET = "The quick brown fox jumps over the lazy dog, naïve café 😀 "
+
+
+def make_delta(size: int) -> dict:
+    text = (ALPHABET * (size // len(ALPHABET) + 1))[:size]
+    return {"delta": text}
+
+
+def previous_path(chunk: dict) -> bytes:
+    """Encoding as done before app.sse existed."""
+    data = json.dumps(chunk)
+    return f"data: {data}\n\n".encode("utf-8")
+
+
+def stdlib_path(chunk: dict) -> bytes:
+    """app.sse framing with the stdlib JSON fallback."""
+    return sse._DATA + sse._stdlib_dumps(chunk) + sse._FRAME_END
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    candidates = [("previous", previous_path), ("sse/json", stdlib_path)]
+    if sse.orjson is not None:
+        candidates.append(("sse/orjson", sse.encode_event))
+
+    header = f"{'delta chars':>11}" + "".join(f"{name:>14}" for name, _ in candidates)
+    print(f"ns per frame, {n} iterations (json backend: {sse.json_backend})")
+    print(header)
+    for size in DELTA_SIZES:
+        chunk = make_delta(size)
+        row = f"{size:>11}"
+        for _, encode in candidates:
+            seconds = timeit.timeit(lambda: encode(chunk), number=n)
+            row += f"{seconds / n * 1e9:>14.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Ollama-compatible stub server with simulated model timing and faults.
+
+Speaks the parts of the Ollama HTTP API the backend uses (``/api/chat``,
+``/api/generate``, plus ``/api/tags``, ``/api/ps`` and ``/api/version``)
+over a real socket, so routing, timeouts and backpressure can be exercised
+on a machine with no GPU or Ollama install:
+
+    python -m benchmarks.stub_ollama --port 11435 --ttft-ms 200 \\
+        --tokens-per-s 40 --error-rate 0.02 --stall-rate 0.01 --load-ms 3000
+
+Point the backend at it with ``OLLAMA_HOST=http://localhost:11435``, or
+start several on different ports and list them in ``OLLAMA_HOSTS``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple, Union
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Reported by /api/version
+VERSION = "0.0.0-stub"
+
+# Installed models when none are given (the backend's default OLLAMA_MODEL)
+DEFAULT_MODELS = ("llama3.2:3b",)
+
+# JSON object, or NDJSON lines for a streamed reply
+Payload = Union[Dict[str, Any], AsyncIterator[bytes]]
+
+
+class StubOllama:
+    """Simulated Ollama model server, independent of any transport."""
+
+    def __init__(
+        self,
+        ttft_ms: float = 100.0,
+        tokens_per_s: float = 50.0,
+        reply_tokens: int = 30,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_s: float = 300.0,
+        load_ms: float = 0.0,
+        seed: Optional[int] = None,
+        models: Iterable[str] = DEFAULT_MODELS,
+    ):
+        """Initialize the stub.
+
+        Args:
+            ttft_ms: Delay before the first token of a loaded model
+            tokens_per_s: Generation speed after the first token
+            reply_tokens: Tokens per reply (capped by ``options.num_predict``)
+            jitter: Each delay is scaled by a random factor in
+                ``[1 - jitter, 1 + jitter]``
+            error_rate: Fraction of generations answered with HTTP 500
+            stall_rate: Fraction of generations that stop mid-reply for
+                ``stall_s`` seconds
+            stall_s: Length of a stall
+            load_ms: Delay paid by the first request for a model that is not
+                loaded (models unload after a request with ``keep_alive=0``)
+            seed: Random seed for jitter and fault injection
+            models: Models listed as installed by ``/api/tags`` (``/api/ps``
+                only lists the loaded ones); any other model is installed on
+                its first request
+        """
+        self.ttft_s = ttft_ms / 1000
+        self.token_s = 1 / tokens_per_s if tokens_per_s > 0 else 0.0
+        self.reply_tokens = reply_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+        self.load_s = load_ms / 1000
+        self.rng = random.Random(seed)
+
+        self.installed: Set[str] = set(models)
+        self.loaded: Set[str] = set()
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._requests = 0
+        self._errors = 0
+        self._stalls = 0
+        self._loads = 0
+
+    def _delay(self, seconds: float) -> float:
+        if not self.jitter:
+            return seconds
+        return seconds * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _load(self, model: str) -> float:
+        """Load a model if needed; return the seconds spent loading."""
+        self.installed.add(model)
+        if model in self.loaded or not self.load_s:
+            self.loaded.add(model)
+            return 0.0
+        # Concurrent requests for an unloaded model share one load
+        lock = self._load_locks.setdefault(model, asyncio.Lock())
+        start = time.perf_counter()
+        async with lock:
+            if model not in self.loaded:
+                self._loads += 1
+                await asyncio.sleep(self._delay(self.load_s))
+                self.loaded.add(model)
+        return time.perf_counter() - start
+
+    def _finish(self, model: str, body: Dict[str, Any]) -> None:
+        """Apply the request's keep_alive once the reply is complete."""
+        if body.get("keep_alive") in (0, "0", "0s", "0m"):
+            self.loaded.discard(model)
+
+    def _token_count(self, body: Dict[str, Any]) -> int:
+        limit = (body.get("options") or {}).get("num_predict")
+        if limit is not None and limit >= 0:
+            return min(self.reply_tokens, limit)
+        return self.reply_tokens
+
+    def _chunk(
+        self, endpoint: str, model: str, content: str, stats: Optional[dict] = None
+    ) -> Dict[str, Any]:
+        chunk: Dict[str, Any] = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if endpoint == "chat":
+            chunk["message"] = {"role": "assistant", "content": content}
+        else:
+            chunk["response"] = content
+        chunk["done"] = stats is not None
+        if stats is not None:
+            chunk.update(stats)
+        return chunk
+
+    async def _generate(
+        self, endpoint: str, body: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield reply chunks at the simulated pace, ending with the stats."""
+        model = body.get("model", "")
+        start = time.perf_counter()
+        load_s = await self._load(model)
+        tokens = self._token_count(body)
+        stall_at = (
+            self.rng.randrange(tokens + 1)
+            if tokens and self.rng.random() < self.stall_rate
+            else None
+        )
+
+        try:
+            for i in range(tokens):
+                if i == stall_at:
+                    self._stalls += 1
+                    await asyncio.sleep(self.stall_s)
+                await asyncio.sleep(self._delay(self.token_s if i else self.ttft_s))
+                yield self._chunk(endpoint, model, f"tok{i} ")
+            if stall_at == tokens:
+                self._stalls += 1
+                await asyncio.sleep(self.stall_s)
+        finally:
+            self._finish(model, body)
+
+        elapsed_ns = int((time.perf_counter() - start) * 1e9)
+        yield self._chunk(
+            endpoint,
+            model,
+            "",
+            stats={
+                "done_reason": "stop" if tokens else "load",
+                "total_duration": elapsed_ns,
+                "load_duration": int(load_s * 1e9),
+                "prompt_eval_count": 0,
+                "eval_count": tokens,
+                "eval_duration": elapsed_ns - int(load_s * 1e9),
+            },
+        )
+
+    async def _stream(
+        self, endpoint: str, body: Dict[str, Any]
+    ) -> AsyncIterator[bytes]:
+        async for chunk in self._generate(endpoint, body):
+            yield json.dumps(chunk).encode() + b"\n"
+
+    async def _complete(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        key = "message" if endpoint == "chat" else "response"
+        parts = []
+        async for chunk in self._generate(endpoint, body):
+            text = chunk[key]["content"] if endpoint == "chat" else chunk[key]
+            parts.append(text)
+        # The final chunk carries the stats; give it the whole reply
+        if endpoint == "chat":
+            chunk[key]["content"] = "".join(parts)
+        else:
+            chunk[key] = "".join(parts)
+        return chunk
+
+    async def respond(self, path: str, body: Dict[str, Any]) -> Tuple[int, Payload]:
+        """Answer one Ollama API call.
+
+        Args:
+            path: Request path (e.g. ``/api/chat``)
+            body: Decoded JSON request body (empty for GET requests)
+
+        Returns:
+            Status code and either a JSON object or NDJSON lines
+        """
+        if path == "/api/version":
+            return 200, {"version": VERSION}
+        if path in ("/api/tags", "/api/ps"):
+            # Like Ollama: tags lists every installed model, ps the loaded ones
+            models = self.installed if path == "/api/tags" else self.loaded
+            return 200, {"models": [{"name": m, "model": m} for m in sorted(models)]}
+        if path not in ("/api/chat", "/api/generate"):
+            return 404, {"error": f"{path} not found"}
+
+        self._requests += 1
+        endpoint = path.rsplit("/", 1)[-1]
+        if endpoint == "generate" and not body.get("prompt"):
+            # Ollama only loads (or with keep_alive=0, unloads) the model
+            body = {**body, "options": {"num_predict": 0}}
+        elif self.rng.random() < self.error_rate:
+            self._errors += 1
+            return 500, {"error": "stub: injected failure"}
+
+        if body.get("stream", True):
+            return 200, self._stream(endpoint, body)
+        return 200, await self._complete(endpoint, body)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """``httpx.MockTransport`` handler serving the stub in-process."""
+        body = json.loads(request.content) if request.content else {}
+        status, payload = await self.respond(request.url.path, body)
+        if isinstance(payload, dict):
+            return httpx.Response(status, json=payload)
+        return httpx.Response(status, content=payload)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request and fault injection counters."""
+        return {
+            "requests": self._requests,
+            "errors_injected": self._errors,
+            "stalls": self._stalls,
+            "loads": self._loads,
+            "loaded_models": sorted(self.loaded),
+        }
+
+
+def create_app(stub: StubOllama) -> Starlette:
+    """Serve a stub over HTTP."""
+
+    async def api(request: Request) -> Response:
+        raw = await request.body()
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return JSONResponse({"error": "invalid JSON body"}, status_code=400)
+        status, payload = await stub.respond(request.url.path, body)
+        if isinstance(payload, dict):
+            return JSONResponse(payload, status_code=status)
+        return StreamingResponse(payload, media_type="application/x-ndjson")
+
+    async def stub_stats(request: Request) -> Response:
+        return JSONResponse(stub.stats())
+
+    return Starlette(
+        routes=[
+            Route("/stub/stats", stub_stats),
+            Route("/api/{name}", api, methods=["GET", "POST"]),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-s", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=30)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-s", type=float, default=300.0)
+    parser.add_argument(
+        "--load-ms",
+        type=float,
+        default=0.0,
+        help="Delay of the first request for each model (cold load)",
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=list(DEFAULT_MODELS),
+        help="Installed models listed by /api/tags (loaded on first request)",
+    )
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = StubOllama(
+        ttft_ms=args.ttft_ms,
+        tokens_per_s=args.tokens_per_s,
+        reply_tokens=args.reply_tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall_s=args.stall_s,
+        load_ms=args.load_ms,
+        seed=args.seed,
+        models=args.models,
+    )
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
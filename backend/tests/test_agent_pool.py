@@ -0,0 +1,155 @@
+"""Tests for the reusable agent pool."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.pool import AgentPool
+
+
+@pytest.fixture
+def factory():
+    """Create a factory returning a distinct mock agent per call."""
+    return MagicMock(side_effect=lambda conversation_id: MagicMock())
+
+
+class TestAgentPool:
+    """Tests for AgentPool leasing and eviction."""
+
+    def test_reuses_agent_for_same_conversation(self, factory):
+        """Test that a returned agent is reused on the next lease."""
+        pool = AgentPool(factory, max_size=4)
+
+        with pool.lease("conv-1") as first:
+            pass
+        with pool.lease("conv-1") as second:
+            pass
+
+        assert first is second
+        assert factory.call_count == 1
+        assert pool.stats()["hits"] == 1
+        assert pool.stats()["misses"] == 1
+        assert pool.stats()["hit_rate"] == 0.5
+
+    def test_concurrent_leases_never_share_an_agent(self, factory):
+        """Test that an agent is exclusive to one run at a time."""
+        pool = AgentPool(factory, max_size=4)
+
+        with pool.lease("conv-1") as first, pool.lease("conv-1") as second:
+            assert first is not second
+
+        assert len(pool) == 1
+
+    def test_evicts_least_recently_used(self, factory):
+        """Test that the pool stays within max_size."""
+        pool = AgentPool(factory, max_size=2)
+
+        for conversation_id in ["conv-1", "conv-2", "conv-1", "conv-3"]:
+            with pool.lease(conversation_id):
+                pass
+
+        assert len(pool) == 2
+        assert pool.stats()["evictions"] == 1
+        with pool.lease("conv-2"):
+            pass
+        assert pool.stats()["misses"] == 4
+
+    def test_failed_run_discards_agent(self, factory):
+        """Test that an agent is not returned if its run raised."""
+        pool = AgentPool(factory, max_size=4)
+
+        with pytest.raises(RuntimeError):
+            with pool.lease("conv-1"):
+                raise RuntimeError("model error")
+
+        assert len(pool) == 0
+
+    def test_zero_size_disables_pooling(self, factory):
+        """Test that max_size=0 builds an agent for every lease."""
+        pool = AgentPool(factory, max_size=0)
+
+        for _ in range(3):
+            with pool.lease("conv-1"):
+                pass
+
+        assert factory.call_count == 3
+        assert len(pool) == 0
+
+
+class TestChatbotAgentPooling:
+    """Tests for agent reuse inside ChatbotAgent."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        db = MagicMock()
+        db.get_session = AsyncMock(return_value=None)
+        db.get_session_tail = AsyncMock(return_value=None)
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            return ChatbotAgent(db=db)
+
+    @pytest.mark.asyncio
+    async def test_consecutive_turns_reuse_agent(self, chatbot_agent):
+        """Test that a second turn does not construct a new Agent."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent_class.return_value.arun = AsyncMock(
+                return_value=MagicMock(content="Reply")
+            )
+
+            await chatbot_agent._chat_complete("conv-1", "Hello")
+            await chatbot_agent._chat_complete("conv-1", "Again")
+
+        mock_agent_class.assert_called_once()
+        assert chatbot_agent.stats()["agent_pool"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_returns_agent_after_completion(self, chatbot_agent):
+        """Test that a fully consumed stream returns its agent to the pool."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+
+            async def mock_stream(*args, **kwargs):
+                yield MagicMock(content="Reply")
+
+            mock_agent_class.return_value.arun = mock_stream
+
+            async for _ in chatbot_agent._chat_stream("conv-1", "Hello"):
+                pass
+
+        assert len(chatbot_agent.agent_pool) == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_discards_agent(self, chatbot_agent):
+        """Test that a stream closed mid-reply does not return its agent."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+
+            async def mock_stream(*args, **kwargs):
+                for word in ["a", "b", "c"]:
+                    yield MagicMock(content=word)
+
+            mock_agent_class.return_value.arun = mock_stream
+
+            stream = chatbot_agent._chat_stream("conv-1", "Hello")
+            await stream.__anext__()
+            await stream.aclose()
+
+        assert len(chatbot_agent.agent_pool) == 0
+
+    @pytest.mark.asyncio
+    async def test_complete_after_stream_does_not_stream(self, chatbot_agent):
+        """Test that a reused agent that streamed before answers in full."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent = mock_agent_class.return_value
+
+            async def mock_stream(*args, **kwargs):
+                yield MagicMock(content="Reply")
+
+            mock_agent.arun = mock_stream
+            async for _ in chatbot_agent._chat_stream("conv-1", "Hello"):
+                pass
+
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Reply"))
+            result = await chatbot_agent._chat_complete("conv-1", "Again")
+
+        assert result["reply"] == "Reply"
+        assert mock_agent.arun.call_args.kwargs["stream"] is False
@@ -0,0 +1,137 @@
+"""Tests for the thread-pool backed async db facade."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from agno.agent import Agent
+from agno.db.base import AsyncBaseDb, SessionType
+
+from app.storage import AsyncDb
+
+
+@pytest.fixture
+def sync_db():
+    """Create a mock synchronous Agno db."""
+    db = MagicMock()
+    db.id = "test-db"
+    db.session_table_name = "agno_sessions"
+    return db
+
+
+@pytest.fixture
+def async_db(sync_db):
+    """Create an AsyncDb wrapping the mock db."""
+    db = AsyncDb(sync_db, max_workers=2)
+    yield db
+    db.close()
+
+
+class TestAsyncDbInterface:
+    """Tests for the AsyncBaseDb contract."""
+
+    def test_is_async_base_db(self, async_db):
+        """Test that AsyncDb can be used wherever Agno expects an async db."""
+        assert isinstance(async_db, AsyncBaseDb)
+        assert async_db.id == "test-db"
+        assert async_db.session_table_name == "agno_sessions"
+
+    def test_agno_agent_uses_async_code_path(self, async_db):
+        """Test that an Agent given an AsyncDb awaits its storage calls."""
+        agent = Agent(db=async_db)
+        assert agent._has_async_db() is True
+
+    @pytest.mark.asyncio
+    async def test_get_session_forwards_arguments(self, async_db, sync_db):
+        """Test that get_session forwards to the wrapped db."""
+        sync_db.get_session.return_value = "session"
+
+        result = await async_db.get_session(
+            session_id="conv-1", session_type=SessionType.AGENT
+        )
+
+        assert result == "session"
+        sync_db.get_session.assert_called_once_with(
+            session_id="conv-1",
+            session_type=SessionType.AGENT,
+            user_id=None,
+            deserialize=True,
+        )
+
+    @pytest.mark.asyncio
+    async def test_unlisted_methods_are_delegated(self, async_db, sync_db):
+        """Test that the rest of the Agno db surface is forwarded."""
+        sync_db.get_user_memories.return_value = ["memory"]
+
+        result = await async_db.get_user_memories(user_id="u1")
+
+        assert result == ["memory"]
+        sync_db.get_user_memories.assert_called_once_with(user_id="u1")
+
+
+class TestAsyncDbExecution:
+    """Tests for running db calls off the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_calls_run_on_db_threads(self, async_db, sync_db):
+        """Test that blocking calls run on the db thread pool."""
+        sync_db.delete_session.side_effect = (
+            lambda session_id: threading.current_thread().name
+        )
+
+        thread_name = await async_db.delete_session("conv-1")
+
+        assert thread_name.startswith("db")
+        assert thread_name != threading.current_thread().name
+
+    @pytest.mark.asyncio
+    async def test_slow_query_does_not_block_event_loop(self, async_db, sync_db):
+        """Test that the event loop keeps running during a slow query."""
+        sync_db.get_sessions.side_effect = lambda **kwargs: time.sleep(0.2)
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(heartbeat())
+        await async_db.get_sessions(session_type=SessionType.AGENT)
+        ticker.cancel()
+
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_by_max_workers(self, async_db, sync_db):
+        """Test that no more than max_workers calls run at once."""
+        lock = threading.Lock()
+        active = 0
+        peak = 0
+
+        def slow_call(session_id):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        sync_db.delete_session.side_effect = slow_call
+
+        await asyncio.gather(
+            *(async_db.delete_session(f"conv-{i}") for i in range(6))
+        )
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_caller(self, async_db, sync_db):
+        """Test that db exceptions are raised from the awaited call."""
+        sync_db.upsert_session.side_effect = Exception("Upsert failed")
+
+        with pytest.raises(Exception, match="Upsert failed"):
+            await async_db.upsert_session(MagicMock())
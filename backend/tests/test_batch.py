@@ -0,0 +1,122 @@
+"""Tests for bounded-concurrency batch execution."""
+
+import asyncio
+
+import pytest
+
+from app.batch import run_batch
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+class TestRunBatch:
+    """Tests for run_batch."""
+
+    @pytest.mark.asyncio
+    async def test_results_arrive_as_items_finish(self):
+        """Test that a slow item does not hold back faster ones."""
+
+        async def work(delay):
+            await asyncio.sleep(delay)
+            return delay
+
+        results = await collect(run_batch([0.05, 0.0, 0.01], work, concurrency=3))
+
+        assert [index for index, _, _ in results] == [1, 2, 0]
+        assert results[0] == (1, 0.0, None)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that no more than concurrency items run at once."""
+        running = 0
+        peak = 0
+
+        async def work(item):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return item
+
+        results = await collect(run_batch(list(range(10)), work, concurrency=3))
+
+        assert len(results) == 10
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_items_with_same_key_run_in_order(self):
+        """Test that turns of one conversation never overlap."""
+        log = []
+
+        async def work(item):
+            conversation, turn = item
+            log.append(("start", item))
+            await asyncio.sleep(0.01 if turn == 1 else 0)
+            log.append(("end", item))
+            return item
+
+        items = [("a", 1), ("b", 1), ("a", 2)]
+        await collect(run_batch(items, work, concurrency=3, key=lambda i: i[0]))
+
+        assert log.index(("end", ("a", 1))) < log.index(("start", ("a", 2)))
+
+    @pytest.mark.asyncio
+    async def test_errors_are_returned_per_item(self):
+        """Test that one failure does not stop the other items."""
+
+        async def work(item):
+            if item == "bad":
+                raise ValueError("bad item")
+            return item
+
+        results = await collect(run_batch(["ok", "bad", "fine"], work, concurrency=1))
+
+        assert [(index, result) for index, result, _ in results] == [
+            (0, "ok"),
+            (1, None),
+            (2, "fine"),
+        ]
+        assert isinstance(results[1][2], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_base_exception_is_yielded_then_raised(self):
+        """Test that a dying worker never leaves the consumer waiting."""
+
+        class Stop(BaseException):
+            pass
+
+        async def work(item):
+            if item == "stop":
+                raise Stop()
+            await asyncio.sleep(10)
+
+        results = run_batch(["stop", "slow"], work, concurrency=2)
+        index, result, error = await asyncio.wait_for(results.__anext__(), 1)
+
+        assert (index, result) == (0, None)
+        assert isinstance(error, Stop)
+        with pytest.raises(Stop):
+            await asyncio.wait_for(results.__anext__(), 1)
+
+    @pytest.mark.asyncio
+    async def test_closing_early_cancels_running_items(self):
+        """Test that an abandoned batch stops its remaining work."""
+        cancelled = 0
+
+        async def work(item):
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(0 if item == 0 else 10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+            return item
+
+        results = run_batch([0, 1, 2], work, concurrency=3)
+        assert (await results.__anext__())[0] == 0
+        await results.aclose()
+
+        assert cancelled == 2
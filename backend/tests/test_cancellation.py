@@ -0,0 +1,184 @@
+"""Tests for generation deadlines and cancellation on disconnect."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.agents.chatbot_agent import ChatbotAgent, GenerationTimeout
+from app.main import ChatRequest, app, chat_stream
+
+
+@pytest.fixture
+def chatbot_agent():
+    with patch("app.agents.chatbot_agent.Ollama"):
+        return ChatbotAgent(db=MagicMock())
+
+
+class TestGenerationDeadline:
+    """Tests for model_timeout_s enforcement in ChatbotAgent."""
+
+    @pytest.mark.asyncio
+    async def test_slow_completion_times_out(self, chatbot_agent):
+        """Test that a non-streaming turn stops at the deadline."""
+
+        async def slow(conversation_id, message):
+            await asyncio.sleep(10)
+
+        with patch.object(chatbot_agent, "_chat_complete", slow), patch(
+            "app.agents.chatbot_agent.settings.model_timeout_s", 0.01
+        ):
+            with pytest.raises(GenerationTimeout):
+                await chatbot_agent.chat("Hi", "conv-1")
+
+        assert chatbot_agent.stats()["generations"]["timed_out"] == 1
+        assert chatbot_agent.scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_stream_times_out(self, chatbot_agent):
+        """Test that a stream stops at the deadline and closes the run."""
+        closed = asyncio.Event()
+
+        async def slow(conversation_id, message):
+            try:
+                yield {"delta": "Hi"}
+                await asyncio.sleep(10)
+                yield {"delta": "never"}
+            finally:
+                closed.set()
+
+        with patch.object(chatbot_agent, "_chat_stream", slow), patch(
+            "app.agents.chatbot_agent.settings.model_timeout_s", 0.05
+        ):
+            stream = await chatbot_agent.chat("Hi", stream=True)
+            received = []
+            with pytest.raises(GenerationTimeout):
+                async for chunk in stream:
+                    received.append(chunk)
+
+        assert received == [{"delta": "Hi"}]
+        assert closed.is_set()
+        assert chatbot_agent.stats()["generations"]["timed_out"] == 1
+        assert chatbot_agent.scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_closing_stream_counts_as_cancelled(self, chatbot_agent):
+        """Test that an abandoned stream is cancelled and counted."""
+        closed = asyncio.Event()
+
+        async def endless(conversation_id, message):
+            try:
+                while True:
+                    yield {"delta": "x"}
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        with patch.object(chatbot_agent, "_chat_stream", endless):
+            stream = await chatbot_agent.chat("Hi", stream=True)
+            await stream.__anext__()
+            await stream.aclose()
+
+        assert closed.is_set()
+        assert chatbot_agent.stats()["generations"] == {
+            "cancelled": 1,
+            "timed_out": 0,
+        }
+        assert chatbot_agent.scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_last_duplicate_leaving_cancels_generation(self, chatbot_agent):
+        """Test that a coalesced stream is cancelled once every client left."""
+        closed = asyncio.Event()
+
+        async def endless(conversation_id, message):
+            try:
+                while True:
+                    yield {"delta": "x"}
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        with patch.object(chatbot_agent, "_chat_stream", endless):
+            first = await chatbot_agent.chat("Hi", "conv-1", stream=True)
+            second = await chatbot_agent.chat("Hi", "conv-1", stream=True)
+            await first.__anext__()
+            await second.__anext__()
+            await first.aclose()
+            await asyncio.sleep(0.03)
+            assert not closed.is_set()
+            await second.aclose()
+            await asyncio.sleep(0.01)
+
+        assert closed.is_set()
+        assert chatbot_agent.stats()["generations"]["cancelled"] == 1
+
+
+class TestEndpointCancellation:
+    """Tests for deadlines and disconnects at the HTTP layer."""
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_504_on_timeout(self):
+        """Test that a timed-out /chat turn is a 504."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(side_effect=GenerationTimeout(60))
+
+                response = await client.post("/chat", json={"message": "Hi"})
+
+                assert response.status_code == 504
+                assert response.json()["detail"] == "Model did not finish within 60s"
+
+    @pytest.mark.asyncio
+    async def test_stream_timeout_is_sent_as_error_event(self):
+        """Test that a stream past its deadline ends with an error event."""
+
+        async def timed_out():
+            yield {"delta": "Hi"}
+            raise GenerationTimeout(60)
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(return_value=timed_out())
+
+                response = await client.post("/chat/stream", json={"message": "Hi"})
+
+        events = [
+            json.loads(line[len("data: ") :])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert events[-1] == {"error": "Model did not finish within 60s", "done": True}
+
+    @pytest.mark.asyncio
+    async def test_disconnect_stops_generation(self):
+        """Test that a closed client connection closes the agent stream."""
+        closed = asyncio.Event()
+
+        async def endless():
+            try:
+                while True:
+                    yield {"delta": "x"}
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        http_request = MagicMock()
+        http_request.is_disconnected = AsyncMock(side_effect=[False, True])
+
+        with patch("app.main.chatbot_agent") as mock_agent, patch(
+            "app.main.settings.disconnect_check_interval_s", 0.02
+        ):
+            mock_agent.chat = AsyncMock(return_value=endless())
+            response = await chat_stream(ChatRequest(message="Hi"), http_request)
+            frames = [frame async for frame in response.body_iterator]
+
+        assert closed.is_set()
+        assert 0 < len(frames) < 20
+        assert http_request.is_disconnected.await_count == 2
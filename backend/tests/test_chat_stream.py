@@ -108,3 +108,35 @@ async def test_chat_stream_error_handling():
 
                 # Should receive at least one event (error event)
                 assert len(events) > 0
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_coalesces_fast_deltas():
+    """Test that a burst of tokens is sent as a few SSE frames."""
+    import json
+
+    async def token_burst():
+        for i in range(200):
+            yield {"delta": f"t{i} "}
+        yield {"done": True, "conversation_id": "conv-1", "response": "..."}
+
+    with patch("app.main.chatbot_agent") as mock_agent:
+        mock_agent.chat = AsyncMock(return_value=token_burst())
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            async with client.stream(
+                "POST", "/chat/stream", json={"message": "Hello"}
+            ) as response:
+                events = [
+                    json.loads(line[len("data: ") :])
+                    async for line in response.aiter_lines()
+                    if line.startswith("data: ")
+                ]
+
+    text = "".join(event.get("delta", "") for event in events)
+    assert text == "".join(f"t{i} " for i in range(200))
+    assert events[0] == {"delta": "t0 "}
+    assert events[-1]["done"] is True
+    assert len(events) < 20
@@ -9,8 +9,10 @@ from app.agents.chatbot_agent import ChatbotAgent
 def mock_db():
     """Create a mock PostgresDb instance."""
     db = MagicMock()
-    db.get_session = MagicMock(return_value=None)
+    db.get_session = AsyncMock(return_value=None)
+    db.get_session_tail = AsyncMock(return_value=None)
     db.upsert_session = MagicMock()
+    db.record_turn = AsyncMock()
     return db
 
 
@@ -46,12 +48,15 @@ class TestChatbotAgentInitialization:
         ) as mock_settings:
             mock_settings.ollama_model = "llama3.2:3b"
             mock_settings.ollama_host = "http://localhost:11434"
+            mock_settings.ollama_keep_alive = "30m"
 
             agent = ChatbotAgent(db=mock_db)
 
             mock_ollama.assert_called_once_with(
                 id="llama3.2:3b",
                 host="http://localhost:11434",
+                async_client=agent.http_client,
+                keep_alive="30m",
             )
             assert agent.model is not None
 
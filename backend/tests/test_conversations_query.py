@@ -0,0 +1,110 @@
+"""Tests for the conversation listing query and cursors."""
+
+import pytest
+from sqlalchemy import JSON, BigInteger, Column, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+from app.storage.conversations import build_page_query, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def sessions_table():
+    """Create a table matching Agno's session table layout."""
+    return Table(
+        "agno_sessions",
+        MetaData(),
+        Column("session_id", String),
+        Column("session_type", String),
+        Column("session_data", JSON),
+        Column("runs", JSON),
+        Column("created_at", BigInteger),
+        Column("updated_at", BigInteger),
+        schema="ai",
+    )
+
+
+def compile_sql(stmt):
+    """Render a statement as PostgreSQL with literal parameters."""
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+class TestCursor:
+    """Tests for cursor encoding."""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes to the encoded position."""
+        cursor = encode_cursor(1700000000, "conv-123")
+        assert decode_cursor(cursor) == (1700000000, "conv-123")
+
+    def test_cursor_is_url_safe(self):
+        """Test that cursors need no URL escaping."""
+        cursor = encode_cursor(1700000000, "a/b+c?d")
+        assert all(ch.isalnum() or ch in "-_" for ch in cursor)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "WzEsMl0", "e30"])
+    def test_invalid_cursor_raises_value_error(self, cursor):
+        """Test that malformed cursors are rejected."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestPageQuery:
+    """Tests for the projection query."""
+
+    def test_selects_only_summary_columns(self, sessions_table):
+        """Test that the full runs column is never returned."""
+        stmt = build_page_query(sessions_table, limit=20)
+        assert [c.name for c in stmt.selected_columns] == [
+            "session_id",
+            "name",
+            "first_user_message",
+            "message_count",
+            "created_at",
+            "updated_at",
+        ]
+
+    def test_orders_and_limits_in_database(self, sessions_table):
+        """Test that sorting and limiting happen in SQL."""
+        sql = compile_sql(build_page_query(sessions_table, limit=20))
+        assert (
+            "ORDER BY ai.agno_sessions.updated_at DESC, "
+            "ai.agno_sessions.session_id DESC" in sql
+        )
+        assert sql.rstrip().endswith("LIMIT 20")
+        assert "ai.agno_sessions.session_type = 'agent'" in sql
+
+    def test_counts_visible_messages_in_sql(self, sessions_table):
+        """Test that messages are counted with JSON functions server-side."""
+        sql = compile_sql(build_page_query(sessions_table, limit=20))
+        assert "json_array_elements(CASE WHEN" in sql
+        assert "count(*)" in sql
+        assert "IN ('user', 'assistant')" in sql
+
+    def test_first_user_message_follows_stored_order(self, sessions_table):
+        """Test that the fallback title comes from the earliest user message."""
+        sql = compile_sql(build_page_query(sessions_table, limit=20))
+        assert "WITH ORDINALITY AS run(value, position)" in sql
+        assert "WITH ORDINALITY AS msg(value, position)" in sql
+        assert "ORDER BY run.position, msg.position \n LIMIT 1" in sql
+
+    def test_skips_runs_that_are_not_an_array(self, sessions_table):
+        """Test that a JSON null or non-array never reaches the array functions."""
+        sql = compile_sql(build_page_query(sessions_table, limit=20))
+        assert (
+            "json_array_elements(CASE WHEN (json_typeof(ai.agno_sessions.runs) = "
+            "'array') THEN ai.agno_sessions.runs END)" in sql
+        )
+        assert "json_typeof((run.value -> 'messages')) = 'array'" in sql
+
+    def test_cursor_adds_keyset_predicate(self, sessions_table):
+        """Test that a cursor continues strictly after the given row."""
+        sql = compile_sql(
+            build_page_query(sessions_table, limit=20, cursor=(1700000000, "conv-1"))
+        )
+        assert "ai.agno_sessions.updated_at < 1700000000" in sql
+        assert "ai.agno_sessions.session_id < 'conv-1'" in sql
+        assert "OFFSET" not in sql
@@ -0,0 +1,87 @@
+"""Tests for the database connection pool and its statistics."""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import exc
+
+from app.config import StorageBackend
+from app.storage import AsyncDb, open_storage
+from app.storage.pool import InstrumentedQueuePool, create_pooled_engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    with patch("app.storage.pool.settings.db_pool_size", 1), patch(
+        "app.storage.pool.settings.db_pool_max_overflow", 0
+    ), patch("app.storage.pool.settings.db_pool_timeout_s", 0.05):
+        engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    yield engine
+    engine.dispose()
+
+
+class TestInstrumentedQueuePool:
+    """Tests for pool settings and acquire statistics."""
+
+    def test_settings_are_applied(self, tmp_path):
+        """Test that the pool is built from the pool settings."""
+        with patch("app.storage.pool.settings.db_pool_size", 3), patch(
+            "app.storage.pool.settings.db_pool_max_overflow", 4
+        ), patch("app.storage.pool.settings.db_pool_recycle_s", 60), patch(
+            "app.storage.pool.settings.db_pool_pre_ping", False
+        ):
+            engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+
+        stats = engine.pool.stats()
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+        assert (stats["size"], stats["max_overflow"]) == (3, 4)
+        assert engine.pool._recycle == 60
+        assert engine.pool._pre_ping is False
+
+    def test_occupancy_and_acquires(self, engine):
+        """Test that stats follow connections in and out of the pool."""
+        with engine.connect():
+            busy = engine.pool.stats()
+        idle = engine.pool.stats()
+
+        assert (busy["checked_out"], busy["idle"]) == (1, 0)
+        assert (idle["checked_out"], idle["idle"]) == (0, 1)
+        assert idle["acquired"] == 1
+        assert idle["acquire_ms_max"] >= idle["acquire_ms_mean"] > 0
+
+    def test_timeouts_are_counted(self, engine):
+        """Test that a checkout failing on an exhausted pool is recorded."""
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        stats = engine.pool.stats()
+        assert stats["timeouts"] == 1
+        assert stats["acquired"] == 1
+
+
+class TestAsyncDbPoolStats:
+    """Tests for pool statistics reported by the storage layer."""
+
+    def test_sql_backend_reports_pool(self, tmp_path):
+        """Test that AsyncDb.stats includes the SQL backend's pool."""
+        with patch(
+            "app.storage.backends.settings.sqlite_path", str(tmp_path / "chatbot.db")
+        ):
+            sync_db, summaries = open_storage(StorageBackend.SQLITE)
+        db = AsyncDb(sync_db, max_workers=1, summaries=summaries)
+
+        stats = db.stats()["db_pool"]
+        db.close()
+        sync_db.db_engine.dispose()
+
+        assert stats["checked_out"] == 0
+        assert "acquire_ms_mean" in stats
+
+    def test_memory_backend_has_no_pool(self):
+        """Test that backends without connections report the pool disabled."""
+        sync_db, summaries = open_storage(StorageBackend.MEMORY)
+        db = AsyncDb(sync_db, max_workers=1, summaries=summaries)
+
+        assert db.stats()["db_pool"] == {"enabled": False}
+        db.close()
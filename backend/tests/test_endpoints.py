@@ -1,9 +1,14 @@
 """Comprehensive tests for API endpoints."""
 
+import json
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 from unittest.mock import AsyncMock, MagicMock, patch
+from app.agents.chatbot_agent import GenerationTimeout
 from app.main import app
+from app.scheduling import QueueFull, QueueTimeout
+from app.storage.conversations import encode_cursor
 
 
 @pytest.fixture
@@ -221,7 +226,7 @@ class TestConversationsListEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_sessions = MagicMock(return_value=[])
+                mock_agent.db.list_conversations = AsyncMock(return_value=[])
 
                 response = await client.get("/conversations")
                 assert response.status_code == 200
@@ -233,7 +238,7 @@ class TestConversationsListEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_sessions = MagicMock(return_value=[])
+                mock_agent.db.list_conversations = AsyncMock(return_value=[])
 
                 response = await client.get("/conversations")
                 data = response.json()
@@ -246,7 +251,7 @@ class TestConversationsListEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_sessions = MagicMock(return_value=[])
+                mock_agent.db.list_conversations = AsyncMock(return_value=[])
 
                 response = await client.get("/conversations")
                 data = response.json()
@@ -273,7 +278,7 @@ class TestConversationDetailEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_session = MagicMock(return_value=None)
+                mock_agent.db.get_session = AsyncMock(return_value=None)
 
                 response = await client.get("/conversations/nonexistent-id")
                 assert response.status_code == 404
@@ -285,7 +290,7 @@ class TestConversationDetailEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_session = MagicMock(return_value=None)
+                mock_agent.db.get_session = AsyncMock(return_value=None)
 
                 response = await client.get("/conversations/missing-conv")
                 assert response.status_code == 404
@@ -311,7 +316,7 @@ class TestConversationDeleteEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.delete_session = MagicMock(return_value=True)
+                mock_agent.db.delete_session = AsyncMock(return_value=True)
 
                 response = await client.delete("/conversations/test-conv")
                 assert response.status_code == 200
@@ -323,7 +328,7 @@ class TestConversationDeleteEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.delete_session = MagicMock(return_value=True)
+                mock_agent.db.delete_session = AsyncMock(return_value=True)
 
                 response = await client.delete("/conversations/conv-123")
                 data = response.json()
@@ -352,7 +357,7 @@ class TestConversationUpdateTitleEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_session = MagicMock(return_value=MagicMock())
+                mock_agent.db.get_session = AsyncMock(return_value=MagicMock())
 
                 response = await client.patch(
                     "/conversations/conv-123/title", json={}
@@ -366,7 +371,7 @@ class TestConversationUpdateTitleEndpoint:
             transport=ASGITransport(app=app), base_url="http://test"
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
-                mock_agent.db.get_session = MagicMock(return_value=None)
+                mock_agent.db.get_session = AsyncMock(return_value=None)
 
                 response = await client.patch(
                     "/conversations/missing/title", json={"title": "New Title"}
@@ -382,8 +387,9 @@ class TestConversationUpdateTitleEndpoint:
             with patch("app.main.chatbot_agent") as mock_agent:
                 mock_session = MagicMock()
                 mock_session.session_data = {}
-                mock_agent.db.get_session = MagicMock(return_value=mock_session)
-                mock_agent.db.upsert_session = MagicMock()
+                mock_agent.db.get_session = AsyncMock(return_value=mock_session)
+                mock_agent.db.upsert_session = AsyncMock()
+                mock_agent.db.set_conversation_title = AsyncMock()
 
                 response = await client.patch(
                     "/conversations/conv-456/title", json={"title": "Updated Title"}
@@ -399,8 +405,9 @@ class TestConversationUpdateTitleEndpoint:
             with patch("app.main.chatbot_agent") as mock_agent:
                 mock_session = MagicMock()
                 mock_session.session_data = {}
-                mock_agent.db.get_session = MagicMock(return_value=mock_session)
-                mock_agent.db.upsert_session = MagicMock()
+                mock_agent.db.get_session = AsyncMock(return_value=mock_session)
+                mock_agent.db.upsert_session = AsyncMock()
+                mock_agent.db.set_conversation_title = AsyncMock()
 
                 response = await client.patch(
                     "/conversations/conv-789/title",
@@ -473,3 +480,393 @@ class TestErrorHandling:
             # GET on POST-only endpoint
             response = await client.get("/chat")
             assert response.status_code == 405
+
+
+class TestConversationsListPagination:
+    """Tests for keyset pagination on GET /conversations."""
+
+    @staticmethod
+    def _row(conversation_id, updated_at, name=None, first_user_message=None):
+        return {
+            "session_id": conversation_id,
+            "name": name,
+            "first_user_message": first_user_message,
+            "message_count": 2,
+            "created_at": 1700000000,
+            "updated_at": updated_at,
+        }
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_uses_default_page_size(self):
+        """Test that paging with a cursor alone uses the configured page size."""
+        cursor = encode_cursor(1700000100, "conv-1")
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.db.list_conversations = AsyncMock(return_value=[])
+
+                await client.get(f"/conversations?cursor={cursor}")
+
+                mock_agent.db.list_conversations.assert_awaited_once_with(
+                    limit=50, cursor=(1700000100, "conv-1")
+                )
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_without_paging_returns_everything(self):
+        """Test that clients that do not page still get every conversation."""
+        pages = [
+            [self._row("conv-2", 1700000200), self._row("conv-1", 1700000100)],
+            [self._row("conv-0", 1700000000)],
+        ]
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent, patch(
+                "app.main.settings.conversations_max_page_size", 2
+            ):
+                mock_agent.db.list_conversations = AsyncMock(side_effect=pages)
+
+                response = await client.get("/conversations")
+
+                assert [c["conversation_id"] for c in response.json()] == [
+                    "conv-2",
+                    "conv-1",
+                    "conv-0",
+                ]
+                assert "x-next-cursor" not in response.headers
+                mock_agent.db.list_conversations.assert_awaited_with(
+                    limit=2, cursor=(1700000100, "conv-1")
+                )
+
+    @pytest.mark.asyncio
+    async def test_next_cursor_is_exposed_to_browsers(self):
+        """Test that cross-origin clients may read the X-Next-Cursor header."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.db.list_conversations = AsyncMock(return_value=[])
+
+                response = await client.get(
+                    "/conversations", headers={"Origin": "http://localhost:3000"}
+                )
+
+                exposed = response.headers["access-control-expose-headers"]
+                assert "X-Next-Cursor" in exposed
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_sets_next_cursor_on_full_page(self):
+        """Test that a full page returns a cursor for the next page."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.db.list_conversations = AsyncMock(
+                    return_value=[
+                        self._row("conv-2", 1700000200),
+                        self._row("conv-1", 1700000100),
+                    ]
+                )
+
+                response = await client.get("/conversations?limit=2")
+                next_cursor = response.headers["x-next-cursor"]
+
+                await client.get(f"/conversations?limit=2&cursor={next_cursor}")
+
+                mock_agent.db.list_conversations.assert_awaited_with(
+                    limit=2, cursor=(1700000100, "conv-1")
+                )
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_omits_cursor_on_last_page(self):
+        """Test that a partial page has no next cursor."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.db.list_conversations = AsyncMock(
+                    return_value=[self._row("conv-1", 1700000100)]
+                )
+
+                response = await client.get("/conversations?limit=2")
+
+                assert "x-next-cursor" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_builds_summaries_from_rows(self):
+        """Test that titles fall back to the first user message."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.db.list_conversations = AsyncMock(
+                    return_value=[
+                        self._row("conv-2", 1700000200, name="Renamed"),
+                        self._row("conv-1", 1700000100, first_user_message="x" * 60),
+                        self._row("conv-0", 1700000000),
+                    ]
+                )
+
+                response = await client.get("/conversations")
+                data = response.json()
+
+                assert [c["title"] for c in data] == [
+                    "Renamed",
+                    "x" * 50 + "...",
+                    "New Chat",
+                ]
+                assert data[0]["message_count"] == 2
+                assert data[0]["updated_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_rejects_invalid_cursor(self):
+        """Test that a malformed cursor returns 400."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                response = await client.get("/conversations?cursor=not-a-cursor")
+                assert response.status_code == 400
+                mock_agent.db.list_conversations.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_conversations_list_rejects_oversized_limit(self):
+        """Test that limit is capped by the configured maximum."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent"):
+                response = await client.get("/conversations?limit=10000")
+                assert response.status_code == 422
+
+
+class TestConversationSummaryMaintenance:
+    """Tests for summary index updates from conversation endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_update_title_updates_summary_index(self):
+        """Test that renaming a conversation updates its summary row."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_session = MagicMock()
+                mock_session.session_data = {}
+                mock_agent.db.get_session = AsyncMock(return_value=mock_session)
+                mock_agent.db.upsert_session = AsyncMock()
+                mock_agent.db.set_conversation_title = AsyncMock()
+
+                await client.patch(
+                    "/conversations/conv-1/title", json={"title": "Renamed"}
+                )
+
+                mock_agent.db.set_conversation_title.assert_awaited_once_with(
+                    mock_session, "Renamed"
+                )
+
+
+class TestStatsEndpoint:
+    """Tests for GET /stats endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_stats_returns_agent_stats(self):
+        """Test that stats are served from the agent."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.stats = MagicMock(
+                    return_value={"agent_pool": {"hits": 3, "misses": 1}}
+                )
+
+                response = await client.get("/stats")
+
+                assert response.status_code == 200
+                assert response.json()["agent_pool"]["hits"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stats_returns_503_when_agent_not_initialized(self):
+        """Test that stats returns 503 if agent not initialized."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent", None):
+                response = await client.get("/stats")
+                assert response.status_code == 503
+
+
+class TestAdmissionControl:
+    """Tests for scheduler rejections on the chat endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_429_when_queue_full(self):
+        """Test that a full queue is a fast 429 with Retry-After."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(
+                    side_effect=QueueFull("Queue full", retry_after=7)
+                )
+
+                response = await client.post("/chat", json={"message": "Hi"})
+
+                assert response.status_code == 429
+                assert response.headers["retry-after"] == "7"
+                assert response.json()["detail"] == "Queue full"
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_503_on_queue_timeout(self):
+        """Test that a timed-out wait is a 503 with Retry-After."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(
+                    side_effect=QueueTimeout("Timed out", retry_after=3)
+                )
+
+                response = await client.post("/chat", json={"message": "Hi"})
+
+                assert response.status_code == 503
+                assert response.headers["retry-after"] == "3"
+
+    @pytest.mark.asyncio
+    async def test_stream_rejected_before_events(self):
+        """Test that a rejected stream gets an HTTP error, not an SSE body."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(
+                    side_effect=QueueFull("Queue full", retry_after=2)
+                )
+
+                response = await client.post(
+                    "/chat/stream", json={"message": "Hi"}
+                )
+
+                assert response.status_code == 429
+                assert response.headers["retry-after"] == "2"
+                assert "text/event-stream" not in response.headers["content-type"]
+
+    @pytest.mark.asyncio
+    async def test_stream_other_errors_still_sent_as_events(self):
+        """Test that non-admission errors keep the SSE error event."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(side_effect=Exception("Model missing"))
+
+                response = await client.post(
+                    "/chat/stream", json={"message": "Hi"}
+                )
+
+                assert response.status_code == 200
+                assert '"error":"Model missing"' in response.text
+
+
+class TestChatBatchEndpoint:
+    """Tests for POST /chat/batch."""
+
+    @pytest.mark.asyncio
+    async def test_batch_streams_one_line_per_item(self):
+        """Test that every item's result is returned as an NDJSON line."""
+
+        async def chat(message, conversation_id, stream):
+            return {
+                "conversation_id": conversation_id or f"conv-{message}",
+                "reply": message.upper(),
+                "usage": {"model": "llama3.2:3b"},
+            }
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(side_effect=chat)
+
+                response = await client.post(
+                    "/chat/batch",
+                    json={"items": [{"message": "a"}, {"message": "b"}]},
+                )
+
+                assert response.status_code == 200
+                assert response.headers["content-type"] == "application/x-ndjson"
+                lines = [json.loads(line) for line in response.text.splitlines()]
+                assert sorted(lines, key=lambda line: line["index"]) == [
+                    {
+                        "index": 0,
+                        "conversation_id": "conv-a",
+                        "reply": "A",
+                        "usage": {"model": "llama3.2:3b"},
+                    },
+                    {
+                        "index": 1,
+                        "conversation_id": "conv-b",
+                        "reply": "B",
+                        "usage": {"model": "llama3.2:3b"},
+                    },
+                ]
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_failed_items_inline(self):
+        """Test that a failing item does not fail the whole batch."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent") as mock_agent:
+                mock_agent.chat = AsyncMock(
+                    side_effect=[
+                        QueueFull("Queue full", retry_after=4),
+                        GenerationTimeout(60),
+                        Exception("Model missing"),
+                    ]
+                )
+
+                response = await client.post(
+                    "/chat/batch",
+                    json={"items": [{"message": "Hi"}] * 3, "concurrency": 1},
+                )
+
+                lines = [json.loads(line) for line in response.text.splitlines()]
+                assert lines == [
+                    {
+                        "index": 0,
+                        "status": 429,
+                        "error": "Queue full",
+                        "retry_after": 4,
+                    },
+                    {
+                        "index": 1,
+                        "status": 504,
+                        "error": "Model did not finish within 60s",
+                    },
+                    {"index": 2, "status": 500, "error": "Chat error: Model missing"},
+                ]
+
+    @pytest.mark.asyncio
+    async def test_batch_requires_items(self):
+        """Test that an empty batch is a validation error."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent", MagicMock()):
+                response = await client.post("/chat/batch", json={"items": []})
+
+                assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_batch_returns_503_when_agent_not_initialized(self):
+        """Test that batch returns 503 if agent not initialized."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.chatbot_agent", None):
+                response = await client.post(
+                    "/chat/batch", json={"items": [{"message": "Hi"}]}
+                )
+
+                assert response.status_code == 503
@@ -0,0 +1,216 @@
+"""Tests for the token-budgeted history window."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session import AgentSession
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.history import (
+    MESSAGE_OVERHEAD_TOKENS,
+    HistoryWindow,
+    estimate_tokens,
+    history_runs,
+    run_tokens,
+    summarize_runs,
+)
+
+
+def make_run(index, user, reply, status=RunStatus.completed):
+    return RunOutput(
+        run_id=f"run-{index}",
+        session_id="conv-1",
+        messages=[
+            Message(role="system", content="You are a helpful AI assistant."),
+            Message(role="user", content=user),
+            Message(role="assistant", content=reply),
+        ],
+        status=status,
+    )
+
+
+def make_session(*turns):
+    runs = [make_run(i, user, reply) for i, (user, reply) in enumerate(turns)]
+    return AgentSession(session_id="conv-1", runs=runs)
+
+
+class TestEstimateTokens:
+    """Tests for estimate_tokens."""
+
+    def test_ascii_is_four_characters_per_token(self):
+        """Test that ASCII text is counted at four characters per token."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+        assert estimate_tokens("x" * 400) == 100
+
+    def test_non_ascii_counts_encoded_bytes(self):
+        """Test that multi-byte text is not undercounted."""
+        # Nine characters, 27 UTF-8 bytes: roughly one token per character
+        assert estimate_tokens("日本語のテキスト。") == 9
+
+
+class TestHistoryRuns:
+    """Tests for run selection and sizing."""
+
+    def test_skips_runs_agno_does_not_replay(self):
+        """Test that errored and cancelled runs are left out."""
+        session = make_session(("a", "b"), ("c", "d"))
+        session.runs.append(make_run(2, "e", "f", status=RunStatus.error))
+        session.runs.append(make_run(3, "g", "h", status=RunStatus.cancelled))
+
+        assert [run.run_id for run in history_runs(session)] == ["run-0", "run-1"]
+        assert history_runs(None) == []
+
+    def test_run_tokens_ignores_system_and_replayed_messages(self):
+        """Test that only the run's own exchange is counted."""
+        run = make_run(0, "x" * 40, "y" * 80)
+        run.messages.insert(1, Message(role="user", content="old", from_history=True))
+
+        assert run_tokens(run) == 10 + 20 + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+class TestHistoryWindow:
+    """Tests for HistoryWindow.fit."""
+
+    def test_keeps_everything_that_fits(self):
+        """Test that short conversations replay every run."""
+        window = HistoryWindow(budget_tokens=1000, max_runs=20)
+        session = make_session(("Hi", "Hello!"), ("How are you?", "Fine."))
+
+        assert window.fit("conv-1", session, reserved_tokens=50) == (2, None)
+        assert window.stats()["trimmed"] == 0
+
+    def test_keeps_most_recent_runs_within_budget(self):
+        """Test that old runs are dropped once the budget is used up."""
+        # Each run takes 100 + 100 + 2 * overhead tokens
+        session = make_session(*[("u" * 400, "a" * 400)] * 5)
+        window = HistoryWindow(budget_tokens=500, max_runs=20)
+
+        assert window.fit("conv-1", session, reserved_tokens=50) == (2, None)
+        assert window.stats()["trimmed"] == 1
+
+    def test_long_message_leaves_no_room_for_history(self):
+        """Test that a message filling the budget gets no history at all."""
+        session = make_session(("Hi", "Hello!"))
+        window = HistoryWindow(budget_tokens=100, max_runs=20)
+
+        assert window.fit("conv-1", session, reserved_tokens=120) == (0, None)
+
+    def test_max_runs_still_applies(self):
+        """Test that the run cap holds even with budget to spare."""
+        session = make_session(*[("Hi", "Hello!")] * 10)
+        window = HistoryWindow(budget_tokens=100000, max_runs=3)
+
+        assert window.fit("conv-1", session, reserved_tokens=0) == (3, None)
+
+    def test_recap_replaces_dropped_runs(self):
+        """Test that runs outside the window are condensed into a recap."""
+        session = make_session(
+            ("What is Agno?", "A framework for agents."),
+            ("x" * 800, "y" * 800),
+            ("And Ollama?", "It runs models locally."),
+        )
+        window = HistoryWindow(budget_tokens=300, max_runs=20, recap_max_tokens=200)
+
+        num_runs, recap = window.fit("conv-1", session, reserved_tokens=0)
+
+        assert num_runs == 1
+        assert recap.startswith("Summary of earlier turns")
+        assert "User: What is Agno? / Assistant: A framework for agents." in recap
+        # Long messages are shortened in the recap
+        assert "x" * 200 not in recap
+        assert estimate_tokens(recap) <= 200
+
+    def test_recap_is_reused_until_window_moves(self):
+        """Test that the recap is only rebuilt when another run drops out."""
+        session = make_session(*[("u" * 400, "a" * 400)] * 4)
+        window = HistoryWindow(budget_tokens=600, max_runs=20, recap_max_tokens=200)
+
+        first = window.fit("conv-1", session, reserved_tokens=0)
+        second = window.fit("conv-1", session, reserved_tokens=0)
+        session.runs.append(make_run(4, "u" * 400, "a" * 400))
+        window.fit("conv-1", session, reserved_tokens=0)
+
+        assert first == second
+        assert window.stats()["recaps_built"] == 2
+        assert window.stats()["recaps_reused"] == 1
+
+    def test_summarize_keeps_newest_runs(self):
+        """Test that a tight recap budget keeps the most recent turns."""
+        runs = make_session(("first", "one"), ("second", "two")).runs
+
+        recap = summarize_runs(runs, max_tokens=25)
+
+        assert "second" in recap
+        assert "first" not in recap
+        assert summarize_runs(runs, max_tokens=5) == ""
+
+
+class TestChatbotAgentHistory:
+    """Tests for the history window inside ChatbotAgent."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        db = MagicMock()
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            agent = ChatbotAgent(db=db)
+        agent.history = HistoryWindow(
+            budget_tokens=400, max_runs=20, recap_max_tokens=200
+        )
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_turn_replays_only_runs_within_budget(self, chatbot_agent):
+        """Test that the agent is limited to the runs that fit."""
+        session = make_session(("Hi", "Hello!"), ("u" * 800, "a" * 800), ("Ok", "Ok"))
+        chatbot_agent.db.get_session_tail = AsyncMock(return_value=session)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent = MagicMock()
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Reply"))
+            mock_agent_class.return_value = mock_agent
+
+            await chatbot_agent._chat_complete("conv-1", "Next question")
+
+        assert mock_agent.add_history_to_context is True
+        assert mock_agent.num_history_runs == 1
+        assert "User: Hi / Assistant: Hello!" in mock_agent.additional_context
+
+    @pytest.mark.asyncio
+    async def test_new_conversation_turns_history_off(self, chatbot_agent):
+        """Test that no history means none is requested from Agno."""
+        chatbot_agent.db.get_session_tail = AsyncMock(return_value=None)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent = MagicMock()
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Reply"))
+            mock_agent_class.return_value = mock_agent
+
+            await chatbot_agent._chat_complete("conv-1", "Hello")
+
+        assert mock_agent.add_history_to_context is False
+        assert mock_agent.additional_context is None
+        assert chatbot_agent.stats()["history"]["turns"] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_session_is_read_once(self, chatbot_agent):
+        """Test that without tail reads the agent reuses the budgeted session."""
+        session = make_session(("Hi", "Hello!"))
+        chatbot_agent.db.get_session = AsyncMock(return_value=session)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class, patch(
+            "app.agents.chatbot_agent.settings.session_tail_enabled", False
+        ):
+            mock_agent = MagicMock()
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Reply"))
+            mock_agent_class.return_value = mock_agent
+
+            await chatbot_agent._chat_complete("conv-1", "Next question")
+
+        chatbot_agent.db.get_session.assert_awaited_once()
+        assert mock_agent._cached_session is session
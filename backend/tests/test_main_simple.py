@@ -2,7 +2,7 @@
 
 import pytest
 from httpx import ASGITransport, AsyncClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.main import app
 
 
@@ -17,7 +17,7 @@ class TestConversationsListEdgeCases:
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
                 # Mock database error
-                mock_agent.db.get_sessions = MagicMock(
+                mock_agent.db.list_conversations = AsyncMock(
                     side_effect=Exception("Database error")
                 )
 
@@ -37,7 +37,7 @@ class TestConversationDetailEdgeCases:
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
                 # Mock database error
-                mock_agent.db.get_session = MagicMock(
+                mock_agent.db.get_session = AsyncMock(
                     side_effect=Exception("Database connection failed")
                 )
 
@@ -57,7 +57,7 @@ class TestConversationDeleteEdgeCases:
         ) as client:
             with patch("app.main.chatbot_agent") as mock_agent:
                 # Mock database error
-                mock_agent.db.delete_session = MagicMock(
+                mock_agent.db.delete_session = AsyncMock(
                     side_effect=Exception("Delete failed")
                 )
 
@@ -79,8 +79,9 @@ class TestConversationUpdateTitleEdgeCases:
                 # Create session with None session_data
                 mock_session = MagicMock()
                 mock_session.session_data = None
-                mock_agent.db.get_session = MagicMock(return_value=mock_session)
-                mock_agent.db.upsert_session = MagicMock()
+                mock_agent.db.get_session = AsyncMock(return_value=mock_session)
+                mock_agent.db.upsert_session = AsyncMock()
+                mock_agent.db.set_conversation_title = AsyncMock()
 
                 response = await client.patch(
                     "/conversations/test-id/title", json={"title": "New Title"}
@@ -99,9 +100,9 @@ class TestConversationUpdateTitleEdgeCases:
             with patch("app.main.chatbot_agent") as mock_agent:
                 mock_session = MagicMock()
                 mock_session.session_data = {}
-                mock_agent.db.get_session = MagicMock(return_value=mock_session)
+                mock_agent.db.get_session = AsyncMock(return_value=mock_session)
                 # Mock upsert error
-                mock_agent.db.upsert_session = MagicMock(
+                mock_agent.db.upsert_session = AsyncMock(
                     side_effect=Exception("Upsert failed")
                 )
 
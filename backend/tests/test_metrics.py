@@ -0,0 +1,240 @@
+"""Tests for the Prometheus metrics and their instrumentation."""
+
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.main import app
+from app.metrics import (
+    INFLIGHT_GENERATIONS,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+)
+from app.storage import AsyncDb
+
+
+def sample(lines, prefix):
+    """Return the value of the first rendered line starting with prefix."""
+    for line in lines:
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestHistogram:
+    """Tests for histogram recording and rendering."""
+
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts every value at or below its bound."""
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+
+        lines = histogram.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+        assert sample(lines, "latency_seconds_sum") == pytest.approx(3.65)
+
+    def test_series_per_label_values(self):
+        """Test that label values get separate, escaped series."""
+        histogram = Histogram("db_seconds", "Db", ["operation"], buckets=(1,))
+        histogram.observe(0.5, "get_session")
+        histogram.observe(0.5, 'say "hi"')
+
+        lines = histogram.render()
+
+        assert 'db_seconds_count{operation="get_session"} 1' in lines
+        assert 'db_seconds_count{operation="say \\"hi\\""} 1' in lines
+
+    def test_wrong_label_count_is_rejected(self):
+        """Test that observing with missing labels raises."""
+        histogram = Histogram("db_seconds", "Db", ["operation"])
+
+        with pytest.raises(ValueError):
+            histogram.observe(0.5)
+
+    def test_observations_from_threads_are_not_lost(self):
+        """Test that concurrent observers (db executor threads) all count."""
+        histogram = Histogram("db_seconds", "Db", buckets=(1,))
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [
+                threading.Thread(
+                    target=lambda: [histogram.observe(0.5) for _ in range(5000)]
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        lines = histogram.render()
+
+        assert "db_seconds_count 40000" in lines
+        assert sample(lines, "db_seconds_sum") == 20000
+
+
+class TestRegistry:
+    """Tests for the text exposition format."""
+
+    def test_render_includes_help_and_type(self):
+        """Test that every metric is preceded by its HELP and TYPE lines."""
+        registry = Registry()
+        gauge = registry.register(Gauge("streams", "Open streams"))
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render().decode()
+
+        assert (
+            text == "# HELP streams Open streams\n# TYPE streams gauge\nstreams 1.0\n"
+        )
+
+    def test_gauge_function_is_read_at_scrape(self):
+        """Test that a function gauge reports the current value."""
+        gauge = Gauge("active", "Active")
+        values = iter([3, 5])
+        gauge.set_function(lambda: next(values))
+
+        assert gauge.render() == ["active 3"]
+        assert gauge.render() == ["active 5"]
+
+    def test_duplicate_names_are_rejected(self):
+        """Test that a metric name can only be registered once."""
+        registry = Registry()
+        registry.register(Gauge("active", "Active"))
+
+        with pytest.raises(ValueError):
+            registry.register(Gauge("active", "Active"))
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics and request latency instrumentation."""
+
+    @pytest.mark.asyncio
+    async def test_metrics_in_text_format(self):
+        """Test that /metrics serves the Prometheus text format."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE chatbot_http_request_duration_seconds histogram" in response.text
+        assert "# TYPE chatbot_active_streams gauge" in response.text
+
+    @pytest.mark.asyncio
+    async def test_requests_are_timed_by_route_template(self):
+        """Test that latency is labelled with the route, not the raw path."""
+        histogram = Histogram("requests", "Requests", ["method", "route", "status"])
+        items = FastAPI()
+        items.add_middleware(MetricsMiddleware, histogram=histogram)
+
+        @items.get("/items/{item_id}")
+        async def get_item(item_id: str) -> StreamingResponse:
+            async def chunks():
+                yield b"a"
+                yield b"b"
+
+            return StreamingResponse(chunks())
+
+        async with AsyncClient(
+            transport=ASGITransport(app=items), base_url="http://test"
+        ) as client:
+            await client.get("/items/1")
+            await client.get("/items/2")
+            await client.get("/missing")
+
+        lines = histogram.render()
+        matched = 'requests_count{method="GET",route="/items/{item_id}",status="200"}'
+        unmatched = 'requests_count{method="GET",route="<unmatched>",status="404"}'
+        assert sample(lines, matched) == 2
+        assert sample(lines, unmatched) == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_can_be_disabled(self):
+        """Test that /metrics is not served when disabled."""
+        with patch("app.main.settings.metrics_enabled", False):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.get("/metrics")
+
+        assert response.status_code == 404
+
+
+class TestPipelineInstrumentation:
+    """Tests for metrics recorded by the agent and the storage layer."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        with patch("app.agents.chatbot_agent.Ollama"):
+            return ChatbotAgent(db=MagicMock())
+
+    @pytest.mark.asyncio
+    async def test_stream_records_ttft_and_token_rate(self, chatbot_agent):
+        """Test that a completed stream records TTFT, tokens/s and queue wait."""
+        ttft = Histogram("ttft", "TTFT")
+        rate = Histogram("rate", "Rate")
+        wait = Histogram("wait", "Wait")
+
+        async def reply(conversation_id, message):
+            for word in ["a", "b", "c"]:
+                yield {"delta": word}
+            yield {"done": True}
+
+        with patch.object(chatbot_agent, "_chat_stream", reply), patch(
+            "app.agents.chatbot_agent.TIME_TO_FIRST_TOKEN", ttft
+        ), patch("app.agents.chatbot_agent.TOKENS_PER_SECOND", rate), patch(
+            "app.agents.chatbot_agent.QUEUE_WAIT", wait
+        ):
+            stream = await chatbot_agent.chat("Hi", "conv-1", stream=True)
+            async for _ in stream:
+                pass
+
+        assert sample(ttft.render(), "ttft_count") == 1
+        assert sample(rate.render(), "rate_count") == 1
+        assert sample(wait.render(), "wait_count") == 1
+
+    def test_inflight_gauges_follow_scheduler(self, chatbot_agent):
+        """Test that the generation gauges read the scheduler at scrape time."""
+        chatbot_agent.scheduler.active = 2
+
+        assert INFLIGHT_GENERATIONS.render() == ["chatbot_inflight_generations 2"]
+
+    @pytest.mark.asyncio
+    async def test_db_calls_are_timed_by_operation(self):
+        """Test that AsyncDb records the latency of each call."""
+        histogram = Histogram("db", "Db", ["operation"])
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=1)
+
+        with patch("app.storage.async_db.DB_LATENCY", histogram):
+            await db.get_sessions()
+            await db.ping()
+            await db.run("get_session", sync_db.get_session)
+
+        db.close()
+        lines = histogram.render()
+        assert sample(lines, 'db_count{operation="get_session"}') == 1
+        # Labels are the stable operation names, not helper function names
+        assert sample(lines, 'db_count{operation="ping"}') == 1
+        assert len([line for line in lines if line.startswith("db_count")]) == 3
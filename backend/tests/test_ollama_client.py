@@ -0,0 +1,75 @@
+"""Tests for the shared Ollama HTTP client."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.ollama_client import create_async_client
+
+
+class TestCreateAsyncClient:
+    """Tests for create_async_client."""
+
+    @pytest.mark.asyncio
+    async def test_timeouts_come_from_settings(self):
+        """Test that model_timeout_s bounds reads and connects are separate."""
+        with patch("app.agents.ollama_client.settings") as mock_settings:
+            mock_settings.model_timeout_s = 45
+            mock_settings.ollama_connect_timeout_s = 2.0
+            mock_settings.ollama_pool_size = 3
+            mock_settings.ollama_keepalive_expiry_s = 30.0
+
+            client = create_async_client("http://ollama:11434")
+
+        timeout = client._client.timeout
+        assert timeout.read == 45
+        assert timeout.connect == 2.0
+        assert str(client._client.base_url) == "http://ollama:11434"
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_read_timeout_can_be_overridden(self):
+        """Test that a client can get a longer read timeout than turns."""
+        client = create_async_client("http://ollama:11434", read_timeout_s=300.0)
+
+        assert client._client.timeout.read == 300.0
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_pool_limits_come_from_settings(self):
+        """Test that the connection pool is sized and kept alive."""
+        with patch("app.agents.ollama_client.settings") as mock_settings:
+            mock_settings.model_timeout_s = 60
+            mock_settings.ollama_connect_timeout_s = 5.0
+            mock_settings.ollama_pool_size = 3
+            mock_settings.ollama_keepalive_expiry_s = 30.0
+
+            client = create_async_client("http://ollama:11434")
+
+        pool = client._client._transport._pool
+        assert pool._max_connections == 3
+        assert pool._max_keepalive_connections == 3
+        assert pool._keepalive_expiry == 30.0
+        await client.close()
+
+
+class TestChatbotAgentHttpClient:
+    """Tests for the client's lifecycle inside ChatbotAgent."""
+
+    @pytest.mark.asyncio
+    async def test_model_uses_shared_client(self):
+        """Test that the model reuses the agent's client for every request."""
+        agent = ChatbotAgent(db=MagicMock())
+
+        assert agent.model.get_async_client() is agent.http_client
+        await agent.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_closes_client(self):
+        """Test that cleanup releases the pooled connections."""
+        agent = ChatbotAgent(db=MagicMock())
+
+        await agent.cleanup()
+
+        assert agent.http_client._client.is_closed
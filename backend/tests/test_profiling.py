@@ -0,0 +1,112 @@
+"""Tests for on-demand request profiling."""
+
+import asyncio
+import pstats
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.profiling import ProfilingMiddleware
+
+
+def busy_work():
+    return sum(i * i for i in range(1000))
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    """App with a JSON and a streaming route behind the profiling middleware."""
+    items = FastAPI()
+    items.add_middleware(ProfilingMiddleware)
+
+    @items.post("/chat")
+    async def chat(body: dict) -> dict:
+        return {"reply": busy_work()}
+
+    @items.post("/chat/stream")
+    async def chat_stream(body: dict) -> StreamingResponse:
+        async def chunks():
+            yield b"a"
+            await asyncio.sleep(0.05)
+            busy_work()
+            yield b"b"
+
+        return StreamingResponse(chunks())
+
+    with patch("app.profiling.settings.profiling_token", "secret"), patch(
+        "app.profiling.settings.profiling_sample_rate", 0.0
+    ), patch("app.profiling.settings.profiling_dir", str(tmp_path)), patch(
+        "app.profiling.pyinstrument", None
+    ):
+        yield items
+
+
+async def post(app, path, body, headers=None):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        return await client.post(path, json=body, headers=headers)
+
+
+class TestProfilingMiddleware:
+    """Tests for which requests are profiled and what gets written."""
+
+    @pytest.mark.asyncio
+    async def test_token_header_writes_profile(self, profiled_app, tmp_path):
+        """Test that a request with the token is profiled and named after it."""
+        response = await post(
+            profiled_app,
+            "/chat",
+            {"message": "Hi", "conversation_id": "conv/1"},
+            {"X-Profile-Token": "secret"},
+        )
+
+        [profile] = tmp_path.iterdir()
+        assert response.status_code == 200
+        assert response.headers["x-profile-id"] in profile.name
+        assert "-POST-chat-conv_1-ttfb" in profile.name
+        assert profile.suffix == ".prof"
+        functions = [name for _, _, name in pstats.Stats(str(profile)).stats]
+        assert "busy_work" in functions
+
+    @pytest.mark.asyncio
+    async def test_unauthenticated_requests_are_not_profiled(
+        self, profiled_app, tmp_path
+    ):
+        """Test that no header or a wrong token leaves the request alone."""
+        await post(profiled_app, "/chat", {"message": "Hi"})
+        response = await post(
+            profiled_app, "/chat", {"message": "Hi"}, {"X-Profile-Token": "guess"}
+        )
+
+        assert "x-profile-id" not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_stream_is_profiled_to_the_last_chunk(self, profiled_app, tmp_path):
+        """Test that a streamed response is profiled until its body ends."""
+        with patch("app.profiling.settings.profiling_sample_rate", 1.0):
+            response = await post(profiled_app, "/chat/stream", {"message": "Hi"})
+
+        [profile] = tmp_path.iterdir()
+        assert response.text == "ab"
+        assert "-chat_stream-new-" in profile.name
+        total_ms = int(profile.name.split("-total")[1].split("ms")[0])
+        assert total_ms >= 50
+        functions = [name for _, _, name in pstats.Stats(str(profile)).stats]
+        assert "busy_work" in functions
+
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self, profiled_app, tmp_path):
+        """Test that overlapping profiled requests are served unprofiled."""
+        headers = {"X-Profile-Token": "secret"}
+        responses = await asyncio.gather(
+            post(profiled_app, "/chat/stream", {"message": "Hi"}, headers),
+            post(profiled_app, "/chat/stream", {"message": "Hi"}, headers),
+        )
+
+        assert [r.text for r in responses] == ["ab", "ab"]
+        assert len(list(tmp_path.iterdir())) == 1
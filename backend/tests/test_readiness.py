@@ -0,0 +1,188 @@
+"""Tests for the cached readiness probe and GET /readyz."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from agno.db.in_memory import InMemoryDb
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.readiness import ReadinessProbe
+from app.storage import AsyncDb
+
+MODEL = "llama3.2:3b"
+
+
+def models(*names):
+    return SimpleNamespace(models=[SimpleNamespace(model=name) for name in names])
+
+
+def make_host(url, loaded=(), installed=()):
+    host = MagicMock()
+    host.url = url
+    host.client.ps = AsyncMock(return_value=models(*loaded))
+    host.client.list = AsyncMock(return_value=models(*installed))
+    host.client.generate = AsyncMock()
+    return host
+
+
+@pytest.fixture
+async def db():
+    async_db = AsyncDb(InMemoryDb(), max_workers=1)
+    yield async_db
+    async_db.close()
+
+
+class TestReadinessProbe:
+    """Tests for the background checks and the cached report."""
+
+    @pytest.mark.asyncio
+    async def test_ready_with_db_and_loaded_model(self, db):
+        """Test that a loaded model and a reachable db are ready."""
+        probe = ReadinessProbe(db, [make_host("h1", loaded=[MODEL])], MODEL)
+
+        await probe.check()
+        report = probe.report()
+
+        assert report["ready"] is True
+        assert report["database"]["status"] == "ok"
+        assert "latency_ms" in report["database"]
+        assert report["model"]["hosts"]["h1"]["status"] == "loaded"
+        assert "latency_ms" in report["model"]["hosts"]["h1"]
+
+    @pytest.mark.asyncio
+    async def test_unloaded_model_is_only_reported(self, db):
+        """Test that the probe never loads a model Ollama unloaded."""
+        host = make_host("h1", installed=[MODEL])
+        probe = ReadinessProbe(db, [host], MODEL)
+
+        with patch("app.readiness.settings.readiness_require_model_loaded", True):
+            unready = await probe.check()
+        with patch("app.readiness.settings.readiness_require_model_loaded", False):
+            ready = await probe.check()
+
+        assert unready["model"]["hosts"]["h1"]["status"] == "unloaded"
+        assert unready["ready"] is False
+        assert ready["ready"] is True
+        host.client.generate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unloaded_model_is_reloaded_once_when_enabled(self, db):
+        """Test that an opted-in probe loads the model in the background."""
+        host = make_host("h1", installed=[MODEL])
+        release = asyncio.Event()
+
+        async def load(**kwargs):
+            await release.wait()
+
+        host.client.generate = AsyncMock(side_effect=load)
+        probe = ReadinessProbe(db, [host], MODEL)
+
+        with patch("app.readiness.settings.readiness_reload_models", True), patch(
+            "app.readiness.settings.readiness_require_model_loaded", True
+        ):
+            await probe.check()
+            await probe.check()
+
+        assert probe.report()["ready"] is False
+        assert probe.report()["model"]["hosts"]["h1"]["status"] == "loading"
+        await asyncio.sleep(0)
+        host.client.generate.assert_called_once()
+        release.set()
+        await probe.stop()
+
+    @pytest.mark.asyncio
+    async def test_one_ready_host_is_enough(self, db):
+        """Test that unreachable or missing hosts do not fail readiness alone."""
+        down = make_host("down")
+        down.client.ps = AsyncMock(side_effect=ConnectionError("refused"))
+        hosts = [down, make_host("empty"), make_host("up", loaded=[MODEL])]
+        probe = ReadinessProbe(db, hosts, MODEL)
+
+        report = await probe.check()
+
+        statuses = {
+            url: host["status"] for url, host in report["model"]["hosts"].items()
+        }
+        assert statuses == {"down": "unreachable", "empty": "missing", "up": "loaded"}
+        assert report["ready"] is True
+
+    @pytest.mark.asyncio
+    async def test_database_failure_is_not_ready(self, db):
+        """Test that a failing db round trip makes the instance unready."""
+        probe = ReadinessProbe(db, [make_host("h1", loaded=[MODEL])], MODEL)
+
+        with patch.object(db, "ping", AsyncMock(side_effect=OSError("db down"))):
+            report = await probe.check()
+
+        assert report["ready"] is False
+        assert report["database"] == {"status": "error", "error": "OSError: db down"}
+
+    @pytest.mark.asyncio
+    async def test_missing_or_stale_report_is_not_ready(self, db):
+        """Test that readiness expires when the probe stops reporting."""
+        probe = ReadinessProbe(db, [make_host("h1", loaded=[MODEL])], MODEL)
+        assert probe.report()["ready"] is False
+
+        await probe.check()
+        probe._report["checked_at"] = time.time() - 3600
+
+        report = probe.report()
+        assert report["ready"] is False
+        assert report["reason"] == "stale"
+
+    @pytest.mark.asyncio
+    async def test_background_loop_checks_until_stopped(self, db):
+        """Test that start() keeps the report fresh until stop()."""
+        probe = ReadinessProbe(db, [make_host("h1", loaded=[MODEL])], MODEL)
+
+        with patch("app.readiness.settings.readiness_interval_s", 0.01):
+            probe.start()
+            await asyncio.sleep(0.05)
+            await probe.stop()
+        checks = probe.checks
+        await asyncio.sleep(0.02)
+
+        assert checks >= 2
+        assert probe.checks == checks
+
+
+class TestReadyzEndpoint:
+    """Tests for GET /readyz."""
+
+    @pytest.mark.asyncio
+    async def test_serves_cached_report(self):
+        """Test that /readyz returns the probe's report without checking."""
+        probe = MagicMock()
+        probe.report.return_value = {"ready": True, "database": {"status": "ok"}}
+
+        with patch("app.main.readiness_probe", probe):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.get("/readyz")
+
+        assert response.status_code == 200
+        assert response.json()["database"] == {"status": "ok"}
+        probe.check.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_not_ready_is_503(self):
+        """Test that an unready or unstarted instance answers 503."""
+        probe = MagicMock()
+        probe.report.return_value = {"ready": False, "reason": "stale"}
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            with patch("app.main.readiness_probe", None):
+                starting = await client.get("/readyz")
+            with patch("app.main.readiness_probe", probe):
+                stale = await client.get("/readyz")
+
+        assert starting.status_code == 503
+        assert starting.json()["reason"] == "starting"
+        assert stale.status_code == 503
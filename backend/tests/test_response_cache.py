@@ -0,0 +1,206 @@
+"""Tests for the first-turn response cache."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.response_cache import ResponseCache, cache_key
+
+
+class TestCacheKey:
+    """Tests for cache_key."""
+
+    def test_whitespace_is_normalized(self):
+        """Test that spacing differences map to the same entry."""
+        assert cache_key("m", "d", "What is  Agno?\n", None) == cache_key(
+            "m", "d", " What is Agno?", None
+        )
+
+    def test_every_component_is_part_of_the_key(self):
+        """Test that model, description, prompt and options all matter."""
+        base = cache_key("m", "d", "Hi", {"temperature": 0})
+
+        assert cache_key("other", "d", "Hi", {"temperature": 0}) != base
+        assert cache_key("m", "other", "Hi", {"temperature": 0}) != base
+        assert cache_key("m", "d", "hi", {"temperature": 0}) != base
+        assert cache_key("m", "d", "Hi", {"temperature": 1}) != base
+
+
+class TestResponseCache:
+    """Tests for ResponseCache eviction and expiry."""
+
+    def test_get_returns_stored_reply(self):
+        """Test that a stored reply is served and counted as a hit."""
+        cache = ResponseCache()
+        cache.put("k", "Hello")
+
+        assert cache.get("k") == "Hello"
+        assert cache.get("missing") is None
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Test that the total size stays within max_bytes."""
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaaa"
+        assert cache.stats()["size_bytes"] == 8
+        assert cache.stats()["evictions"] == 1
+
+    def test_size_counts_utf8_bytes(self):
+        """Test that multi-byte characters count by encoded size."""
+        cache = ResponseCache()
+        cache.put("k", "héllo")
+
+        assert cache.stats()["size_bytes"] == 6
+
+    def test_oversized_reply_is_not_cached(self):
+        """Test that a reply larger than the cache is skipped."""
+        cache = ResponseCache(max_bytes=4)
+        cache.put("k", "too long")
+
+        assert len(cache) == 0
+
+    def test_replacing_entry_updates_size(self):
+        """Test that re-putting a key does not double count its size."""
+        cache = ResponseCache()
+        cache.put("k", "aaaa")
+        cache.put("k", "bb")
+
+        assert cache.stats()["size_bytes"] == 2
+        assert cache.get("k") == "bb"
+
+    def test_expired_entries_are_not_served(self):
+        """Test that entries older than the TTL count as misses."""
+        cache = ResponseCache(ttl_s=10)
+
+        with patch("app.agents.response_cache.time.monotonic", return_value=100.0):
+            cache.put("k", "Hello")
+        with patch("app.agents.response_cache.time.monotonic", return_value=111.0):
+            assert cache.get("k") is None
+
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["size_bytes"] == 0
+
+
+class TestChatbotAgentResponseCache:
+    """Tests for cache use inside ChatbotAgent."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        db = MagicMock()
+        db.upsert_session = AsyncMock()
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            agent = ChatbotAgent(db=db)
+        agent.response_cache = ResponseCache()
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self):
+        """Test that the cache is opt-in."""
+        with patch("app.agents.chatbot_agent.Ollama"):
+            agent = ChatbotAgent(db=MagicMock())
+
+        assert agent.response_cache is None
+
+    @pytest.mark.asyncio
+    async def test_repeated_first_turn_is_served_from_cache(self, chatbot_agent):
+        """Test that the second identical first turn skips the model."""
+
+        async def complete(conversation_id, message):
+            return {"conversation_id": conversation_id, "reply": "Hi!", "usage": {}}
+
+        with patch.object(
+            chatbot_agent, "_chat_complete", side_effect=complete
+        ) as mock_complete:
+            first = await chatbot_agent.chat("Hello")
+            second = await chatbot_agent.chat("Hello")
+
+        mock_complete.assert_called_once()
+        assert second["reply"] == "Hi!"
+        assert second["usage"]["cached"] is True
+        assert second["conversation_id"] != first["conversation_id"]
+        assert chatbot_agent.scheduler.stats()["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_turn_is_persisted(self, chatbot_agent):
+        """Test that a cache hit still writes the run to its conversation."""
+        key = cache_key(
+            "llama3.2:3b",
+            "You are a helpful AI assistant powered by Agno and Ollama.",
+            "Hello",
+            chatbot_agent.model.options,
+        )
+        with patch("app.agents.chatbot_agent.settings") as mock_settings:
+            mock_settings.ollama_model = "llama3.2:3b"
+            chatbot_agent.response_cache.put(key, "Hi!")
+
+            result = await chatbot_agent.chat("Hello")
+
+        session = chatbot_agent.db.upsert_session.call_args.args[0]
+        assert session.session_id == result["conversation_id"]
+        assert [(m.role, m.content) for m in session.get_chat_history()] == [
+            ("user", "Hello"),
+            ("assistant", "Hi!"),
+        ]
+        chatbot_agent.db.record_turn.assert_awaited_once_with(
+            result["conversation_id"], "Hello"
+        )
+
+    @pytest.mark.asyncio
+    async def test_stream_replays_cached_reply_as_deltas(self, chatbot_agent):
+        """Test that a streamed cache hit re-emits the text as deltas."""
+
+        async def stream(conversation_id, message):
+            yield {"delta": "Hello"}
+            yield {"delta": " there, friend"}
+            yield {
+                "done": True,
+                "conversation_id": conversation_id,
+                "response": "Hello there, friend",
+            }
+
+        with patch.object(chatbot_agent, "_chat_stream", stream):
+            first = [c async for c in await chatbot_agent.chat("Hi", stream=True)]
+            replay = [c async for c in await chatbot_agent.chat("Hi", stream=True)]
+
+        deltas = [c["delta"] for c in replay if "delta" in c]
+        assert "".join(deltas) == "Hello there, friend"
+        assert len(deltas) == 3
+        assert replay[-1]["done"] is True
+        assert replay[-1]["usage"]["cached"] is True
+        assert replay[-1]["conversation_id"] != first[-1]["conversation_id"]
+        chatbot_agent.db.upsert_session.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_is_not_cached(self, chatbot_agent):
+        """Test that an incomplete reply never enters the cache."""
+
+        async def stream(conversation_id, message):
+            yield {"delta": "Hel"}
+            raise RuntimeError("Stream error")
+
+        with patch.object(chatbot_agent, "_chat_stream", stream):
+            with pytest.raises(RuntimeError):
+                async for _ in await chatbot_agent.chat("Hi", stream=True):
+                    pass
+
+        assert len(chatbot_agent.response_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_existing_conversations_bypass_cache(self, chatbot_agent):
+        """Test that turns with history are always generated."""
+        with patch.object(
+            chatbot_agent, "_chat_complete", AsyncMock(return_value={"reply": "Hi!"})
+        ) as mock_complete:
+            await chatbot_agent.chat("Hello", conversation_id="conv-1")
+            await chatbot_agent.chat("Hello", conversation_id="conv-1")
+
+        assert mock_complete.await_count == 2
+        assert len(chatbot_agent.response_cache) == 0
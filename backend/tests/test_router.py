@@ -0,0 +1,204 @@
+"""Tests for routing generations across Ollama hosts."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from agno.db.in_memory import InMemoryDb
+from ollama import ResponseError
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.ollama_client import create_async_client
+from app.agents.router import HostRouter, OllamaHost
+from app.storage import AsyncDb
+
+
+def make_router(count=2, **kwargs):
+    hosts = [OllamaHost(f"http://h{i}", MagicMock(), MagicMock()) for i in range(count)]
+    return HostRouter(hosts, **kwargs)
+
+
+def fail(router, conversation_id, error):
+    """Run one generation through the router that fails with error."""
+    with pytest.raises(type(error)):
+        with router.lease(conversation_id):
+            raise error
+
+
+class TestHostRouter:
+    """Tests for HostRouter host selection."""
+
+    def test_requires_a_host(self):
+        """Test that an empty host list is rejected."""
+        with pytest.raises(ValueError):
+            HostRouter([])
+
+    def test_picks_least_outstanding_host(self):
+        """Test that a new conversation goes to the least busy host."""
+        router = make_router(3)
+        router.hosts[0].outstanding = 2
+        router.hosts[1].outstanding = 1
+        router.hosts[2].outstanding = 3
+
+        assert router.pick("conv-1") is router.hosts[1]
+
+    def test_ties_are_spread_across_hosts(self):
+        """Test that idle hosts share new conversations."""
+        router = make_router(2)
+
+        picked = {router.pick(f"conv-{i}").url for i in range(4)}
+
+        assert picked == {"http://h0", "http://h1"}
+
+    def test_conversation_sticks_to_its_host(self):
+        """Test that a conversation returns to its host within the slack."""
+        router = make_router(2, sticky_slack=2)
+        host = router.pick("conv-1")
+        host.outstanding = 2
+
+        assert router.pick("conv-1") is host
+
+    def test_conversation_moves_off_overloaded_host(self):
+        """Test that stickiness yields when the host is much busier."""
+        router = make_router(2, sticky_slack=2)
+        host = router.pick("conv-1")
+        host.outstanding = 3
+
+        assert router.pick("conv-1") is not host
+
+    def test_lease_tracks_outstanding_requests(self):
+        """Test that a lease counts as outstanding until it ends."""
+        router = make_router(2)
+
+        with router.lease("conv-1") as host:
+            assert host.outstanding == 1
+            assert router.pick("conv-2") is not host
+
+        assert host.outstanding == 0
+        assert host.requests == 1
+
+    def test_repeated_host_failures_eject(self):
+        """Test that a failing host is ejected and receives no traffic."""
+        router = make_router(2, max_failures=2, ejection_s=30)
+        bad = router.pick("conv-1")
+
+        fail(router, "conv-1", httpx.ConnectError("refused"))
+        fail(router, "conv-1", ConnectionError("refused"))
+
+        assert router.stats()["hosts"][bad.url]["healthy"] is False
+        assert router.stats()["ejections"] == 1
+        assert all(router.pick(f"conv-{i}") is not bad for i in range(4))
+
+    def test_ejected_host_returns_after_ejection(self):
+        """Test that an ejected host gets traffic again later."""
+        router = make_router(2, max_failures=1, ejection_s=30)
+        with patch("app.agents.router.time.monotonic", return_value=100.0):
+            bad = router.pick("conv-1")
+            fail(router, "conv-1", httpx.ReadTimeout("timed out"))
+        with patch("app.agents.router.time.monotonic", return_value=131.0):
+            assert router.stats()["hosts"][bad.url]["healthy"] is True
+
+    def test_request_errors_do_not_eject(self):
+        """Test that errors caused by the request itself are not held against the host."""
+        router = make_router(2, max_failures=1)
+        host = router.pick("conv-1")
+
+        fail(router, "conv-1", ResponseError("model not found", 404))
+        fail(router, "conv-1", ValueError("bad input"))
+
+        assert host.failures == 0
+        assert router.stats()["ejections"] == 0
+
+    def test_success_resets_failures(self):
+        """Test that only consecutive failures count."""
+        router = make_router(2, max_failures=2)
+        host = router.pick("conv-1")
+
+        fail(router, "conv-1", ResponseError("overloaded", 503))
+        with router.lease("conv-1"):
+            pass
+
+        assert host.failures == 0
+        assert host.errors == 1
+
+    def test_all_hosts_ejected_uses_first_due_back(self):
+        """Test that routing never refuses while every host is ejected."""
+        router = make_router(2)
+        router.hosts[0].ejected_until = float("inf")
+        router.hosts[1].ejected_until = 10**12
+
+        assert router.pick("conv-1") is router.hosts[1]
+
+
+def stub_ollama(name, calls):
+    """Build a stub Ollama transport that replies with its own name."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(name)
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "model": body["model"],
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": f"Hi from {name}"},
+                "done": True,
+                "done_reason": "stop",
+            },
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def down(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("Connection refused", request=request)
+
+
+class TestChatbotAgentRouting:
+    """Tests for routing real agent runs across stub Ollama hosts."""
+
+    @pytest.mark.asyncio
+    async def test_failing_host_is_ejected(self):
+        """Test that generations move to the healthy host."""
+        calls = []
+        transports = {
+            "http://a:11434": httpx.MockTransport(down),
+            "http://b:11434": stub_ollama("b", calls),
+        }
+        db = AsyncDb(InMemoryDb(), max_workers=1)
+
+        with patch("app.agents.chatbot_agent.settings") as mock_settings, patch(
+            "app.agents.chatbot_agent.create_async_client",
+            side_effect=lambda url: create_async_client(url, transport=transports[url]),
+        ):
+            mock_settings.ollama_hosts = list(transports)
+            mock_settings.ollama_model = "llama3.2:1b"
+            mock_settings.ollama_keep_alive = None
+            mock_settings.ollama_host_max_failures = 1
+            mock_settings.ollama_host_ejection_s = 30
+            mock_settings.agent_pool_size = 8
+            mock_settings.max_concurrent_generations = 4
+            mock_settings.generation_queue_size = 4
+            mock_settings.generation_queue_timeout_s = 5
+            mock_settings.inflight_dedupe_enabled = False
+            mock_settings.response_cache_enabled = False
+            mock_settings.max_history = 5
+            mock_settings.model_timeout_s = 30
+
+            agent = ChatbotAgent(db=db)
+            replies = []
+            for i in range(4):
+                try:
+                    result = await agent.chat("Hello", conversation_id=f"conv-{i}")
+                    replies.append(result["reply"])
+                except Exception:
+                    replies.append(None)
+
+        hosts = agent.stats()["ollama"]["hosts"]
+        assert hosts["http://a:11434"]["healthy"] is False
+        assert hosts["http://a:11434"]["requests"] == 1
+        assert replies.count("Hi from b") == 3
+        assert set(calls) == {"b"}
+        await agent.cleanup()
+        db.close()
@@ -0,0 +1,193 @@
+"""Tests for generation admission control and fair scheduling."""
+
+import asyncio
+import gc
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.scheduling import GenerationScheduler, QueueFull, QueueTimeout
+
+
+async def settle():
+    """Let queued waiters run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestGenerationScheduler:
+    """Tests for GenerationScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_max_concurrency(self):
+        """Test that free slots are granted without waiting."""
+        scheduler = GenerationScheduler(
+            max_concurrency=2, max_queue=0, queue_timeout_s=1
+        )
+
+        first = await scheduler.acquire("conv-1")
+        second = await scheduler.acquire("conv-2")
+
+        assert scheduler.active == 2
+        assert first.wait_s == second.wait_s == 0.0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected(self):
+        """Test that a full queue raises QueueFull with a Retry-After hint."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=1, queue_timeout_s=5
+        )
+        await scheduler.acquire("conv-1")
+        waiter = asyncio.ensure_future(scheduler.acquire("conv-2"))
+        await settle()
+
+        with pytest.raises(QueueFull) as excinfo:
+            await scheduler.acquire("conv-3")
+
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.retry_after >= 1
+        assert scheduler.stats()["rejected"] == 1
+        waiter.cancel()
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout(self):
+        """Test that a waiter gives up with QueueTimeout and leaves the queue."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=4, queue_timeout_s=0.01
+        )
+        await scheduler.acquire("conv-1")
+
+        with pytest.raises(QueueTimeout) as excinfo:
+            await scheduler.acquire("conv-2")
+
+        assert excinfo.value.status_code == 503
+        assert scheduler.queued == 0
+        assert scheduler.stats()["timed_out"] == 1
+
+    @pytest.mark.asyncio
+    async def test_release_hands_slot_to_waiter(self):
+        """Test that a released slot goes straight to the next waiter."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=4, queue_timeout_s=5
+        )
+        ticket = await scheduler.acquire("conv-1")
+        waiter = asyncio.ensure_future(scheduler.acquire("conv-2"))
+        await settle()
+        assert scheduler.queued == 1
+
+        ticket.release()
+        ticket.release()
+        second = await waiter
+
+        assert scheduler.active == 1
+        assert scheduler.queued == 0
+        assert second.wait_s > 0
+        second.release()
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_conversations_are_served_round_robin(self):
+        """Test that a busy conversation cannot starve the others."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=10, queue_timeout_s=5
+        )
+        ticket = await scheduler.acquire("busy")
+        order = []
+
+        async def turn(conversation_id):
+            async with scheduler.slot(conversation_id):
+                order.append(conversation_id)
+
+        tasks = [
+            asyncio.ensure_future(turn(c))
+            for c in ["busy", "busy", "busy", "other", "third"]
+        ]
+        await settle()
+        ticket.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["busy", "other", "third", "busy", "busy"]
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a client giving up does not hold a queue position."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=4, queue_timeout_s=5
+        )
+        ticket = await scheduler.acquire("conv-1")
+        waiter = asyncio.ensure_future(scheduler.acquire("conv-2"))
+        await settle()
+
+        waiter.cancel()
+        await settle()
+        ticket.release()
+
+        assert scheduler.queued == 0
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_report_wait_times(self):
+        """Test that stats expose queue depth and wait time."""
+        scheduler = GenerationScheduler(
+            max_concurrency=1, max_queue=4, queue_timeout_s=5
+        )
+        ticket = await scheduler.acquire("conv-1")
+        waiter = asyncio.ensure_future(scheduler.acquire("conv-2"))
+        await asyncio.sleep(0.02)
+
+        assert scheduler.stats()["queued"] == 1
+        ticket.release()
+        (await waiter).release()
+
+        stats = scheduler.stats()
+        assert stats["admitted"] == 2
+        assert stats["max_wait_ms"] >= 10
+        assert 0 < stats["avg_wait_ms"] <= stats["max_wait_ms"]
+
+
+class TestChatbotAgentScheduling:
+    """Tests for slot handling inside ChatbotAgent."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        with patch("app.agents.chatbot_agent.Ollama"):
+            return ChatbotAgent(db=MagicMock())
+
+    @pytest.mark.asyncio
+    async def test_stream_holds_slot_until_finished(self, chatbot_agent):
+        """Test that a streamed turn keeps its slot while chunks flow."""
+
+        finish = asyncio.Event()
+
+        async def fake_stream(conversation_id, message):
+            yield {"delta": "Hi"}
+            await finish.wait()
+            yield {"done": True}
+
+        with patch.object(chatbot_agent, "_chat_stream", fake_stream):
+            stream = await chatbot_agent.chat("Hi", "conv-1", stream=True)
+            assert await stream.__anext__() == {"delta": "Hi"}
+            assert chatbot_agent.scheduler.active == 1
+            finish.set()
+            chunks = [chunk async for chunk in stream]
+
+        assert chunks[-1] == {"done": True}
+        assert chatbot_agent.scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_unconsumed_stream_releases_slot(self, chatbot_agent):
+        """Test that a stream dropped before iteration frees its slot."""
+
+        async def fake_stream(conversation_id, message):
+            yield {"delta": "Hi"}
+
+        with patch.object(chatbot_agent, "_chat_stream", fake_stream):
+            # A new conversation is not coalesced, so nothing else consumes it
+            stream = await chatbot_agent.chat("Hi", stream=True)
+
+        del stream
+        gc.collect()
+
+        assert chatbot_agent.scheduler.active == 0
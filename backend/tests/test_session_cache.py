@@ -0,0 +1,171 @@
+"""Tests for the in-process session cache."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from agno.db.base import SessionType
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.storage import AsyncDb, SessionCache
+
+
+class TestSessionCache:
+    """Tests for SessionCache eviction and expiry."""
+
+    def test_get_returns_stored_session(self):
+        """Test that a stored session is served from the cache."""
+        cache = SessionCache(max_entries=2, ttl_s=60)
+        session = MagicMock()
+
+        cache.put("conv-1", session)
+
+        assert cache.get("conv-1") is session
+        assert cache.get("conv-2") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_evicts_least_recently_used(self):
+        """Test that the cache stays within max_entries."""
+        cache = SessionCache(max_entries=2, ttl_s=60)
+
+        cache.put("conv-1", "s1")
+        cache.put("conv-2", "s2")
+        cache.get("conv-1")
+        cache.put("conv-3", "s3")
+
+        assert cache.get("conv-2") is None
+        assert cache.get("conv-1") == "s1"
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entries_are_not_served(self):
+        """Test that entries older than the TTL count as misses."""
+        cache = SessionCache(max_entries=2, ttl_s=10)
+
+        with patch("app.storage.cache.time.monotonic", return_value=100.0):
+            cache.put("conv-1", "s1")
+        with patch("app.storage.cache.time.monotonic", return_value=111.0):
+            assert cache.get("conv-1") is None
+
+        assert len(cache) == 0
+        assert cache.stats()["expirations"] == 1
+
+    def test_invalidate_drops_entry(self):
+        """Test that invalidated conversations are read again."""
+        cache = SessionCache()
+        cache.put("conv-1", "s1")
+
+        cache.invalidate("conv-1")
+        cache.invalidate("missing")
+
+        assert cache.get("conv-1") is None
+
+
+class TestAsyncDbSessionCache:
+    """Tests for cache maintenance inside AsyncDb."""
+
+    @pytest.fixture
+    def async_db(self):
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=2, session_cache=SessionCache())
+        yield db
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_repeat_reads_hit_cache(self, async_db):
+        """Test that a second read does not query the database."""
+        async_db.sync_db.get_session.return_value = "session"
+
+        first = await async_db.get_session("conv-1", SessionType.AGENT)
+        second = await async_db.get_session("conv-1", SessionType.AGENT)
+
+        assert first == second == "session"
+        async_db.sync_db.get_session.assert_called_once()
+        assert async_db.stats()["session_cache"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_sessions_are_not_cached(self, async_db):
+        """Test that a not-found result is read again next time."""
+        async_db.sync_db.get_session.return_value = None
+
+        await async_db.get_session("conv-1", SessionType.AGENT)
+        await async_db.get_session("conv-1", SessionType.AGENT)
+
+        assert async_db.sync_db.get_session.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_raw_reads_bypass_cache(self, async_db):
+        """Test that non-deserialized reads always go to the database."""
+        async_db.sync_db.get_session.return_value = {"session_id": "conv-1"}
+
+        await async_db.get_session("conv-1", SessionType.AGENT, deserialize=False)
+        await async_db.get_session("conv-1", SessionType.AGENT, deserialize=False)
+
+        assert async_db.sync_db.get_session.call_count == 2
+        assert len(async_db.session_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_upsert_writes_through(self, async_db):
+        """Test that a saved session replaces the cached one."""
+        session = MagicMock(session_id="conv-1")
+        saved = MagicMock(session_id="conv-1")
+        async_db.sync_db.upsert_session.return_value = saved
+
+        await async_db.upsert_session(session)
+
+        assert await async_db.get_session("conv-1", SessionType.AGENT) is saved
+        async_db.sync_db.get_session.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_upsert_invalidates(self, async_db):
+        """Test that a failed write drops the possibly mutated entry."""
+        session = MagicMock(session_id="conv-1")
+        async_db.session_cache.put("conv-1", session)
+        async_db.sync_db.upsert_session.side_effect = OSError("Upsert failed")
+
+        with pytest.raises(OSError, match="Upsert failed"):
+            await async_db.upsert_session(session)
+
+        assert len(async_db.session_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates(self, async_db):
+        """Test that deleted conversations are not served from cache."""
+        async_db.session_cache.put("conv-1", MagicMock())
+
+        await async_db.delete_session("conv-1")
+
+        assert len(async_db.session_cache) == 0
+
+    def test_stats_when_disabled(self):
+        """Test that stats report a disabled cache."""
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=1)
+
+        assert db.stats()["session_cache"] == {"enabled": False}
+        db.close()
+
+
+class TestChatbotAgentInvalidation:
+    """Tests for cache invalidation on failed runs."""
+
+    @pytest.mark.asyncio
+    async def test_failed_run_invalidates_session(self):
+        """Test that a failing run drops the conversation from the cache."""
+        db = MagicMock()
+        db.get_session_tail = AsyncMock(return_value=None)
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            chatbot_agent = ChatbotAgent(db=db)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent_class.return_value.arun = AsyncMock(
+                side_effect=ConnectionError("Ollama connection failed")
+            )
+
+            with pytest.raises(ConnectionError, match="Ollama connection failed"):
+                await chatbot_agent._chat_complete("conv-1", "Hello")
+
+        db.invalidate_session.assert_called_once_with("conv-1")
@@ -0,0 +1,219 @@
+"""Tests for reading and writing only the latest runs of a session."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from agno.session import AgentSession
+from sqlalchemy import JSON, BigInteger, Column, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.storage import AsyncDb, SessionCache
+from app.storage.tail import (
+    TAIL_OFFSET_ATTR,
+    build_tail_query,
+    build_tail_update,
+    read_session_tail,
+    tail_offset,
+)
+
+
+@pytest.fixture
+def sessions_table():
+    """Create a table matching Agno's session table layout."""
+    return Table(
+        "agno_sessions",
+        MetaData(),
+        Column("session_id", String),
+        Column("session_type", String),
+        Column("agent_id", String),
+        Column("user_id", String),
+        Column("session_data", JSON),
+        Column("agent_data", JSON),
+        Column("metadata", JSON),
+        Column("runs", JSON),
+        Column("summary", JSON),
+        Column("created_at", BigInteger),
+        Column("updated_at", BigInteger),
+        schema="ai",
+    )
+
+
+# Stored runs as the queries see them: NULL unless they are a JSON array
+RUNS_ARRAY = (
+    "CASE WHEN (json_typeof(ai.agno_sessions.runs) = 'array') "
+    "THEN ai.agno_sessions.runs END"
+)
+
+
+def compile_sql(stmt):
+    """Render a statement as PostgreSQL with literal parameters."""
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def tail_session(offset, runs=None):
+    session = AgentSession(session_id="conv-1", runs=runs or [])
+    setattr(session, TAIL_OFFSET_ATTR, offset)
+    return session
+
+
+class TestTailQueries:
+    """Tests for the tail read and write statements."""
+
+    def test_read_slices_runs_in_the_database(self, sessions_table):
+        """Test that only the last runs leave the database."""
+        sql = compile_sql(build_tail_query(sessions_table, "conv-1", 20))
+
+        assert "ai.agno_sessions.runs," not in sql
+        assert "WITH ORDINALITY" in sql
+        assert (
+            f"run.position > coalesce(json_array_length({RUNS_ARRAY}), 0) - 20" in sql
+        )
+        assert "AS run_count" in sql
+        assert "ai.agno_sessions.session_id = 'conv-1'" in sql
+
+    def test_read_skips_runs_that_are_not_an_array(self, sessions_table):
+        """Test that a JSON null or non-array never reaches the array functions."""
+        sql = compile_sql(build_tail_query(sessions_table, "conv-1", 20))
+
+        assert f"FROM json_array_elements({RUNS_ARRAY}) WITH ORDINALITY" in sql
+        assert f"coalesce(json_array_length({RUNS_ARRAY}), 0) AS run_count" in sql
+        assert "json_array_elements(ai.agno_sessions.runs)" not in sql
+        assert "json_array_length(ai.agno_sessions.runs)" not in sql
+
+    def test_write_keeps_earlier_runs(self, sessions_table):
+        """Test that the update preserves the runs before the tail."""
+        stmt = build_tail_update(
+            sessions_table,
+            {"session_id": "conv-1", "runs": [{"run_id": "run-9"}]},
+            offset=8,
+        )
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert sql.startswith("UPDATE ai.agno_sessions SET")
+        assert (
+            "FROM json_array_elements(CASE WHEN "
+            "(json_typeof(ai.agno_sessions.runs) = %(json_typeof_1)s::VARCHAR) "
+            "THEN ai.agno_sessions.runs END) WITH ORDINALITY"
+        ) in sql
+        assert "run.position <= %(position_1)s" in sql
+        assert "||" in sql
+        assert stmt.compile().params["position_1"] == 8
+
+    def test_read_tags_session_with_offset(self, sessions_table):
+        """Test that a tail session records how many runs it leaves out."""
+        db = MagicMock()
+        db._get_table.return_value = sessions_table
+        row = MagicMock()
+        row._mapping = {
+            "session_id": "conv-1",
+            "runs": [{"run_id": "run-3", "messages": []}],
+            "run_count": 4,
+        }
+
+        with patch("app.storage.tail.SqlSession") as mock_session:
+            execute = mock_session.return_value.__enter__.return_value.execute
+            execute.return_value.fetchone.return_value = row
+
+            session = read_session_tail(db, "conv-1", 1)
+
+        assert [run.run_id for run in session.runs] == ["run-3"]
+        assert tail_offset(session) == 3
+
+    def test_whole_sessions_have_no_offset(self):
+        """Test that untagged sessions are treated as complete."""
+        assert tail_offset(AgentSession(session_id="conv-1")) == 0
+        assert tail_offset(MagicMock()) == 0
+
+
+class TestAsyncDbSessionTail:
+    """Tests for tail reads and writes inside AsyncDb."""
+
+    @pytest.fixture
+    def async_db(self):
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        sync_db.db_engine.dialect.name = "postgresql"
+        db = AsyncDb(sync_db, max_workers=2, session_cache=SessionCache())
+        yield db
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_other_databases_read_whole_session(self, async_db):
+        """Test that databases without JSON slicing fall back to get_session."""
+        async_db.sync_db.db_engine.dialect.name = "sqlite"
+        async_db.sync_db.get_session.return_value = "session"
+
+        assert await async_db.get_session_tail("conv-1", 20) == "session"
+        async_db.sync_db.get_session.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_postgres_reads_tail(self, async_db):
+        """Test that PostgreSQL reads go through the tail query."""
+        session = tail_session(5)
+
+        with patch(
+            "app.storage.async_db.read_session_tail", return_value=session
+        ) as mock_read:
+            result = await async_db.get_session_tail("conv-1", 20)
+
+        assert result is session
+        mock_read.assert_called_once_with(async_db.sync_db, "conv-1", 20)
+        async_db.sync_db.get_session.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_tail_session_is_merged_not_overwritten(self, async_db):
+        """Test that saving a tail session never replaces the whole runs."""
+        session = tail_session(5)
+        async_db.session_cache.put("conv-1", MagicMock())
+
+        with patch(
+            "app.storage.async_db.write_session_tail", return_value=session
+        ) as mock_write:
+            assert await async_db.upsert_session(session) is session
+
+        mock_write.assert_called_once_with(async_db.sync_db, session)
+        async_db.sync_db.upsert_session.assert_not_called()
+        assert len(async_db.session_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_whole_session_uses_regular_upsert(self, async_db):
+        """Test that sessions read in full are saved as before."""
+        session = AgentSession(session_id="conv-1")
+
+        with patch("app.storage.async_db.write_session_tail") as mock_write:
+            await async_db.upsert_session(session)
+
+        mock_write.assert_not_called()
+        async_db.sync_db.upsert_session.assert_called_once()
+
+
+class TestChatbotAgentSessionTail:
+    """Tests for handing the tail session to the agent."""
+
+    @pytest.mark.asyncio
+    async def test_turn_uses_tail_session(self):
+        """Test that the agent runs on the tail instead of reading the db."""
+        db = MagicMock()
+        db.record_turn = AsyncMock()
+        session = tail_session(40)
+        db.get_session_tail = AsyncMock(return_value=session)
+        with patch("app.agents.chatbot_agent.Ollama"):
+            chatbot_agent = ChatbotAgent(db=db)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class, patch(
+            "app.agents.chatbot_agent.settings.max_history", 20
+        ):
+            mock_agent = MagicMock()
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Reply"))
+            mock_agent_class.return_value = mock_agent
+
+            await chatbot_agent._chat_complete("conv-1", "Hello")
+
+        db.get_session_tail.assert_awaited_once_with("conv-1", 20)
+        assert mock_agent._cached_session is session
+        db.get_session.assert_not_called()
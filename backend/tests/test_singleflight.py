@@ -0,0 +1,236 @@
+"""Tests for single-flight coalescing of duplicate chat turns."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.scheduling import QueueFull
+from app.singleflight import SingleFlight
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestSingleFlightCall:
+    """Tests for SingleFlight.call."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test that duplicates get the leader's result without a second call."""
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"reply": "Hi"}
+
+        first = asyncio.ensure_future(flight.call("key", work))
+        second = asyncio.ensure_future(flight.call("key", work))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await first == await second == {"reply": "Hi"}
+        assert calls == 1
+        assert flight.stats() == {"in_flight": 0, "coalesced": 1}
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared(self):
+        """Test that every caller sees the failure."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0)
+            raise RuntimeError("Ollama connection failed")
+
+        results = await asyncio.gather(
+            flight.call("key", work), flight.call("key", work), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_finished_call_is_not_reused(self):
+        """Test that a later identical call starts a new one."""
+        flight = SingleFlight()
+        work = AsyncMock(return_value="done")
+
+        await flight.call("key", work)
+        await flight.call("key", work)
+
+        assert work.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_call_cancelled_when_all_callers_leave(self):
+        """Test that abandoning every caller cancels the shared call."""
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.ensure_future(flight.call("key", work))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert cancelled.is_set()
+        assert flight.stats()["in_flight"] == 0
+
+
+class TestSingleFlightStream:
+    """Tests for SingleFlight.stream."""
+
+    @pytest.mark.asyncio
+    async def test_late_subscriber_gets_full_replay(self):
+        """Test that a duplicate joining mid-stream sees every chunk."""
+        flight = SingleFlight()
+        resume = asyncio.Event()
+        factory_calls = 0
+
+        async def chunks():
+            yield {"delta": "Hello"}
+            await resume.wait()
+            yield {"delta": " world"}
+            yield {"done": True}
+
+        async def factory():
+            nonlocal factory_calls
+            factory_calls += 1
+            return chunks()
+
+        first = await flight.stream("key", factory)
+        assert await first.__anext__() == {"delta": "Hello"}
+
+        second = await flight.stream("key", factory)
+        resume.set()
+
+        expected = [{"delta": "Hello"}, {"delta": " world"}, {"done": True}]
+        assert [{"delta": "Hello"}] + await collect(first) == expected
+        assert await collect(second) == expected
+        assert factory_calls == 1
+        assert flight.stats() == {"in_flight": 0, "coalesced": 1}
+
+    @pytest.mark.asyncio
+    async def test_factory_errors_raised_before_streaming(self):
+        """Test that admission rejections reach every subscriber up front."""
+        flight = SingleFlight()
+
+        async def factory():
+            await asyncio.sleep(0)
+            raise QueueFull("Queue full", retry_after=1)
+
+        results = await asyncio.gather(
+            flight.stream("key", factory),
+            flight.stream("key", factory),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, QueueFull) for r in results)
+        assert flight.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_errors_reach_subscribers(self):
+        """Test that an upstream failure is raised after the replayed chunks."""
+        flight = SingleFlight()
+
+        async def chunks():
+            yield {"delta": "a"}
+            raise RuntimeError("Stream error")
+
+        async def factory():
+            return chunks()
+
+        stream = await flight.stream("key", factory)
+        received = []
+        with pytest.raises(RuntimeError, match="Stream error"):
+            async for chunk in stream:
+                received.append(chunk)
+
+        assert received == [{"delta": "a"}]
+
+    @pytest.mark.asyncio
+    async def test_upstream_closed_when_all_subscribers_leave(self):
+        """Test that the generation stops once nobody is listening."""
+        flight = SingleFlight()
+        closed = asyncio.Event()
+
+        async def chunks():
+            try:
+                yield {"delta": "a"}
+                await asyncio.sleep(10)
+                yield {"delta": "b"}
+            finally:
+                closed.set()
+
+        async def factory():
+            return chunks()
+
+        first = await flight.stream("key", factory)
+        second = await flight.stream("key", factory)
+        await first.__anext__()
+        await second.__anext__()
+
+        await first.aclose()
+        await asyncio.sleep(0)
+        assert not closed.is_set()
+
+        await second.aclose()
+        await asyncio.sleep(0.01)
+        assert closed.is_set()
+        assert flight.stats()["in_flight"] == 0
+
+
+class TestChatbotAgentDedupe:
+    """Tests for duplicate detection in ChatbotAgent.chat."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        with patch("app.agents.chatbot_agent.Ollama"):
+            return ChatbotAgent(db=MagicMock())
+
+    @pytest.mark.asyncio
+    async def test_duplicate_messages_share_one_generation(self, chatbot_agent):
+        """Test that the same message twice runs the model once."""
+
+        async def slow_complete(conversation_id, message):
+            await asyncio.sleep(0.01)
+            return {"conversation_id": conversation_id, "reply": "Hi", "usage": {}}
+
+        with patch.object(
+            chatbot_agent, "_chat_complete", side_effect=slow_complete
+        ) as mock_complete:
+            first, second = await asyncio.gather(
+                chatbot_agent.chat("Hello", "conv-1"),
+                chatbot_agent.chat("Hello", "conv-1"),
+            )
+
+        assert first == second
+        mock_complete.assert_called_once()
+        assert chatbot_agent.scheduler.stats()["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_different_messages_are_not_coalesced(self, chatbot_agent):
+        """Test that only identical messages are deduplicated."""
+        with patch.object(
+            chatbot_agent, "_chat_complete", AsyncMock(return_value={})
+        ) as mock_complete:
+            await asyncio.gather(
+                chatbot_agent.chat("Hello", "conv-1"),
+                chatbot_agent.chat("Goodbye", "conv-1"),
+                chatbot_agent.chat("Hello", None),
+                chatbot_agent.chat("Hello", None),
+            )
+
+        assert mock_complete.await_count == 4
+        assert chatbot_agent.stats()["inflight"]["coalesced"] == 0
@@ -0,0 +1,71 @@
+"""Tests for SSE frame encoding."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app import sse
+from app.sse import encode_event
+
+
+def parse_frame(frame: bytes) -> dict:
+    """Split an SSE frame into its fields."""
+    assert frame.endswith(b"\n\n")
+    fields = {}
+    for line in frame.decode("utf-8").strip("\n").split("\n"):
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    return fields
+
+
+class TestEncodeEvent:
+    """Tests for encode_event."""
+
+    def test_returns_bytes_data_frame(self):
+        """Test that a plain chunk becomes a single data: frame."""
+        frame = encode_event({"delta": "Hello"})
+
+        assert isinstance(frame, bytes)
+        assert frame.startswith(b"data: ")
+        assert json.loads(parse_frame(frame)["data"]) == {"delta": "Hello"}
+
+    def test_unicode_round_trips(self):
+        """Test that non-ASCII text survives encoding."""
+        chunk = {"delta": "naïve café 😀 你好"}
+
+        frame = encode_event(chunk)
+
+        assert json.loads(parse_frame(frame)["data"]) == chunk
+
+    def test_newlines_in_payload_stay_on_one_line(self):
+        """Test that payload newlines are escaped inside the JSON."""
+        frame = encode_event({"delta": "line 1\nline 2"})
+
+        assert frame.count(b"\n") == 2
+        assert json.loads(parse_frame(frame)["data"])["delta"] == "line 1\nline 2"
+
+    def test_id_and_event_fields(self):
+        """Test that id: and event: precede the data: line."""
+        frame = encode_event({"done": True}, event="done", id="42")
+
+        assert frame.startswith(b"id: 42\nevent: done\ndata: ")
+        fields = parse_frame(frame)
+        assert fields["id"] == "42"
+        assert fields["event"] == "done"
+
+    @pytest.mark.parametrize("field", ["event", "id"])
+    def test_multiline_fields_are_rejected(self, field):
+        """Test that a field cannot inject extra SSE lines."""
+        with pytest.raises(ValueError):
+            encode_event({"delta": "x"}, **{field: "a\ndata: injected"})
+
+    def test_stdlib_fallback_matches_json(self):
+        """Test that the stdlib backend produces equivalent JSON."""
+        chunk = {"delta": "naïve 😀", "done": False, "usage": {"model": "m"}}
+
+        with patch.object(sse, "dumps", sse._stdlib_dumps):
+            frame = encode_event(chunk)
+
+        assert frame.isascii()
+        assert json.loads(parse_frame(frame)["data"]) == chunk
@@ -0,0 +1,181 @@
+"""Tests for stream delta coalescing."""
+
+import asyncio
+
+import pytest
+
+from app.streaming import coalesce_deltas, stop_on_disconnect
+
+
+async def deltas(*items, delay=0.0):
+    """Yield delta chunks (or raw dicts) with an optional delay between them."""
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item if isinstance(item, dict) else {"delta": item}
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestCoalesceDeltas:
+    """Tests for coalesce_deltas."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_passes_chunks_through(self):
+        """Test that interval_ms=0 leaves the stream untouched."""
+        chunks = await collect(coalesce_deltas(deltas("a", "b", "c"), interval_ms=0))
+        assert chunks == [{"delta": "a"}, {"delta": "b"}, {"delta": "c"}]
+
+    @pytest.mark.asyncio
+    async def test_first_delta_is_sent_immediately(self):
+        """Test that the first token is never held back."""
+        stream = coalesce_deltas(deltas("first", "second", delay=0.05), interval_ms=1000)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = await stream.__anext__()
+        elapsed = loop.time() - start
+        await stream.aclose()
+
+        assert first == {"delta": "first"}
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_fast_deltas_are_merged(self):
+        """Test that deltas arriving within one window become one chunk."""
+        chunks = await collect(
+            coalesce_deltas(deltas("He", "llo", " wor", "ld"), interval_ms=1000)
+        )
+        assert chunks == [{"delta": "He"}, {"delta": "llo world"}]
+
+    @pytest.mark.asyncio
+    async def test_window_flushes_while_model_is_slow(self):
+        """Test that buffered text is sent when the window elapses."""
+        stream = coalesce_deltas(
+            deltas("a", "b", {"delta": "c"}, delay=0.03), interval_ms=10
+        )
+        chunks = await collect(stream)
+
+        assert "".join(c["delta"] for c in chunks) == "abc"
+        assert chunks == [{"delta": "a"}, {"delta": "b"}, {"delta": "c"}]
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_forces_flush(self):
+        """Test that max_bytes flushes before the window elapses."""
+        chunks = await collect(
+            coalesce_deltas(
+                deltas("x", "aa", "bb", "cc", "dd"), interval_ms=1000, max_bytes=4
+            )
+        )
+        assert chunks == [{"delta": "x"}, {"delta": "aabb"}, {"delta": "ccdd"}]
+
+    @pytest.mark.asyncio
+    async def test_done_chunk_flushes_buffer_first(self):
+        """Test that metadata chunks keep their position after the text."""
+        done = {"done": True, "conversation_id": "conv-1", "response": "abc"}
+        chunks = await collect(
+            coalesce_deltas(deltas("a", "b", "c", done), interval_ms=1000)
+        )
+        assert chunks == [{"delta": "a"}, {"delta": "bc"}, done]
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_after_buffered_text(self):
+        """Test that an upstream error is raised to the consumer."""
+
+        async def failing():
+            yield {"delta": "a"}
+            yield {"delta": "b"}
+            raise RuntimeError("Stream error")
+
+        received = []
+        with pytest.raises(RuntimeError, match="Stream error"):
+            async for chunk in coalesce_deltas(failing(), interval_ms=1000):
+                received.append(chunk)
+
+        assert received == [{"delta": "a"}]
+
+    @pytest.mark.asyncio
+    async def test_closing_early_closes_upstream(self):
+        """Test that abandoning the stream runs the upstream cleanup."""
+        closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                yield {"delta": "a"}
+                yield {"delta": "b"}
+                await asyncio.sleep(10)
+                yield {"delta": "c"}
+            finally:
+                closed.set()
+
+        stream = coalesce_deltas(upstream(), interval_ms=5)
+        assert await stream.__anext__() == {"delta": "a"}
+        assert await stream.__anext__() == {"delta": "b"}
+        await stream.aclose()
+
+        assert closed.is_set()
+
+
+class TestStopOnDisconnect:
+    """Tests for stop_on_disconnect."""
+
+    @pytest.mark.asyncio
+    async def test_connected_client_gets_every_chunk(self):
+        """Test that chunks pass through while the client is connected."""
+
+        async def connected():
+            return False
+
+        chunks = await collect(
+            stop_on_disconnect(deltas("a", "b", "c"), connected, interval_s=0.01)
+        )
+        assert chunks == [{"delta": "a"}, {"delta": "b"}, {"delta": "c"}]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_while_model_is_working(self):
+        """Test that a disconnect is noticed between chunks and closes upstream."""
+        closed = asyncio.Event()
+        disconnected = False
+
+        async def upstream():
+            try:
+                yield {"delta": "a"}
+                await asyncio.sleep(10)
+                yield {"delta": "b"}
+            finally:
+                closed.set()
+
+        async def is_disconnected():
+            return disconnected
+
+        stream = stop_on_disconnect(upstream(), is_disconnected, interval_s=0.01)
+        assert await stream.__anext__() == {"delta": "a"}
+        disconnected = True
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await collect(stream) == []
+        assert loop.time() - start < 1
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_disconnect_during_fast_stream(self):
+        """Test that a steady stream of chunks is still checked."""
+        checks = 0
+
+        async def is_disconnected():
+            nonlocal checks
+            checks += 1
+            return True
+
+        async def endless():
+            while True:
+                await asyncio.sleep(0.001)
+                yield {"delta": "x"}
+
+        chunks = await collect(stop_on_disconnect(endless(), is_disconnected, 0.02))
+
+        assert checks == 1
+        assert 0 < len(chunks) < 100
@@ -0,0 +1,292 @@
+"""Tests for the conversation summary index."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.session import AgentSession
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.storage import AsyncDb, ConversationSummaryIndex, MemorySummaryIndex
+from app.storage.backfill import backfill, backfill_if_incomplete
+from app.storage.summaries import summary_from_session
+
+
+def make_session(conversation_id, *turns, name=None, created_at=100, updated_at=200):
+    """Build an AgentSession with one run per (user, assistant) turn."""
+    runs = [
+        RunOutput(
+            run_id=f"{conversation_id}-{i}",
+            session_id=conversation_id,
+            messages=[
+                Message(role="system", content="You are helpful."),
+                Message(role="user", content=user),
+                Message(role="assistant", content=assistant),
+            ],
+        )
+        for i, (user, assistant) in enumerate(turns)
+    ]
+    return AgentSession(
+        session_id=conversation_id,
+        session_data={"name": name} if name else {},
+        runs=runs,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def index(request):
+    """Create a summary index on in-memory SQLite, or the dict-backed one."""
+    if request.param == "memory":
+        return MemorySummaryIndex()
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    return ConversationSummaryIndex(engine)
+
+
+class TestSummaryFromSession:
+    """Tests for computing summaries from full sessions."""
+
+    def test_counts_visible_messages_and_takes_first_user_snippet(self):
+        """Test that system messages are skipped and the first user message wins."""
+        session = make_session("conv-1", ("Hello", "Hi!"), ("Again", "Sure"))
+
+        record = summary_from_session(session)
+
+        assert record["conversation_id"] == "conv-1"
+        assert record["message_count"] == 4
+        assert record["snippet"] == "Hello"
+        assert record["title"] is None
+        assert record["created_at"] == 100
+        assert record["updated_at"] == 200
+
+    def test_uses_custom_title_and_truncates_snippet(self):
+        """Test that the session name is kept and long snippets are cut."""
+        session = make_session("conv-1", ("x" * 500, "ok"), name="Renamed")
+
+        record = summary_from_session(session)
+
+        assert record["title"] == "Renamed"
+        assert len(record["snippet"]) == 64
+
+
+class TestConversationSummaryIndex:
+    """Tests for maintaining and reading summary rows."""
+
+    def test_record_turn_creates_then_increments(self, index):
+        """Test that turns are counted incrementally."""
+        index.record_turn("conv-1", "First question", timestamp=1000)
+        index.record_turn("conv-1", "Second question", timestamp=2000)
+
+        [row] = index.page(limit=10)
+
+        assert row["session_id"] == "conv-1"
+        assert row["message_count"] == 4
+        assert row["first_user_message"] == "First question"
+        assert row["created_at"] == 1000
+        assert row["updated_at"] == 2000
+
+    def test_set_title_requires_existing_row(self, index):
+        """Test that set_title reports whether a row was updated."""
+        assert index.set_title("conv-1", "Title") is False
+
+        index.record_turn("conv-1", "Hello", timestamp=1000)
+
+        assert index.set_title("conv-1", "Title") is True
+        assert index.page(limit=10)[0]["name"] == "Title"
+
+    def test_upsert_replaces_records(self, index):
+        """Test that full records overwrite incremental state."""
+        index.record_turn("conv-1", "Hello", timestamp=1000)
+        record = summary_from_session(make_session("conv-1", ("Hello", "Hi")))
+        record["message_count"] = 7
+
+        index.upsert([record])
+
+        assert index.page(limit=10)[0]["message_count"] == 7
+
+    def test_page_orders_newest_first_with_keyset(self, index):
+        """Test that pages follow (updated_at, conversation_id) descending."""
+        index.record_turn("conv-a", "a", timestamp=1000)
+        index.record_turn("conv-b", "b", timestamp=2000)
+        index.record_turn("conv-c", "c", timestamp=2000)
+        index.record_turn("conv-d", "d", timestamp=3000)
+
+        first = index.page(limit=2)
+        last = first[-1]
+        second = index.page(limit=2, cursor=(last["updated_at"], last["session_id"]))
+
+        assert [r["session_id"] for r in first] == ["conv-d", "conv-c"]
+        assert [r["session_id"] for r in second] == ["conv-b", "conv-a"]
+
+    def test_delete_removes_row(self, index):
+        """Test that deleted conversations disappear from listings."""
+        index.record_turn("conv-1", "Hello")
+
+        index.delete("conv-1")
+
+        assert index.page(limit=10) == []
+
+
+class TestBackfill:
+    """Tests for rebuilding the index from existing sessions."""
+
+    def test_backfill_indexes_every_page(self, index):
+        """Test that backfill walks all session pages."""
+        sessions = [
+            make_session(f"conv-{i}", ("Hello", "Hi"), updated_at=100 + i)
+            for i in range(5)
+        ]
+        db = MagicMock()
+        db.get_sessions.side_effect = lambda limit, page, **kwargs: sessions[
+            (page - 1) * limit : page * limit
+        ]
+
+        count = backfill(db, index, batch_size=2)
+
+        assert count == 5
+        assert db.get_sessions.call_count == 3
+        rows = index.page(limit=10)
+        assert [r["session_id"] for r in rows] == [f"conv-{i}" for i in range(4, -1, -1)]
+        assert all(r["message_count"] == 2 for r in rows)
+
+    def test_backfill_if_incomplete_skips_complete_index(self, index):
+        """Test that an index covering every session is left alone."""
+        index.record_turn("conv-1", "Hello")
+        db = MagicMock()
+        db.get_sessions.return_value = ([], 1)
+
+        assert backfill_if_incomplete(db, index) == 0
+        db.get_sessions.assert_called_once()
+
+    def test_backfill_if_incomplete_indexes_missing_sessions(self, index):
+        """Test that sessions predating the index get summary rows."""
+        index.record_turn("conv-new", "Hello", timestamp=500)
+        sessions = [make_session("conv-old", ("Hi", "Hello"))]
+        db = MagicMock()
+        db.get_sessions.side_effect = lambda deserialize=True, **kwargs: (
+            ([], 2) if not deserialize else sessions
+        )
+
+        assert backfill_if_incomplete(db, index) == 1
+        assert [r["session_id"] for r in index.page(limit=10)] == [
+            "conv-new",
+            "conv-old",
+        ]
+
+
+class TestAsyncDbSummaries:
+    """Tests for summary maintenance through AsyncDb."""
+
+    @pytest.fixture
+    def async_db(self, index):
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=2, summaries=index)
+        yield db
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_list_reads_from_index(self, async_db):
+        """Test that listing is served by the summary index."""
+        await async_db.record_turn("conv-1", "Hello")
+
+        rows = await async_db.list_conversations(limit=10)
+
+        assert rows[0]["session_id"] == "conv-1"
+        async_db.sync_db.get_sessions.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_set_title_indexes_unindexed_conversation(self, async_db):
+        """Test that renaming a not-yet-indexed conversation builds its row."""
+        session = make_session("conv-1", ("Hello", "Hi"))
+
+        await async_db.set_conversation_title(session, "Renamed")
+
+        [row] = await async_db.list_conversations(limit=10)
+        assert row["name"] == "Renamed"
+        assert row["message_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_record_turn_failure_is_logged_not_raised(self, async_db, caplog):
+        """Test that a failing index update does not fail the saved turn."""
+        with patch.object(
+            async_db.summaries, "record_turn", side_effect=RuntimeError("db down")
+        ):
+            await async_db.record_turn("conv-1", "Hello")
+
+        assert "Failed to index turn of conversation conv-1" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_delete_session_removes_summary(self, async_db):
+        """Test that deleting a session also drops its summary row."""
+        await async_db.record_turn("conv-1", "Hello")
+
+        await async_db.delete_session("conv-1")
+
+        async_db.sync_db.delete_session.assert_called_once_with("conv-1")
+        assert await async_db.list_conversations(limit=10) == []
+
+    @pytest.mark.asyncio
+    async def test_list_without_index_uses_projection(self):
+        """Test that listing falls back to the session projection query."""
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=1)
+        rows = [{"session_id": "conv-1"}]
+
+        with patch(
+            "app.storage.async_db.select_conversation_page", return_value=rows
+        ) as select_page:
+            assert await db.list_conversations(limit=10) == rows
+        db.close()
+
+        select_page.assert_called_once_with(sync_db, 10, None)
+
+
+class TestChatbotAgentRecordsTurns:
+    """Tests for incremental summary updates from ChatbotAgent."""
+
+    @pytest.fixture
+    def chatbot_agent(self):
+        db = MagicMock()
+        db.get_session = AsyncMock(return_value=None)
+        db.get_session_tail = AsyncMock(return_value=None)
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            return ChatbotAgent(db=db)
+
+    @pytest.mark.asyncio
+    async def test_chat_complete_records_turn(self, chatbot_agent):
+        """Test that a completed turn updates the summary index."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+            mock_agent_class.return_value.arun = AsyncMock(
+                return_value=MagicMock(content="Reply")
+            )
+
+            await chatbot_agent._chat_complete("conv-1", "Hello")
+
+        chatbot_agent.db.record_turn.assert_awaited_once_with("conv-1", "Hello")
+
+    @pytest.mark.asyncio
+    async def test_chat_stream_records_turn_before_done(self, chatbot_agent):
+        """Test that the index is updated before the final chunk is sent."""
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+
+            async def mock_stream(*args, **kwargs):
+                yield MagicMock(content="Reply")
+
+            mock_agent_class.return_value.arun = mock_stream
+
+            async for chunk in chatbot_agent._chat_stream("conv-1", "Hello"):
+                if chunk.get("done"):
+                    chatbot_agent.db.record_turn.assert_awaited_once_with(
+                        "conv-1", "Hello"
+                    )
@@ -0,0 +1,213 @@
+"""Tests for optional OpenTelemetry tracing."""
+
+import sys
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app import tracing
+from app.agents.chatbot_agent import ChatbotAgent
+from app.storage import AsyncDb
+from app.tracing import NOOP_SPAN, TracingMiddleware, configure_tracing, span
+
+trace = pytest.importorskip("opentelemetry.trace")
+otel_context = pytest.importorskip("opentelemetry.context")
+
+
+class RecordedSpan(trace.NonRecordingSpan):
+    """Span keeping everything recorded on it."""
+
+    def __init__(self, name, attributes, parent):
+        super().__init__(trace.INVALID_SPAN_CONTEXT)
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.exceptions = []
+        self.status = None
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def update_name(self, name):
+        self.name = name
+
+    def record_exception(self, exception):
+        self.exceptions.append(exception)
+
+    def set_status(self, status):
+        self.status = status
+
+    def end(self):
+        self.ended = True
+
+
+class RecordingTracer:
+    """Tracer with the subset of the OpenTelemetry API app.tracing uses."""
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, context=None, attributes=None):
+        parent = trace.get_current_span(context)
+        recorded = RecordedSpan(
+            name, attributes, parent if isinstance(parent, RecordedSpan) else None
+        )
+        self.spans.append(recorded)
+        return recorded
+
+    @contextmanager
+    def start_as_current_span(self, name, context=None, attributes=None):
+        recorded = self.start_span(name, context, attributes)
+        token = otel_context.attach(trace.set_span_in_context(recorded))
+        try:
+            yield recorded
+        except BaseException as e:
+            recorded.record_exception(e)
+            raise
+        finally:
+            otel_context.detach(token)
+            recorded.end()
+
+    def named(self, name):
+        return [s for s in self.spans if s.name == name]
+
+
+@pytest.fixture
+def tracer():
+    recording = RecordingTracer()
+    with patch("app.tracing._tracer", recording):
+        yield recording
+
+
+class TestSpan:
+    """Tests for the span helper."""
+
+    def test_disabled_tracing_is_a_noop(self):
+        """Test that spans cost nothing when tracing is off."""
+        assert span("turn") is NOOP_SPAN
+        assert span("turn", detached=True) is NOOP_SPAN
+        with span("turn", {"key": "value"}) as current:
+            current.set_attribute("other", 1)
+
+    def test_missing_sdk_leaves_tracing_off(self):
+        """Test that enabling tracing without the SDK only logs a warning."""
+        with patch("app.tracing.settings.tracing_enabled", True), patch.dict(
+            sys.modules, {"opentelemetry.sdk.trace": None}
+        ):
+            assert configure_tracing() is False
+
+        assert tracing.is_enabled() is False
+
+    def test_current_span_is_parent(self, tracer):
+        """Test that spans nest under the span current when they start."""
+        with span("outer") as outer:
+            with span("inner"):
+                pass
+
+        assert tracer.named("inner")[0].parent is outer
+        assert all(s.ended for s in tracer.spans)
+
+    def test_detached_span_records_errors(self, tracer):
+        """Test that a detached span records the exception and ends."""
+        with pytest.raises(ValueError):
+            with span("turn", detached=True):
+                raise ValueError("boom")
+
+        recorded = tracer.named("turn")[0]
+        assert recorded.ended
+        assert isinstance(recorded.exceptions[0], ValueError)
+        assert recorded.status.status_code == trace.StatusCode.ERROR
+
+    @pytest.mark.asyncio
+    async def test_detached_span_marks_abandoned_streams(self, tracer):
+        """Test that closing a generator mid-span marks it cancelled, not failed."""
+
+        async def stream():
+            with span("turn", detached=True):
+                yield 1
+                yield 2
+
+        chunks = stream()
+        await chunks.__anext__()
+        await chunks.aclose()
+
+        recorded = tracer.named("turn")[0]
+        assert recorded.ended
+        assert recorded.attributes["cancelled"] is True
+        assert recorded.exceptions == []
+
+
+class TestTracingInstrumentation:
+    """Tests for spans recorded by the app, the agent and the storage layer."""
+
+    @pytest.mark.asyncio
+    async def test_request_span_is_named_after_route(self, tracer):
+        """Test that the request span uses the route template."""
+        items = FastAPI()
+        items.add_middleware(TracingMiddleware)
+
+        @items.get("/items/{item_id}")
+        async def get_item(item_id: str) -> dict:
+            with span("work"):
+                return {"id": item_id}
+
+        async with AsyncClient(
+            transport=ASGITransport(app=items), base_url="http://test"
+        ) as client:
+            await client.get("/items/1")
+
+        request_span = tracer.named("GET /items/{item_id}")[0]
+        assert request_span.attributes["http.route"] == "/items/{item_id}"
+        assert request_span.attributes["http.response.status_code"] == 200
+        assert tracer.named("work")[0].parent is request_span
+
+    @pytest.mark.asyncio
+    async def test_stream_turn_spans(self, tracer):
+        """Test that a streamed turn records history, model and write spans."""
+        db = MagicMock()
+        db.get_session = AsyncMock(return_value=None)
+        db.get_session_tail = AsyncMock(return_value=None)
+        db.record_turn = AsyncMock()
+        with patch("app.agents.chatbot_agent.Ollama"):
+            chatbot_agent = ChatbotAgent(db=db)
+
+        with patch("app.agents.chatbot_agent.Agent") as mock_agent_class:
+
+            async def mock_stream(*args, **kwargs):
+                for word in ["Hello", " there"]:
+                    yield MagicMock(content=word)
+
+            mock_agent_class.return_value.arun = mock_stream
+
+            async for _ in chatbot_agent._chat_stream("conv-1", "Hi"):
+                pass
+
+        turn = tracer.named("chat.turn")[0]
+        model = tracer.named("model.generate")[0]
+        assert turn.attributes["chat.conversation_id"] == "conv-1"
+        assert tracer.named("chat.history")[0].parent is turn
+        assert tracer.named("chat.record_turn")[0].parent is turn
+        assert model.parent is turn
+        assert model.attributes["gen_ai.usage.output_tokens"] == 2
+        assert "chat.ttft_ms" in model.attributes
+        assert all(s.ended for s in tracer.spans)
+
+    @pytest.mark.asyncio
+    async def test_db_calls_are_traced(self, tracer):
+        """Test that every AsyncDb call gets a span named after it."""
+        sync_db = MagicMock()
+        sync_db.id = "test-db"
+        db = AsyncDb(sync_db, max_workers=1)
+
+        await db.get_sessions()
+        db.close()
+
+        recorded = tracer.named("db.get_sessions")[0]
+        assert recorded.attributes["db.operation.name"] == "get_sessions"
@@ -0,0 +1,180 @@
+"""Tests for model warm-up at startup."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+from app.agents.chatbot_agent import ChatbotAgent
+from app.agents.warmup import warm_up
+from app.main import app, lifespan
+
+
+class TestWarmUp:
+    """Tests for warm_up."""
+
+    @pytest.mark.asyncio
+    async def test_loads_and_primes_each_model(self):
+        """Test that every model is loaded, then primed with one token."""
+        client = MagicMock()
+        client.generate = AsyncMock()
+
+        report = await warm_up(client, ["main", "extra"], keep_alive="30m", prompt="Hi")
+
+        assert report["status"] == "ready"
+        assert report["models"] == {"main": "loaded", "extra": "loaded"}
+        assert client.generate.await_args_list == [
+            call(model="main", keep_alive="30m"),
+            call(
+                model="main",
+                prompt="Hi",
+                keep_alive="30m",
+                options={"num_predict": 1},
+            ),
+            call(model="extra", keep_alive="30m"),
+            call(
+                model="extra",
+                prompt="Hi",
+                keep_alive="30m",
+                options={"num_predict": 1},
+            ),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_priming_is_optional(self):
+        """Test that no prompt is generated without a priming prompt."""
+        client = MagicMock()
+        client.generate = AsyncMock()
+
+        await warm_up(client, ["main"])
+
+        client.generate.assert_awaited_once_with(model="main", keep_alive=None)
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_not_raised(self):
+        """Test that a missing model degrades warm-up without aborting it."""
+        client = MagicMock()
+        client.generate = AsyncMock(side_effect=[Exception("model not found"), None])
+
+        report = await warm_up(client, ["missing", "main"])
+
+        assert report["status"] == "degraded"
+        assert report["models"]["missing"] == "error: model not found"
+        assert report["models"]["main"] == "loaded"
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test that a slow model load stops at the time budget."""
+
+        async def slow_generate(**kwargs):
+            await asyncio.sleep(10)
+
+        client = MagicMock()
+        client.generate = slow_generate
+
+        report = await warm_up(client, ["main"], timeout_s=0.01)
+
+        assert report["status"] == "timeout"
+        assert report["models"] == {"main": "pending"}
+
+
+class TestChatbotAgentWarmUp:
+    """Tests for ChatbotAgent.warm_up."""
+
+    @pytest.mark.asyncio
+    async def test_warms_primary_and_secondary_models(self):
+        """Test that the primary model comes first and is not repeated."""
+        with patch("app.agents.chatbot_agent.Ollama"):
+            agent = ChatbotAgent(db=MagicMock())
+
+        with patch("app.agents.chatbot_agent.settings") as mock_settings, patch(
+            "app.agents.chatbot_agent.warm_up",
+            AsyncMock(return_value={"status": "ready"}),
+        ) as mock_warm_up:
+            mock_settings.ollama_model = "main"
+            mock_settings.warmup_models = ["extra", "main"]
+            mock_settings.ollama_keep_alive = "30m"
+            mock_settings.warmup_prompt = ""
+            mock_settings.warmup_timeout_s = 5
+
+            await agent.warm_up()
+
+        assert mock_warm_up.await_args.args[1] == ["main", "extra"]
+        assert mock_warm_up.await_args.kwargs["prompt"] is None
+        assert agent.stats()["warmup"] == {
+            "status": "ready",
+            "hosts": {"http://localhost:11434": {"status": "ready"}},
+        }
+        await agent.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_warm_up_reads_are_bounded_by_warmup_timeout(self):
+        """Test that cold loads are not cut short by model_timeout_s."""
+        with patch("app.agents.chatbot_agent.Ollama"):
+            agent = ChatbotAgent(db=MagicMock())
+
+        with patch("app.agents.chatbot_agent.settings.warmup_timeout_s", 300.0), patch(
+            "app.agents.chatbot_agent.warm_up",
+            AsyncMock(return_value={"status": "ready"}),
+        ) as mock_warm_up:
+            await agent.warm_up()
+
+        client = mock_warm_up.await_args.args[0]
+        assert client is not agent.http_client
+        assert client._client.timeout.read == 300.0
+        assert client._client.is_closed
+        await agent.cleanup()
+
+
+class TestLifespanWarmUp:
+    """Tests for warm-up during application startup."""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_runs_before_startup_completes(self):
+        """Test that the lifespan warms the models before serving."""
+        agent = MagicMock()
+        agent.warm_up = AsyncMock()
+        agent.cleanup = AsyncMock()
+
+        with patch(
+            "app.main.open_storage", return_value=(MagicMock(), MagicMock())
+        ), patch("app.main.backfill_if_incomplete"), patch(
+            "app.main.ChatbotAgent", return_value=agent
+        ):
+            async with lifespan(app):
+                agent.warm_up.assert_awaited_once()
+
+        agent.cleanup.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_summary_index_is_backfilled_at_startup(self):
+        """Test that the lifespan indexes conversations missing from the index."""
+        agent = MagicMock()
+        agent.warm_up = AsyncMock()
+        agent.cleanup = AsyncMock()
+        storage = (MagicMock(), MagicMock())
+
+        with patch("app.main.open_storage", return_value=storage), patch(
+            "app.main.backfill_if_incomplete"
+        ) as backfill, patch("app.main.ChatbotAgent", return_value=agent):
+            async with lifespan(app):
+                backfill.assert_called_once_with(*storage)
+
+    @pytest.mark.asyncio
+    async def test_backfill_failure_does_not_stop_startup(self, caplog):
+        """Test that a failing backfill is logged and the app still starts."""
+        agent = MagicMock()
+        agent.warm_up = AsyncMock()
+        agent.cleanup = AsyncMock()
+
+        with patch(
+            "app.main.open_storage", return_value=(MagicMock(), MagicMock())
+        ), patch(
+            "app.main.backfill_if_incomplete", side_effect=OSError("database is locked")
+        ), patch(
+            "app.main.ChatbotAgent", return_value=agent
+        ):
+            async with lifespan(app):
+                agent.warm_up.assert_awaited_once()
+
+        assert "Summary index backfill failed" in caplog.text